@@ -0,0 +1,112 @@
+"""
+Audio-only postprocessing cost: stream copy vs re-encode.
+
+Generates stereo test audio with FFmpeg (AAC in .m4a, Opus in .webm, as
+YouTube serves them), runs every audio path through the same
+FFmpegExtractAudio step the downloader uses, and prints the FFmpeg CPU time
+(user + system of the child processes) per hour of audio:
+
+    m4a-copy     AAC source   -> m4a   (remux, the default)
+    opus-copy    Opus source  -> opus  (remux)
+    m4a-encode   Opus source  -> m4a   (fallback when a video has no AAC stream)
+    mp3-encode   AAC source   -> mp3   (192 kbps, the old default)
+
+Needs ffmpeg on PATH. Run from the repository root:
+
+    python -m benchmarks.bench_audio --duration 600 --repeat 3
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from core.cancel import CancelToken
+from core.engine import DownloadJob, postprocessor_defs, run_postprocessors
+from core.metadata import AUDIO_M4A, AUDIO_OPUS, AUDIO_MP3
+
+# name -> (source file, quality label)
+PATHS = {
+    'm4a-copy': ('source.m4a', AUDIO_M4A),
+    'opus-copy': ('source.webm', AUDIO_OPUS),
+    'm4a-encode': ('source.webm', AUDIO_M4A),
+    'mp3-encode': ('source.m4a', AUDIO_MP3),
+}
+
+# Source encodings, roughly YouTube's itag 140 and 251
+SOURCES = {
+    'source.m4a': ['-c:a', 'aac', '-b:a', '128k'],
+    'source.webm': ['-c:a', 'libopus', '-b:a', '128k'],
+}
+
+
+def make_sources(out_dir, duration):
+    """A tone over noise (noise keeps the encoders busy, like music does)."""
+    for name, codec_args in SOURCES.items():
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-y',
+             '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate=48000:duration={duration}',
+             '-f', 'lavfi', '-i', f'anoisesrc=sample_rate=48000:amplitude=0.2:duration={duration}',
+             '-filter_complex', 'amix=inputs=2', '-ac', '2', *codec_args, os.path.join(out_dir, name)],
+            check=True)
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_once(ydl, source, quality, work_dir):
+    """Converts a fresh copy of 'source' (the postprocessor deletes its input). Returns (cpu, wall, path)."""
+    path = os.path.join(work_dir, 'audio' + os.path.splitext(source)[1])
+    shutil.copyfile(source, path)
+    info = {'id': 'bench', 'title': 'bench', 'filepath': path, 'ext': path.rsplit('.', 1)[1]}
+    pp_defs = postprocessor_defs(DownloadJob('bench', quality, work_dir))
+
+    cpu, start = children_cpu(), time.perf_counter()
+    info = run_postprocessors(ydl, info, pp_defs, CancelToken())
+    elapsed = time.perf_counter() - start
+    return children_cpu() - cpu, elapsed, info['filepath']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=int, default=600, help='Length of the test audio (s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per path (the fastest counts)')
+    parser.add_argument('--paths', nargs='+', choices=list(PATHS), default=list(PATHS))
+    args = parser.parse_args()
+
+    if shutil.which('ffmpeg') is None:
+        parser.error('ffmpeg not found on PATH')
+
+    import yt_dlp
+    results = []
+    with tempfile.TemporaryDirectory() as src_dir, tempfile.TemporaryDirectory() as work_dir, \
+            yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+        make_sources(src_dir, args.duration)
+        for name in args.paths:
+            source, quality = PATHS[name]
+            runs = []
+            for _ in range(max(1, args.repeat)):
+                cpu, elapsed, output = run_once(ydl, os.path.join(src_dir, source), quality, work_dir)
+                size = os.path.getsize(output)
+                os.unlink(output)
+                runs.append((cpu, elapsed))
+            cpu, elapsed = min(runs)
+            results.append({
+                'path': name,
+                'output': os.path.splitext(output)[1].lstrip('.'),
+                'cpu_seconds': round(cpu, 3),
+                'wall_seconds': round(elapsed, 3),
+                'cpu_seconds_per_audio_hour': round(cpu * 3600 / args.duration, 2),
+                'realtime_factor': round(args.duration / elapsed, 1) if elapsed else None,
+                'output_bytes': size,
+            })
+
+    print(json.dumps({'duration': args.duration, 'repeat': args.repeat, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
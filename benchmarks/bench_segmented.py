@@ -0,0 +1,70 @@
+"""
+Segmented download throughput: 1 vs 4 vs 8 connections per file.
+
+Downloads one large synthetic file from a local range-capable server with
+per-connection bandwidth limit and first-byte latency (a far-away CDN that
+throttles single streams) and prints the wall time per connection count.
+Run from the repository root:
+
+    python -m benchmarks.bench_segmented --size 67108864 --bandwidth 4194304
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from benchmarks.local_server import LocalMediaServer, BLOCK
+from core.segmented import SegmentedDownload
+
+
+def verify(path, size):
+    """Checks the reassembled file byte for byte against the server's pattern."""
+    with open(path, 'rb') as f:
+        offset = 0
+        while True:
+            data = f.read(len(BLOCK))
+            if not data:
+                return offset == size
+            if data != BLOCK[:len(data)]:
+                return False
+            offset += len(data)
+
+
+def run_once(url, size, connections, out_dir, max_request):
+    path = os.path.join(out_dir, f'segmented-{connections}.bin')
+    start = time.perf_counter()
+    SegmentedDownload(url, path, size, connections=connections, max_request=max_request).run()
+    elapsed = time.perf_counter() - start
+    ok = verify(path, size)
+    os.unlink(path)
+    return {
+        'connections': connections,
+        'seconds': round(elapsed, 3),
+        'mib_per_s': round(size / elapsed / (1024 * 1024), 2),
+        'verified': ok,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=64 * 1024 * 1024, help='File size in bytes')
+    parser.add_argument('--bandwidth', type=int, default=4 * 1024 * 1024, help='Per-connection limit (bytes/s)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Server first-byte latency (s)')
+    parser.add_argument('--max-request', type=int, default=None, help='Largest range request (bytes)')
+    parser.add_argument('--connections', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with LocalMediaServer(latency=args.latency, bandwidth=args.bandwidth) as server, \
+            tempfile.TemporaryDirectory() as out_dir:
+        url = server.url('large.mp4', args.size)
+        results = [run_once(url, args.size, n, out_dir, args.max_request) for n in args.connections]
+
+    baseline = results[0]['seconds']
+    for result in results:
+        result['speedup'] = round(baseline / result['seconds'], 2)
+    print(json.dumps({'size': args.size, 'bandwidth': args.bandwidth,
+                      'latency': args.latency, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
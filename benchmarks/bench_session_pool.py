@@ -0,0 +1,81 @@
+"""
+Per-job setup cost: fresh YoutubeDL + bare requests.get vs. the shared pool.
+
+Runs a queue of small files from a local server through both paths and
+prints the mean per-job time. Run from the repository root:
+
+    python -m benchmarks.bench_session_pool --jobs 50 --size 65536
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import requests
+from yt_dlp import YoutubeDL
+from benchmarks.local_server import LocalMediaServer
+from core.session import YoutubeDLPool, BASE_PARAMS, get_http_session
+
+
+def job_options(out_dir):
+    return dict(BASE_PARAMS, outtmpl=os.path.join(out_dir, '%(id)s.%(ext)s'), overwrites=True)
+
+
+def run_cold(urls, out_dir):
+    """Baseline: one YoutubeDL and one un-pooled HTTP request per job."""
+    timings = []
+    for url in urls:
+        start = time.perf_counter()
+        requests.get(url, headers=BASE_PARAMS['http_headers'], timeout=5).content  # "thumbnail"
+        with YoutubeDL(job_options(out_dir)) as ydl:
+            ydl.download([url])
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_pooled(urls, out_dir):
+    """Pooled: warm YoutubeDL leases and a keep-alive requests.Session."""
+    pool = YoutubeDLPool(size=1)
+    session = get_http_session()
+    timings = []
+    for url in urls:
+        start = time.perf_counter()
+        session.get(url, timeout=5).content
+        with pool.lease(job_options(out_dir)) as ydl:
+            ydl.download([url])
+        timings.append(time.perf_counter() - start)
+    pool.close()
+    return timings
+
+
+def summarize(timings):
+    return {
+        'jobs': len(timings),
+        'total_s': round(sum(timings), 4),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 2),
+        'first_ms': round(timings[0] * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=30)
+    parser.add_argument('--size', type=int, default=64 * 1024, help='Bytes per file')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server first-byte latency (s)')
+    args = parser.parse_args()
+
+    with LocalMediaServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as out_dir:
+        urls = [server.url(f'clip{i}.mp4', args.size) for i in range(args.jobs)]
+        cold = summarize(run_cold(urls, out_dir))
+        pooled = summarize(run_pooled(urls, out_dir))
+
+    report = {
+        'cold': cold,
+        'pooled': pooled,
+        'saved_per_job_ms': round(cold['mean_ms'] - pooled['mean_ms'], 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Startup cost of each entry path, measured with 'python -X importtime'.
+
+Every path runs in a fresh interpreter several times; the report gives the
+median wall time, the total import time, the heaviest top-level imports and
+whether the expensive packages (PyQt6, yt-dlp, requests) were loaded.
+Append results to a JSON-lines file with --history to track them over time.
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --runs 5 --history startup.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry path -> interpreter arguments (after '-X importtime')
+ENTRY_PATHS = {
+    'help': ['main.py', '--help'],
+    'clear': ['main.py', '--clear'],  # Run in an empty directory: nothing to delete, no prompt
+    'cli': ['-c', 'import main, core.cli, core.ytdl'],  # Everything loaded before a CLI download starts
+    'gui': ['-c', 'import main, PyQt6.QtWidgets, ui.main_window'],  # Everything loaded before the window shows
+}
+
+HEAVY_PACKAGES = ('PyQt6', 'yt_dlp', 'requests')
+
+# Paths that must stay free of these packages (checked with --check)
+FORBIDDEN = {
+    'help': HEAVY_PACKAGES,
+    'clear': HEAVY_PACKAGES,
+    'cli': ('PyQt6',),
+}
+
+
+def parse_importtime(stderr):
+    """Returns [(module, self_us, cumulative_us, depth), ...] from '-X importtime' output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        stripped = name.rstrip()
+        module = stripped.lstrip()
+        depth = (len(stripped) - len(module) - 1) // 2
+        rows.append((module, int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(name, runs, cwd):
+    args = [os.path.join(ROOT, a) if a.endswith('.py') else a for a in ENTRY_PATHS[name]]
+    argv = [sys.executable, '-X', 'importtime'] + args
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+
+    walls = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(argv, cwd=cwd, env=env, stdin=subprocess.DEVNULL,
+                                capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+
+    rows = parse_importtime(result.stderr)
+    top_level = [r for r in rows if r[3] == 0]
+    loaded = {m for m, _, _, _ in rows}
+    report = {
+        'wall_ms': round(statistics.median(walls) * 1000, 1),
+        'import_ms': round(sum(r[2] for r in top_level) / 1000, 1),
+        'modules': len(rows),
+        'heaviest': [{'module': m, 'cumulative_ms': round(c / 1000, 1)}
+                     for m, _, c, _ in sorted(top_level, key=lambda r: -r[2])[:8]],
+        'loaded': {pkg: pkg in loaded for pkg in HEAVY_PACKAGES},
+    }
+    if result.returncode != 0:
+        errors = [l for l in result.stderr.splitlines() if not l.startswith('import time:')]
+        report['error'] = errors[-1] if errors else f'exit code {result.returncode}'
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per entry path')
+    parser.add_argument('--paths', nargs='+', choices=list(ENTRY_PATHS), default=list(ENTRY_PATHS))
+    parser.add_argument('--history', metavar='FILE', help='Append this run as one JSON line to FILE')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 1 if help/clear/cli load packages they should not')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        results = {name: measure(name, max(1, args.runs), cwd) for name in args.paths}
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'paths': results,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.history:
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(report) + '\n')
+
+    if args.check:
+        violations = [f'{name} loads {pkg}' for name, pkgs in FORBIDDEN.items() if name in results
+                      for pkg in pkgs if results[name]['loaded'][pkg]]
+        for violation in violations:
+            print(f'FAIL: {violation}', file=sys.stderr)
+        sys.exit(1 if violations else 0)
+
+
+if __name__ == '__main__':
+    main()
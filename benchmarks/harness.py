@@ -0,0 +1,349 @@
+"""
+Offline benchmark suite: no YouTube, no network.
+
+Starts the local media server (benchmarks/local_server.py), registers the
+stub extractor (benchmarks/stub_extractor.py) on the shared YoutubeDL pool
+and drives the real entry points through repeatable scenarios:
+
+    metadata    VideoInfoWorker latency, cold and from the metadata cache
+    many_small  many small files through DownloadWorker, several at a time
+    few_huge    a few large files through DownloadWorker
+    engine      the many_small workload on core.engine directly (no Qt)
+    cli         run_cli_mode for a handful of videos
+    playlist    playlist listing (time to first entry) and run_url_batch
+
+All state (cache, journal) lives in a temporary SMART_YTDL_HOME. Results are
+printed and optionally written as JSON; --baseline compares against a
+previous result file. Run from the repository root:
+
+    python -m benchmarks.harness --output run.json
+    python -m benchmarks.harness --scenarios many_small --latency 0.05 --baseline run.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ('metadata', 'many_small', 'few_huge', 'engine', 'cli', 'playlist')
+
+# Metrics where a higher value is better (everything else: lower is better)
+HIGHER_IS_BETTER = ('throughput_mib_s',)
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'count': len(timings),
+        'mean_ms': round(statistics.mean(timings) * 1000, 2),
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'p95_ms': round(timings[int(0.95 * (len(timings) - 1))] * 1000, 2),
+        'max_ms': round(timings[-1] * 1000, 2),
+    }
+
+
+def throughput(nbytes, seconds):
+    return round(nbytes / (1024 * 1024) / seconds, 2) if seconds > 0 else None
+
+
+def output_bytes(directory):
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+
+# ------------------------------------------------------------------------
+# SCENARIOS
+# ------------------------------------------------------------------------
+
+def bench_metadata(server, args, work_dir):
+    """VideoInfoWorker: first lookup per video, then the same URLs again (warm pool, same process)."""
+    from core.workers import VideoInfoWorker
+
+    def load(url):
+        worker = VideoInfoWorker(url)
+        result = {}
+        worker.data_loaded.connect(lambda info: result.update(info=info))
+        worker.error_occurred.connect(lambda error: result.update(error=error))
+        start = time.perf_counter()
+        worker.run()  # Synchronously in this thread: signals are delivered directly
+        elapsed = time.perf_counter() - start
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        return elapsed
+
+    urls = [server.video_url(f'meta{i}', args.small_size) for i in range(args.metadata_count)]
+    first = [load(url) for url in urls]
+    repeat = [load(url) for url in urls]
+    return {'first': summarize(first), 'repeat': summarize(repeat)}
+
+
+class _TimedHooks:
+    """Counts progress callback calls and the time spent inside them, across threads."""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def wrap(self, hook):
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return hook(*args)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.calls += 1
+                    self.seconds += elapsed
+        return timed
+
+    def report(self):
+        return {
+            'hook_calls': self.calls,
+            'hook_total_ms': round(self.seconds * 1000, 2),
+            'hook_mean_us': round(self.seconds / self.calls * 1e6, 2) if self.calls else None,
+        }
+
+
+def _run_worker(url, args, out_dir, hooks):
+    """One DownloadWorker, run synchronously in the calling thread."""
+    from core.downloader import DownloadWorker
+
+    worker = DownloadWorker(url, args.quality, out_dir, connections=args.connections)
+    worker._on_event = hooks.wrap(worker._on_event)  # Engine callback: snapshot + signal per hook call
+    errors = []
+    worker.error_occurred.connect(errors.append)
+    worker.run()
+    if errors:
+        raise RuntimeError(errors[0])
+
+
+def _run_engine(url, args, out_dir, hooks):
+    """One core.engine download, no Qt involved."""
+    from core.engine import DownloadJob, run_download
+
+    run_download(DownloadJob(url, args.quality, out_dir, connections=args.connections),
+                 hooks.wrap(lambda event, data: None))
+
+
+def bench_downloads(server, args, work_dir, name, count, size, run_one=_run_worker):
+    """'count' downloads, 'args.jobs' at a time, each run synchronously in its own pool thread."""
+    from core.session import set_pool_size
+
+    out_dir = os.path.join(work_dir, name)
+    os.makedirs(out_dir, exist_ok=True)
+    hooks = _TimedHooks()
+    set_pool_size(args.jobs)
+
+    def job(index):
+        start = time.perf_counter()
+        run_one(server.video_url(f'{name}{index}', size), args, out_dir, hooks)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        timings = list(pool.map(job, range(count)))
+    wall = time.perf_counter() - start
+
+    nbytes = output_bytes(out_dir)
+    return dict({
+        'files': count,
+        'bytes': nbytes,
+        'wall_s': round(wall, 3),
+        'throughput_mib_s': throughput(nbytes, wall),
+        'per_job': summarize(timings),
+    }, **hooks.report())
+
+
+def bench_many_small(server, args, work_dir):
+    return bench_downloads(server, args, work_dir, 'small', args.small_count, args.small_size)
+
+
+def bench_few_huge(server, args, work_dir):
+    return bench_downloads(server, args, work_dir, 'huge', args.huge_count, args.huge_size)
+
+
+def bench_engine(server, args, work_dir):
+    return bench_downloads(server, args, work_dir, 'engine', args.small_count, args.small_size, _run_engine)
+
+
+def bench_cli(server, args, work_dir):
+    """run_cli_mode end to end (console output discarded), one video after another."""
+    from core.cli import run_cli_mode
+
+    cli_dir = os.path.join(work_dir, 'cli')
+    os.makedirs(cli_dir, exist_ok=True)
+    timings = []
+    previous = os.getcwd()
+    os.chdir(cli_dir)  # run_cli_mode saves to './downloads'
+    try:
+        for i in range(args.cli_count):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ok = run_cli_mode(server.video_url(f'cli{i}', args.small_size), quality=args.cli_quality,
+                                  connections=args.connections, force=True)
+            timings.append(time.perf_counter() - start)
+            if not ok:
+                raise RuntimeError(f'run_cli_mode failed for cli{i}')
+    finally:
+        os.chdir(previous)
+
+    nbytes = output_bytes(os.path.join(cli_dir, 'downloads'))
+    return {'bytes': nbytes, 'throughput_mib_s': throughput(nbytes, sum(timings)), 'per_job': summarize(timings)}
+
+
+def bench_playlist(server, args, work_dir):
+    """Lazy playlist listing, then the listed videos through the CLI batch runner."""
+    from core.cli import run_url_batch
+    from core.playlist import iter_playlist_entries
+
+    url = server.playlist_url('bench', args.playlist_count, args.small_size)
+    start = time.perf_counter()
+    first_entry = None
+    urls = []
+    for entry in iter_playlist_entries(url):
+        if first_entry is None:
+            first_entry = time.perf_counter() - start
+        urls.append(entry['url'])
+    listing = time.perf_counter() - start
+
+    batch_dir = os.path.join(work_dir, 'playlist')
+    os.makedirs(batch_dir, exist_ok=True)
+    previous = os.getcwd()
+    os.chdir(batch_dir)
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            # force: measure downloads even if an earlier run left them in the archive
+            exit_code = run_url_batch(urls, quality=args.cli_quality, jobs=args.jobs, connections=args.connections,
+                                      force=True)
+        batch = time.perf_counter() - start
+    finally:
+        os.chdir(previous)
+    if exit_code:
+        raise RuntimeError(f'run_url_batch exited with {exit_code}')
+
+    nbytes = output_bytes(os.path.join(batch_dir, 'downloads'))
+    return {
+        'entries': len(urls),
+        'first_entry_ms': round(first_entry * 1000, 2) if first_entry is not None else None,
+        'listing_ms': round(listing * 1000, 2),
+        'batch_s': round(batch, 3),
+        'bytes': nbytes,
+        'throughput_mib_s': throughput(nbytes, batch),
+    }
+
+
+RUNNERS = {
+    'metadata': bench_metadata,
+    'many_small': bench_many_small,
+    'few_huge': bench_few_huge,
+    'engine': bench_engine,
+    'cli': bench_cli,
+    'playlist': bench_playlist,
+}
+
+
+# ------------------------------------------------------------------------
+# COMPARISON
+# ------------------------------------------------------------------------
+
+def flatten(value, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}, numbers only."""
+    flat = {}
+    for key, item in value.items():
+        path = f'{prefix}{key}'
+        if isinstance(item, dict):
+            flat.update(flatten(item, path + '.'))
+        elif isinstance(item, (int, float)) and not isinstance(item, bool):
+            flat[path] = item
+    return flat
+
+
+def compare(current, baseline):
+    """Per-metric change in percent, signed so that positive always means 'better'."""
+    now = flatten(current['scenarios'])
+    before = flatten(baseline.get('scenarios', {}))
+    changes = {}
+    for key in sorted(now.keys() & before.keys()):
+        if not before[key]:
+            continue
+        change = (now[key] - before[key]) / before[key] * 100
+        if not key.endswith(HIGHER_IS_BETTER):
+            change = -change
+        changes[key] = round(change, 1)
+    return changes
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--latency', type=float, default=0.0, help='Server first-byte latency (s)')
+    parser.add_argument('--bandwidth', type=int, default=None, help='Per-connection server limit (bytes/s)')
+    parser.add_argument('--jobs', type=int, default=4, help='Concurrent downloads')
+    parser.add_argument('--connections', type=int, default=1, help='Connections per download')
+    parser.add_argument('--quality', default='720p', help='DownloadWorker quality label')
+    parser.add_argument('--cli-quality', default='720', help='run_cli_mode height limit')
+    parser.add_argument('--small-count', type=int, default=40)
+    parser.add_argument('--small-size', type=int, default=256 * 1024)
+    parser.add_argument('--huge-count', type=int, default=3)
+    parser.add_argument('--huge-size', type=int, default=64 * 1024 * 1024)
+    parser.add_argument('--metadata-count', type=int, default=20)
+    parser.add_argument('--cli-count', type=int, default=5)
+    parser.add_argument('--playlist-count', type=int, default=120)
+    parser.add_argument('--output', metavar='FILE', help='Write the JSON result to FILE')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare against an earlier --output file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # Isolated cache/journal; must be set before any core module touches the data dir
+        os.environ['SMART_YTDL_HOME'] = os.path.join(work_dir, 'home')
+
+        from PyQt6.QtCore import QCoreApplication
+        from benchmarks.local_server import LocalMediaServer
+        from benchmarks import stub_extractor
+
+        app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])  # Signals need an application object
+        stub_extractor.install()
+
+        results = {}
+        with LocalMediaServer(latency=args.latency, bandwidth=args.bandwidth) as server:
+            for name in args.scenarios:
+                print(f'Running {name}...', file=sys.stderr)
+                results[name] = RUNNERS[name](server, args, work_dir)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'scenarios')},
+        'scenarios': results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['vs_baseline_pct'] = compare(report, json.load(f))
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Synthetic payload block; files are this pattern repeated up to the requested size
+BLOCK = bytes(range(256)) * 256  # 64 KiB
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+
+# Playlist API page size (entries are listed lazily, page by page)
+PLAYLIST_PAGE_SIZE = 50
+
+
+class MediaRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves synthetic media at '/media/<name>.<ext>?size=<bytes>'.
+    Supports HEAD, single byte ranges and an optional first-byte latency
+    (server.latency, seconds) to mimic a far-away CDN.
+
+    JSON metadata for the stub extractor (benchmarks/stub_extractor.py):
+      /api/video/<id>?size=<bytes>
+      /api/playlist/<id>?count=<n>&size=<bytes>&page=<k>
+    """
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        parsed = urlparse(self.path)
+        if parsed.path.startswith('/api/'):
+            self._serve_api(parsed, send_body)
+            return
+        if not parsed.path.startswith('/media/'):
+            self.send_error(404)
+            return
+
+        size = int(parse_qs(parsed.query).get('size', ['1048576'])[0])
+        start, end = 0, size - 1
+        status = 200
+
+        match = RANGE_RE.fullmatch(self.headers.get('Range', ''))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(0, size - int(match.group(2)))
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            status = 206
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        ext = parsed.path.rsplit('.', 1)[-1] if '.' in parsed.path else 'mp4'
+        content_type = 'audio/mp4' if ext == 'm4a' else f'video/{ext}'
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        if not send_body:
+            return
+
+        try:
+            remaining = end - start + 1
+            offset = start % len(BLOCK)
+            while remaining > 0:
+                chunk = BLOCK[offset:offset + remaining]
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                offset = 0
+                if self.server.bandwidth:
+                    # Per-connection throttle (bytes/s)
+                    time.sleep(len(chunk) / self.server.bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _serve_api(self, parsed, send_body):
+        query = parse_qs(parsed.query)
+        size = int(query.get('size', ['1048576'])[0])
+        parts = parsed.path.strip('/').split('/')
+        if len(parts) != 3 or parts[1] not in ('video', 'playlist'):
+            self.send_error(404)
+            return
+        kind, item_id = parts[1], parts[2]
+
+        if kind == 'video':
+            payload = {'id': item_id, 'title': f'Stub video {item_id}', 'size': size,
+                       'duration': max(1, size // (256 * 1024))}
+        else:
+            count = int(query.get('count', ['10'])[0])
+            page = int(query.get('page', ['0'])[0])
+            first = page * PLAYLIST_PAGE_SIZE
+            last = min(count, first + PLAYLIST_PAGE_SIZE)
+            payload = {
+                'id': item_id,
+                'title': f'Stub playlist {item_id}',
+                'entries': [{'id': f'{item_id}-{i}', 'title': f'Stub video {item_id}-{i}', 'size': size}
+                            for i in range(first, last)],
+                'has_more': last < count,
+            }
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+class LocalMediaServer:
+    """
+    Range-capable HTTP server on 127.0.0.1 running in a background thread.
+    Usable as a context manager; 'url(name, size)' builds a media URL.
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, port=0):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), MediaRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.bandwidth = bandwidth
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url(self, name, size):
+        return f'{self.base_url}/media/{name}?size={int(size)}'
+
+    def video_url(self, video_id, size):
+        """Page URL handled by the stub extractor (StubMediaIE)."""
+        return f'{self.base_url}/watch/{video_id}?size={int(size)}'
+
+    def playlist_url(self, playlist_id, count, size):
+        """Playlist URL handled by the stub extractor (StubPlaylistIE)."""
+        return f'{self.base_url}/playlist/{playlist_id}?count={int(count)}&size={int(size)}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,90 @@
+"""
+yt-dlp extractors for the local benchmark server (benchmarks/local_server.py).
+
+StubMediaIE handles '<server>/watch/<id>?size=N' and StubPlaylistIE handles
+'<server>/playlist/<id>?count=N&size=M'. Both read JSON metadata from the
+server, so extraction has real (configurable) latency, and return formats
+shaped like YouTube's: a 720p and a 360p progressive mp4 plus an m4a track.
+Call install() once to register them on every pooled YoutubeDL.
+"""
+import itertools
+from urllib.parse import urlparse
+from yt_dlp.extractor.common import InfoExtractor
+from core.session import get_ydl_pool
+
+_HOST_RE = r'https?://(?:127\.0\.0\.1|localhost):\d+'
+
+
+def _split(url):
+    parsed = urlparse(url)
+    return f'{parsed.scheme}://{parsed.netloc}', parsed.query
+
+
+class StubMediaIE(InfoExtractor):
+    IE_NAME = 'stubmedia'
+    _VALID_URL = _HOST_RE + r'/watch/(?P<id>[\w-]+)'
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        base, query = _split(url)
+        meta = self._download_json(f'{base}/api/video/{video_id}?{query}', video_id, note=False)
+        size = meta['size']
+
+        def media(format_id, ext, fraction, **fields):
+            part = max(1, int(size * fraction))
+            return dict({
+                'format_id': format_id,
+                'url': f'{base}/media/{video_id}-{format_id}.{ext}?size={part}',
+                'ext': ext,
+                'filesize': part,
+                'protocol': 'http',
+            }, **fields)
+
+        return {
+            'id': video_id,
+            'title': meta['title'],
+            'duration': meta['duration'],
+            'webpage_url': url,
+            'thumbnails': [{'url': f'{base}/media/{video_id}-thumb.jpg?size=4096', 'width': 120, 'height': 90}],
+            'formats': [
+                media('140', 'm4a', 1 / 8, vcodec='none', acodec='mp4a.40.2', abr=128, tbr=128),
+                media('18', 'mp4', 1 / 2, vcodec='avc1.42001E', acodec='mp4a.40.2', width=640, height=360, tbr=700),
+                media('22', 'mp4', 1, vcodec='avc1.64001F', acodec='mp4a.40.2', width=1280, height=720, tbr=1500),
+            ],
+        }
+
+
+class StubPlaylistIE(InfoExtractor):
+    IE_NAME = 'stubplaylist'
+    _VALID_URL = _HOST_RE + r'/playlist/(?P<id>[\w-]+)'
+
+    def _entries(self, base, query, playlist_id):
+        # One API request per page, made only when the consumer reaches it
+        for page in itertools.count():
+            data = self._download_json(f'{base}/api/playlist/{playlist_id}?{query}&page={page}',
+                                       playlist_id, note=False)
+            for entry in data['entries']:
+                yield self.url_result(f"{base}/watch/{entry['id']}?size={entry['size']}",
+                                      StubMediaIE.ie_key(), entry['id'], entry['title'])
+            if not data['has_more']:
+                return
+
+    def _real_extract(self, url):
+        playlist_id = self._match_id(url)
+        base, query = _split(url)
+        return self.playlist_result(self._entries(base, query, playlist_id), playlist_id,
+                                    f'Stub playlist {playlist_id}')
+
+
+def register(ydl):
+    """Registers the stub extractors on one YoutubeDL, ahead of the generic extractor."""
+    for ie_cls in (StubMediaIE, StubPlaylistIE):
+        ydl.add_info_extractor(ie_cls())
+    # add_info_extractor appends after 'Generic', which would claim any http URL first
+    stubs = {key: ydl._ies.pop(key) for key in (StubMediaIE.ie_key(), StubPlaylistIE.ie_key())}
+    ydl._ies = dict(stubs, **ydl._ies)
+
+
+def install():
+    """Registers the stub extractors on every instance of the shared YoutubeDL pool."""
+    get_ydl_pool().add_setup_hook(register)
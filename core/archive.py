@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+from core.config import get_data_dir
+from core.urls import cache_key
+
+# Bump when the table layout changes; older tables are dropped
+SCHEMA_VERSION = 1
+
+
+def info_key(info):
+    """Canonical key from extracted metadata ('youtube:<id>', 'vimeo:<id>', ...), or None."""
+    if not info or not info.get('id') or not info.get('extractor_key'):
+        return None
+    return f"{info['extractor_key'].lower()}:{info['id']}"
+
+
+class DownloadArchive:
+    """
+    Persistent record of finished downloads (SQLite), keyed by
+    (canonical video ID, quality label).
+    URLs are canonicalized with cache_key(), so 'youtu.be/X', 'watch?v=X&t=10'
+    and 'm.youtube.com/...' are one entry, and a lookup needs no network call.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_data_dir(), 'archive.db')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        if self._conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            self._conn.execute('DROP TABLE IF EXISTS downloads')
+            self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS downloads (
+                key TEXT NOT NULL,
+                quality TEXT NOT NULL,
+                title TEXT,
+                filepath TEXT,
+                finished REAL NOT NULL,
+                PRIMARY KEY (key, quality)
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    def get(self, url, quality):
+        """Returns the archive entry ({'title', 'filepath', 'finished'}) for a URL and quality, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT title, filepath, finished FROM downloads WHERE key = ? AND quality = ?',
+                (cache_key(url), quality)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'title': row[0], 'filepath': row[1], 'finished': row[2]}
+
+    def contains(self, url, quality):
+        return self.get(url, quality) is not None
+
+    def qualities(self, url):
+        """Quality labels already downloaded for a URL's video, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT quality FROM downloads WHERE key = ? ORDER BY finished', (cache_key(url),)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def record(self, url, quality, title=None, filepath=None, video_key=None):
+        """
+        Marks a download as finished. Stored under the URL's key and, when the
+        metadata names a different canonical ID ('video_key', see info_key()), under that too.
+        """
+        keys = {cache_key(url), video_key} - {None}
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO downloads (key, quality, title, filepath, finished) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [(key, quality, title, filepath, now) for key in keys]
+            )
+            self._conn.commit()
+
+    def forget(self, url, quality=None):
+        """Removes a video's entries (one quality, or all), so it downloads again."""
+        with self._lock:
+            if quality is None:
+                self._conn.execute('DELETE FROM downloads WHERE key = ?', (cache_key(url),))
+            else:
+                self._conn.execute('DELETE FROM downloads WHERE key = ? AND quality = ?',
+                                   (cache_key(url), quality))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM downloads').fetchone()[0]
+
+
+_default_archive = None
+_default_archive_lock = threading.Lock()
+
+
+def get_download_archive():
+    """Returns the process-wide DownloadArchive, creating it on first use."""
+    global _default_archive
+    with _default_archive_lock:
+        if _default_archive is None:
+            _default_archive = DownloadArchive()
+        return _default_archive
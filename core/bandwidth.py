@@ -0,0 +1,208 @@
+import re
+import threading
+import time
+from datetime import datetime
+
+# Weight of a prioritized job relative to a normal one (8:1 share when both are throttled)
+NORMAL_WEIGHT = 1.0
+URGENT_WEIGHT = 8.0
+
+# Bucket depth in seconds of traffic: small enough to keep the rate smooth
+BURST_SECONDS = 0.25
+MIN_BURST = 64 * 1024
+
+RATE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?\s*$', re.IGNORECASE)
+WINDOW_RE = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*=\s*(.+)$')
+UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_rate(text):
+    """
+    Parses '500K', '2M', '1.5MiB/s' or plain bytes into bytes/s.
+    '0', 'off' and 'none' mean unlimited (None).
+    """
+    if text is None or str(text).strip().lower() in ('', '0', 'off', 'none', 'unlimited'):
+        return None
+    match = RATE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid rate: {text!r} (expected e.g. 500K, 2M)")
+    return int(float(match.group(1)) * UNITS[match.group(2).lower()]) or None
+
+
+def parse_schedule(text):
+    """
+    Parses 'HH:MM-HH:MM=RATE' windows separated by commas, e.g.
+    '09:00-18:00=2M,18:00-09:00=off'. Windows may wrap past midnight.
+    Returns [(start_minute, end_minute, bytes_per_sec or None), ...].
+    """
+    windows = []
+    for part in filter(None, (p.strip() for p in (text or '').split(','))):
+        match = WINDOW_RE.match(part)
+        if not match:
+            raise ValueError(f"Invalid schedule window: {part!r} (expected HH:MM-HH:MM=RATE)")
+        h1, m1, h2, m2, rate = match.groups()
+        windows.append((int(h1) * 60 + int(m1), int(h2) * 60 + int(m2), parse_rate(rate)))
+    return windows
+
+
+def format_rate(rate):
+    return "unlimited" if not rate else f"{rate / (1024 * 1024):.2f} MiB/s"
+
+
+class BandwidthGovernor:
+    """
+    Process-wide token bucket shared by every download.
+
+    The refill rate is the scheduled limit for the current time of day,
+    or the global cap outside any window (None = unlimited). Waiting jobs
+    are served in weighted-fair order: a job's bytes advance its virtual
+    clock by bytes / weight, and the job furthest behind goes next, so an
+    urgent job takes most of the bandwidth while the others keep moving.
+    """
+
+    def __init__(self, rate=None, schedule=None):
+        self.rate = rate
+        self.schedule = list(schedule or [])
+
+        self._cond = threading.Condition()
+        self._tokens = 0.0
+        self._last_refill = time.monotonic()
+        self._vclock = 0.0  # Virtual time of the last served request
+        self._waiting = []  # Tickets blocked on tokens
+        self.throttled_seconds = 0.0  # Total time jobs spent waiting (for stats)
+
+    # ------------------------------------------------------------------------
+    # CONFIGURATION (any thread, takes effect immediately)
+    # ------------------------------------------------------------------------
+
+    def set_rate(self, rate):
+        """Sets the global cap in bytes/s (None or 0 = unlimited)."""
+        with self._cond:
+            self.rate = rate or None
+            self._cond.notify_all()
+
+    def set_schedule(self, schedule):
+        """Sets time-of-day windows, see parse_schedule()."""
+        with self._cond:
+            self.schedule = list(schedule or [])
+            self._cond.notify_all()
+
+    def current_rate(self, now=None):
+        """Limit in force right now (bytes/s), or None if unlimited."""
+        if self.schedule:
+            now = now or datetime.now()
+            minute = now.hour * 60 + now.minute
+            for start, end, rate in self.schedule:
+                inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+                if inside:
+                    return rate
+        return self.rate
+
+    def ticket(self, weight=NORMAL_WEIGHT):
+        """Returns a handle for one job to draw bandwidth with."""
+        return BandwidthTicket(self, weight)
+
+    # ------------------------------------------------------------------------
+    # TOKEN BUCKET
+    # ------------------------------------------------------------------------
+
+    def _consume(self, ticket, nbytes):
+        with self._cond:
+            rate = self.current_rate()
+            if rate is None:
+                ticket.vtime = self._vclock
+                return
+
+            ticket.vtime = max(ticket.vtime, self._vclock) + nbytes / ticket.weight
+            self._waiting.append(ticket)
+            started = time.monotonic()
+            try:
+                while True:
+                    if ticket.cancelled:
+                        raise Exception("Download cancelled by user")
+                    rate = self.current_rate()
+                    if rate is None:
+                        break
+                    self._refill(rate)
+                    first = min(self._waiting, key=lambda t: t.vtime)
+                    if first is ticket and self._tokens > 0:
+                        # May go negative: a large block is paid back before the next one
+                        self._tokens -= nbytes
+                        break
+                    deficit = max(0.0, -self._tokens) + 1
+                    self._cond.wait(min(0.1, deficit / rate))
+            finally:
+                self._waiting.remove(ticket)
+                self._vclock = max(self._vclock, ticket.vtime - nbytes / ticket.weight)
+                self.throttled_seconds += time.monotonic() - started
+                self._cond.notify_all()
+
+    def _refill(self, rate):
+        now = time.monotonic()
+        capacity = max(MIN_BURST, rate * BURST_SECONDS)
+        self._tokens = min(capacity, self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+
+class BandwidthTicket:
+    """
+    One job's share of the governor. 'weight' can be changed while the job runs.
+    Use 'hook' as a yt-dlp progress hook, or call consume() directly.
+    """
+
+    def __init__(self, governor, weight=NORMAL_WEIGHT):
+        self.governor = governor
+        self.weight = max(0.1, float(weight))
+        self.vtime = 0.0
+        self.cancelled = False
+        self._seen = {}  # file -> bytes already paid for (or on disk before this session, see start_file)
+
+    def consume(self, nbytes):
+        """Blocks until 'nbytes' may be transferred."""
+        if nbytes > 0:
+            self.governor._consume(self, nbytes)
+
+    def set_weight(self, weight):
+        self.weight = max(0.1, float(weight))
+
+    def cancel(self):
+        """Makes a blocked (or later) consume() raise, so a stopped job is not held by the limiter."""
+        self.cancelled = True
+        with self.governor._cond:
+            self.governor._cond.notify_all()
+
+    def start_file(self, tmpfilename, offset):
+        """
+        Called before a file is downloaded: 'offset' bytes of it are already
+        on disk (a resumed '.part', 0 for a fresh file). Only bytes reported
+        beyond that are paid for.
+        """
+        self._seen[tmpfilename] = offset
+
+    def hook(self, d):
+        """yt-dlp progress hook: pays for the bytes received since the previous call."""
+        if d.get('status') != 'downloading' or d.get('throttled'):
+            return  # 'throttled': the downloader already paid per chunk
+        key = d.get('tmpfilename') or d.get('filename')
+        downloaded = d.get('downloaded_bytes') or 0
+        # On a resumed .part downloaded_bytes includes the earlier session's
+        # prefix, which start_file() recorded as already paid for
+        previous = self._seen.get(key, 0)
+        if downloaded < previous:
+            previous = 0  # The server ignored the resume: the file starts over
+        self._seen[key] = downloaded
+        if downloaded > previous:
+            self.consume(downloaded - previous)
+
+
+_default_governor = None
+_default_governor_lock = threading.Lock()
+
+
+def get_bandwidth_governor():
+    """Returns the process-wide BandwidthGovernor."""
+    global _default_governor
+    with _default_governor_lock:
+        if _default_governor is None:
+            _default_governor = BandwidthGovernor()
+        return _default_governor
@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from core.config import get_data_dir
+from core.urls import cache_key
+
+# Defaults: metadata rarely changes; full info dicts dominate the size budget
+DEFAULT_TTL = 6 * 60 * 60  # seconds
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Bump when the table layout changes; older tables are dropped
+SCHEMA_VERSION = 3
+
+
+class MetadataCache:
+    """
+    On-disk cache for VideoInfoWorker results (SQLite).
+    Entries are keyed by canonical video ID, expire after 'ttl' seconds and
+    are evicted least-recently-used first once 'max_entries' or 'max_bytes'
+    is exceeded. Safe to share between threads.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or os.path.join(get_data_dir(), 'metadata.db')
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # Counters for this process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        if self._conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            self._conn.execute('DROP TABLE IF EXISTS metadata')
+            self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                data BLOB NOT NULL, -- zlib-compressed JSON
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_metadata_access ON metadata(last_access)')
+        self._conn.commit()
+
+    def get(self, url):
+        """Returns the cached result dict for a URL, or None on a miss or expired entry."""
+        key = cache_key(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data, created FROM metadata WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            data, created = row
+            if now - created > self.ttl:
+                self._conn.execute('DELETE FROM metadata WHERE key = ?', (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute('UPDATE metadata SET last_access = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        result = json.loads(zlib.decompress(data))
+        # The caller asked with this URL; keep it for the queue entry
+        result['url'] = url
+        return result
+
+    def put(self, url, result):
+        """Stores a result dict (as built by VideoInfoWorker) under the URL's video ID."""
+        key = cache_key(url)
+        # Full info dicts are large but very repetitive JSON
+        data = zlib.compress(json.dumps(result).encode('utf-8'))
+        size = len(data)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO metadata (key, data, size, created, last_access) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, data, size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drops expired rows, then least-recently-used rows until within limits."""
+        cur = self._conn.execute('DELETE FROM metadata WHERE created < ?', (time.time() - self.ttl,))
+        self.evictions += max(cur.rowcount, 0)
+
+        count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM metadata').fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        victims = []
+        for key, size in self._conn.execute('SELECT key, size FROM metadata ORDER BY last_access ASC'):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+
+        self._conn.executemany('DELETE FROM metadata WHERE key = ?', victims)
+        self.evictions += len(victims)
+
+    def stats(self):
+        """Returns hit/miss counters and current usage."""
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM metadata').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': count,
+            'bytes': total,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM metadata')
+            self._conn.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """Returns the process-wide MetadataCache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache()
+        return _default_cache
@@ -0,0 +1,218 @@
+import logging
+import os
+import signal
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+# How often a paused job re-checks for cancellation
+PAUSE_POLL = 0.25  # seconds
+
+_local = threading.local()
+_tracking_lock = threading.Lock()
+_tracking_installed = False
+
+
+class DownloadCancelled(Exception):
+    def __init__(self):
+        super().__init__("Download cancelled by user")
+
+
+class CancelToken:
+    """
+    Cooperative cancel / pause switch for one job, safe to use from any thread.
+
+    The job's own thread calls check() at every opportunity (progress hooks,
+    yt-dlp log messages, each received chunk): it raises DownloadCancelled
+    once cancelled and blocks while paused. Things that block without ever
+    reaching a check (open sockets, FFmpeg) register a callback or their
+    process, which cancel() closes or kills right away.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._cancelled = False
+        self._paused = False
+        self._callbacks = []
+        self._processes = []
+
+    def __getstate__(self):
+        # Crosses a process boundary as a fresh token
+        return {}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def paused(self):
+        return self._paused and not self._cancelled
+
+    def cancel(self):
+        with self._cond:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+            processes, self._processes = self._processes, []
+            self._cond.notify_all()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log.warning("Cancel callback failed: %s", e)
+        for proc in processes:
+            _signal_process(proc, None)
+
+    def pause(self):
+        """Holds the job at its next check(); a running FFmpeg is stopped too (POSIX)."""
+        with self._cond:
+            if self._paused or self._cancelled:
+                return
+            self._paused = True
+            processes = list(self._processes)
+        for proc in processes:
+            _signal_process(proc, getattr(signal, 'SIGSTOP', None))
+
+    def resume(self):
+        with self._cond:
+            if not self._paused:
+                return
+            self._paused = False
+            processes = list(self._processes)
+            self._cond.notify_all()
+        for proc in processes:
+            _signal_process(proc, getattr(signal, 'SIGCONT', None))
+
+    def check(self):
+        """Raises DownloadCancelled if cancelled; blocks while paused."""
+        if self._paused:
+            with self._cond:
+                while self._paused and not self._cancelled:
+                    self._cond.wait(PAUSE_POLL)
+        if self._cancelled:
+            raise DownloadCancelled()
+
+    def add_callback(self, callback):
+        """
+        Runs 'callback()' on cancel (immediately if already cancelled), e.g. to
+        close a socket a thread is blocked on. Returns a function that unregisters it.
+        """
+        with self._cond:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return lambda: self._discard(self._callbacks, callback)
+        callback()
+        return lambda: None
+
+    def track_process(self, proc):
+        """Kills 'proc' (a subprocess.Popen) on cancel and stops it while paused."""
+        with self._cond:
+            self._processes = [p for p in self._processes if p.poll() is None]
+            if not self._cancelled:
+                self._processes.append(proc)
+                if self._paused:
+                    _signal_process(proc, getattr(signal, 'SIGSTOP', None))
+                return
+        _signal_process(proc, None)
+
+    def bind(self):
+        """Context manager making this the current thread's token (see current_token())."""
+        return _Binding(self)
+
+    def _discard(self, items, item):
+        with self._cond:
+            if item in items:
+                items.remove(item)
+
+
+class _Binding:
+    def __init__(self, token):
+        self.token = token
+
+    def __enter__(self):
+        self.previous = getattr(_local, 'token', None)
+        _local.token = self.token
+        return self.token
+
+    def __exit__(self, *exc):
+        _local.token = self.previous
+
+
+def current_token():
+    """The CancelToken bound to the calling thread, or None."""
+    return getattr(_local, 'token', None)
+
+
+def _signal_process(proc, sig):
+    """Sends 'sig' to a running process (None: kill). Platforms without the signal are skipped."""
+    if proc.poll() is not None:
+        return
+    try:
+        if sig is None:
+            proc.kill()
+        elif os.name == 'posix':
+            os.kill(proc.pid, sig)
+    except OSError:
+        pass  # Exited meanwhile
+
+
+def track_subprocesses():
+    """
+    Registers every subprocess yt-dlp starts (FFmpeg merges and conversions)
+    with the starting thread's CancelToken, so cancel() can kill it and
+    pause() can stop it. Installed once per process.
+    """
+    global _tracking_installed
+    with _tracking_lock:
+        if _tracking_installed:
+            return
+        from yt_dlp.utils import Popen
+        original_init = Popen.__init__
+
+        def __init__(proc, *args, **kwargs):
+            original_init(proc, *args, **kwargs)
+            token = current_token()
+            if token is not None:
+                token.track_process(proc)
+
+        Popen.__init__ = __init__
+        _tracking_installed = True
+
+
+class CancellableLogger:
+    """
+    yt-dlp logger that checks a CancelToken on every message. Extraction and
+    retry loops log before each request, so a cancelled (or paused) job stops
+    there even when no progress hook would run. Messages go on to 'inner'.
+    """
+
+    def __init__(self, token, inner=None):
+        self.token = token
+        self.inner = inner
+
+    def debug(self, msg):
+        self.token.check()
+        if self.inner is not None:
+            self.inner.debug(msg)
+
+    def info(self, msg):
+        self.token.check()
+        if self.inner is not None:
+            self.inner.info(msg)
+
+    def warning(self, msg):
+        self.token.check()
+        if self.inner is not None:
+            self.inner.warning(msg)
+
+    def error(self, msg):
+        if self.inner is not None:
+            self.inner.error(msg)
+        else:
+            # Same destination yt-dlp uses without a logger
+            print(msg, file=sys.stderr)
@@ -1,49 +1,372 @@
+import logging
 import os
+import re
 import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.bandwidth import parse_rate
 
-def clear_downloads_folder():
+log = logging.getLogger(__name__)
+
+# Environment variables that turn on retention after every finished download
+QUOTA_ENV = 'SMART_YTDL_QUOTA'  # e.g. '50G'
+MAX_AGE_ENV = 'SMART_YTDL_MAX_AGE'  # e.g. '30d'
+EVICTION_ENV = 'SMART_YTDL_EVICTION'  # 'lru' or 'oldest'
+
+# Eviction orders once a quota is exceeded
+EVICT_LRU = 'lru'  # Least recently used (last access or modification) first
+EVICT_OLDEST = 'oldest'  # Oldest download (time it arrived, not its upload date) first
+EVICTION_ORDERS = (EVICT_LRU, EVICT_OLDEST)
+
+# Files that belong to a download still in progress (yt-dlp, segmented mode, atomic writes)
+IN_PROGRESS_SUFFIXES = ('.part', '.ytdl', '.segments', '.tmp')
+IN_PROGRESS_MARKERS = ('.part-Frag', '.temp.')
+# Single-format downloads waiting to be merged ('video.f137.mp4')
+INTERMEDIATE_RE = re.compile(r'\.f\d+\.[^.]+$')
+
+DELETE_WORKERS = 8
+AGE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhdw]?)\s*$', re.IGNORECASE)
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400, '': 86400}
+
+
+def parse_size(text):
+    """Parses '500M', '50G' or plain bytes. '0', 'off' and 'none' mean no quota (None)."""
+    try:
+        return parse_rate(text)
+    except ValueError:
+        raise ValueError(f"Invalid size: {text!r} (expected e.g. 500M, 50G)") from None
+
+
+def parse_age(text):
+    """Parses '90m', '12h', '30d', '2w' into seconds; a plain number means days. 'off' means None."""
+    if text is None or str(text).strip().lower() in ('', '0', 'off', 'none'):
+        return None
+    match = AGE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid age: {text!r} (expected e.g. 12h, 30d)")
+    return float(match.group(1)) * AGE_UNITS[match.group(2).lower()] or None
+
+
+def is_in_progress(name):
+    return (name.endswith(IN_PROGRESS_SUFFIXES) or any(marker in name for marker in IN_PROGRESS_MARKERS)
+            or INTERMEDIATE_RE.search(name) is not None)
+
+
+def _stem(path):
+    return os.path.splitext(path)[0]
+
+
+class RetentionPolicy:
+    """Limits for a downloads folder: total size, file age, and which files go first."""
+
+    __slots__ = ('max_bytes', 'max_age', 'order')
+
+    def __init__(self, max_bytes=None, max_age=None, order=EVICT_LRU):
+        if order not in EVICTION_ORDERS:
+            raise ValueError(f"Invalid eviction order: {order!r} (expected {' or '.join(EVICTION_ORDERS)})")
+        self.max_bytes = max_bytes  # None: no size quota
+        self.max_age = max_age  # Seconds; None: no age limit
+        self.order = order
+
+    @property
+    def enabled(self):
+        return self.max_bytes is not None or self.max_age is not None
+
+    @classmethod
+    def from_env(cls):
+        """Policy from SMART_YTDL_QUOTA / SMART_YTDL_MAX_AGE / SMART_YTDL_EVICTION (disabled if unset)."""
+        return cls(parse_size(os.environ.get(QUOTA_ENV)), parse_age(os.environ.get(MAX_AGE_ENV)),
+                   (os.environ.get(EVICTION_ENV) or EVICT_LRU).strip().lower())
+
+
+def scan_files(root, include_partial=False):
+    """
+    Yields (path, size, last_used, downloaded) for every file under 'root',
+    using the stat data os.scandir already has (one stat per file at most).
+    'downloaded' is the mtime, which downloads keep as the time they arrived
+    (see 'updatetime' in core.engine); ctime is not used, since chmod, renames
+    and moves reset it. In-progress download files are skipped unless 'include_partial'.
+    """
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    if not include_partial and is_in_progress(entry.name):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue  # Vanished while scanning
+                yield entry.path, st.st_size, max(st.st_atime, st.st_mtime), st.st_mtime
+
+
+def plan_retention(root, policy, protect=(), now=None):
+    """
+    Decides which files to delete so 'root' satisfies 'policy'.
+    Files downloaded more than max_age ago go first, then files in eviction
+    order until the rest fits in max_bytes. Paths in 'protect' are never
+    chosen, nor are files of the same video next to them ('name.*', e.g. the
+    output of a conversion still running).
+    Returns (victims [(path, size)], total_bytes_before).
+    """
+    now = time.time() if now is None else now
+    protect = {os.path.abspath(p) for p in protect if p}
+    stems = {_stem(p) for p in protect}
+    sort_key = 2 if policy.order == EVICT_LRU else 3
+
+    victims = []
+    kept = []
+    total = 0
+    for item in scan_files(root):
+        total += item[1]
+        path = os.path.abspath(item[0])
+        if path in protect or _stem(path) in stems or _stem(_stem(path)) in stems:
+            continue
+        if policy.max_age is not None and now - item[3] > policy.max_age:
+            victims.append((item[0], item[1]))
+        else:
+            kept.append(item)
+
+    if policy.max_bytes is not None:
+        remaining = total - sum(size for _, size in victims)
+        if remaining > policy.max_bytes:
+            kept.sort(key=lambda item: item[sort_key])
+            for item in kept:
+                if remaining <= policy.max_bytes:
+                    break
+                victims.append((item[0], item[1]))
+                remaining -= item[1]
+    return victims, total
+
+
+def delete_files(paths, workers=DELETE_WORKERS):
+    """Deletes files in parallel. Returns (deleted, errors [(path, message)])."""
+    errors = []
+
+    def delete(path):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False  # Already gone
+        except OSError as e:
+            errors.append((path, str(e)))
+            return False
+
+    paths = list(paths)
+    if len(paths) <= 1:
+        deleted = sum(map(delete, paths))
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(paths)), thread_name_prefix='retention') as pool:
+            deleted = sum(pool.map(delete, paths))
+    return deleted, errors
+
+
+def remove_empty_dirs(root):
+    """Removes directories under 'root' (not 'root' itself) left empty by eviction."""
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if dirpath != root and not dirnames and not filenames:
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+
+def enforce_retention(root, policy, dry_run=False, protect=(), workers=DELETE_WORKERS, plan=None):
     """
-    Deletes all files inside the 'downloads' directory.
-    Asks for user confirmation before deletion.
+    Applies 'policy' to 'root' ('plan' reuses a plan_retention() result).
+    Returns a report dict: 'scanned_bytes', 'victims' (count), 'freed_bytes',
+    'paths', 'deleted', 'errors' and 'dry_run'.
+    With 'dry_run' nothing is deleted and 'deleted' is 0.
+    """
+    victims, total = plan or plan_retention(root, policy, protect)
+    report = {
+        'scanned_bytes': total,
+        'victims': len(victims),
+        'freed_bytes': sum(size for _, size in victims),
+        'paths': [path for path, _ in victims],
+        'deleted': 0,
+        'errors': [],
+        'dry_run': dry_run,
+    }
+    if victims and not dry_run:
+        report['deleted'], report['errors'] = delete_files(report['paths'], workers)
+        remove_empty_dirs(root)
+    return report
+
+
+class RetentionManager:
+    """
+    Runs the retention policy in the background after each finished download,
+    so the download volume never fills up. Runs for the same folder are
+    coalesced: requests that arrive while one is running trigger one more pass.
+    Files held with hold() (downloads waiting for their conversion) are
+    protected by every pass until release().
+    """
+
+    def __init__(self, policy=None):
+        self.policy = policy or RetentionPolicy.from_env()
+        self._lock = threading.Lock()
+        self._pending = {}  # root -> set of paths to protect on the next pass
+        self._running = set()
+        self._held = {}  # path -> hold count
+
+    def hold(self, path):
+        """Protects 'path' (and its conversion outputs) from eviction until release()."""
+        if not path:
+            return
+        with self._lock:
+            self._held[path] = self._held.get(path, 0) + 1
+
+    def release(self, path):
+        with self._lock:
+            count = self._held.get(path, 0) - 1
+            if count > 0:
+                self._held[path] = count
+            else:
+                self._held.pop(path, None)
+
+    def held(self):
+        with self._lock:
+            return set(self._held)
+
+    def after_job(self, root, protect=None):
+        """Schedules a retention pass over 'root' (no-op without a policy)."""
+        if not self.policy.enabled or not root:
+            return
+        with self._lock:
+            self._pending.setdefault(root, set()).update([protect] if protect else [])
+            if root in self._running:
+                return
+            self._running.add(root)
+        threading.Thread(target=self._run, args=(root,), name='retention', daemon=True).start()
+
+    def _run(self, root):
+        while True:
+            with self._lock:
+                protect = self._pending.pop(root, None)
+                if protect is None:
+                    self._running.discard(root)
+                    return
+            try:
+                report = enforce_retention(root, self.policy, protect=protect | self.held())
+                if report['deleted']:
+                    log.info("Retention freed %.1f MiB (%d files) in %s",
+                             report['freed_bytes'] / (1024 * 1024), report['deleted'], root)
+            except Exception as e:
+                log.warning("Retention pass failed for %s: %s", root, e)
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_retention_manager():
+    """Returns the process-wide RetentionManager (policy from the environment until set)."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = RetentionManager()
+        return _default_manager
+
+
+def _format_size(size):
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+def _print_report(report, root):
+    if report['dry_run']:
+        for path in report['paths']:
+            print(f"  would delete {os.path.relpath(path, root)}")
+        print(f"🔎 Dry run: {report['victims']} files, {_format_size(report['freed_bytes'])} would be freed "
+              f"(of {_format_size(report['scanned_bytes'])}).")
+        return
+    for path, message in report['errors']:
+        print(f"❌ Failed to delete {os.path.relpath(path, root)}. Reason: {message}")
+    print(f"✅ Success! Deleted {report['deleted']} files, freed {_format_size(report['freed_bytes'])}.")
+
+
+def run_retention(policy, assume_yes=False, dry_run=False, downloads_path=None):
+    """
+    CLI entry point: applies 'policy' to the downloads folder.
+    Asks for confirmation unless 'assume_yes' or 'dry_run' (or stdin is not a terminal).
+    Returns the process exit code.
+    """
+    downloads_path = downloads_path or os.path.join(os.getcwd(), 'downloads')
+    if not os.path.isdir(downloads_path):
+        print(f"⚠️ Directory not found: {downloads_path}")
+        return 0
+
+    victims, total = plan_retention(downloads_path, policy)
+    if not victims:
+        print(f"✅ Nothing to delete ({_format_size(total)} in {downloads_path}).")
+        return 0
+    if not dry_run and not _confirm(
+            f"🗑️  {len(victims)} files ({_format_size(sum(s for _, s in victims))}) will be deleted "
+            f"from {downloads_path}.", assume_yes):
+        print("❌ Operation cancelled.")
+        return 1
+
+    report = enforce_retention(downloads_path, policy, dry_run=dry_run, plan=(victims, total))
+    _print_report(report, downloads_path)
+    return 1 if report['errors'] else 0
+
+
+def clear_downloads_folder(assume_yes=False, dry_run=False):
+    """
+    Deletes all files inside the 'downloads' directory (in-progress downloads included).
+    Asks for user confirmation before deletion unless 'assume_yes'.
+    Returns the process exit code.
     """
     downloads_path = os.path.join(os.getcwd(), 'downloads')
 
     # Check if directory exists
     if not os.path.exists(downloads_path):
         print(f"⚠️ Directory not found: {downloads_path}")
-        return
+        return 0
 
-    # Check if directory is empty
-    if not os.listdir(downloads_path):
+    # Top-level entries only: folders are removed as a whole
+    with os.scandir(downloads_path) as it:
+        entries = [entry.path for entry in it]
+    if not entries:
         print("✅ The downloads folder is already empty.")
-        return
+        return 0
+
+    if dry_run:
+        for path in entries:
+            print(f"  would delete {os.path.basename(path)}")
+        print(f"🔎 Dry run: {len(entries)} items would be deleted.")
+        return 0
 
     print(f"🗑️  Target Directory: {downloads_path}")
-    print("⚠️  WARNING: This will delete ALL files in this folder.")
-    
-    # User Confirmation
-    confirm = input("❓ Are you sure? (y/n): ").strip().lower()
-    
-    if confirm != 'y':
+    if not _confirm("⚠️  WARNING: This will delete ALL files in this folder.", assume_yes):
         print("❌ Operation cancelled.")
-        return
+        return 1
+
+    deleted, errors = delete_files(entries)
+    for path, message in errors:
+        print(f"❌ Failed to delete {os.path.basename(path)}. Reason: {message}")
+    print(f"✅ Success! Deleted {deleted} items.")
+    return 1 if errors else 0
 
-    # Deletion Logic
-    deleted_count = 0
-    try:
-        for filename in os.listdir(downloads_path):
-            file_path = os.path.join(downloads_path, filename)
-            try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path) # Delete file
-                    deleted_count += 1
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path) # Delete folder
-                    deleted_count += 1
-            except Exception as e:
-                print(f"❌ Failed to delete {filename}. Reason: {e}")
-        
-        print(f"✅ Success! Deleted {deleted_count} items.")
 
-    except Exception as e:
-        print(f"❌ Critical Error: {e}")
\ No newline at end of file
+def _confirm(message, assume_yes):
+    print(message)
+    if assume_yes:
+        return True
+    if not os.isatty(0):
+        # cron / pipes: never block on a prompt; require --yes instead
+        print("❌ Not a terminal: pass --yes to delete without confirmation.")
+        return False
+    return input("❓ Are you sure? (y/n): ").strip().lower() == 'y'
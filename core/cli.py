@@ -1,24 +1,31 @@
 import sys
 import os
-import re
-from yt_dlp import YoutubeDL
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.session import set_pool_size
+from core.bandwidth import get_bandwidth_governor
+from core.engine import (DownloadJob, run_download, quality_label, clean_error, get_postprocess_pool,
+                         EVENT_STATUS, EVENT_PROGRESS)
+from core.metrics import get_metrics_recorder
+from core.archive import get_download_archive
+from core.metadata import DEFAULT_AUDIO_FORMAT
+from core.progress import format_speed, format_eta
+from core.playlist import expand_urls
+from core.urls import cache_key, is_playlist_url
 
-def cli_progress_hook(d):
+def cli_progress(event, data):
     """
-    Callback for CLI progress bar.
+    Engine event callback for the CLI progress bar.
     Prints progress to the same line in the terminal using carriage return.
     """
-    if d['status'] == 'downloading':
-        try:
-            p = d.get('_percent_str', '0%').replace('%','')
-            # Clean ANSI colors
-            p = re.sub(r'\x1b\[[0-9;]*m', '', p)
-            progress = float(p)
-        except:
-            progress = 0
-        
-        speed = d.get('_speed_str', 'N/A')
-        eta = d.get('_eta_str', 'N/A')
+    if event == EVENT_STATUS:
+        print(f"⚡ {data}")
+
+    elif event == EVENT_PROGRESS and data['status'] == 'downloading':
+        progress = data['percent']
+        speed = format_speed(data['speed'])
+        eta = format_eta(data['eta'])
         
         # Create visual bar: [======    ]
         bar_length = 30
@@ -29,48 +36,280 @@ def cli_progress_hook(d):
         sys.stdout.write(f'\r⏳ Downloading: |{bar}| {progress:.1f}% | Speed: {speed} | ETA: {eta}')
         sys.stdout.flush()
 
-    elif d['status'] == 'finished':
+    elif event == EVENT_PROGRESS and data['status'] == 'finished':
         sys.stdout.write('\n✅ Download complete! Processing...\n')
 
-def run_cli_mode(url, audio_only=False, quality="1080"):
+def get_save_path():
+    """Returns the 'downloads' folder in the current directory, creating it if needed."""
+    save_path = os.path.join(os.getcwd(), 'downloads')
+    if not os.path.exists(save_path):
+        os.makedirs(save_path)
+    return save_path
+
+def build_cli_job(url, save_path, audio_only=False, quality="1080", connections=1, source='cli',
+                  defer_postprocessing=False, audio_format=DEFAULT_AUDIO_FORMAT):
+    """
+    Builds the engine job used by single and batch CLI downloads (and the daemon).
+    Every job draws from the shared bandwidth governor (see --limit), records metrics
+    and is added to the download archive when it finishes.
+    """
+    label = quality_label(audio_only, quality, audio_format)
+    return DownloadJob(
+        url, label, save_path,
+        connections=connections,
+        bandwidth_ticket=get_bandwidth_governor().ticket(),
+        metrics=get_metrics_recorder().job(url, source, label),
+        defer_postprocessing=defer_postprocessing,
+        archive=get_download_archive(),
+    )
+
+def run_cli_mode(url, audio_only=False, quality="1080", connections=1, force=False,
+                 audio_format=DEFAULT_AUDIO_FORMAT):
     """
     Main entry point for the CLI functionality.
+    Returns True if the download succeeded (or was already in the archive).
     """
     print(f"🚀 Starting CLI Downloader")
     print(f"🔗 URL: {url}")
-    print(f"🎧 Mode: {'Audio Only (MP3)' if audio_only else 'Video (MP4)'}")
-    
+    label = quality_label(audio_only, quality, audio_format)
+    print(f"🎧 Mode: {label if audio_only else 'Video (MP4)'}")
+
+    # Checked before any network call; --force downloads anyway
+    archived = None if force else get_download_archive().get(url, label)
+    if archived is not None:
+        print(f"⏭️ Already downloaded: {archived['filepath'] or archived['title']} (use --force to download again)")
+        return True
+
     # Save to 'downloads' folder in the current directory
-    save_path = os.path.join(os.getcwd(), 'downloads')
-    if not os.path.exists(save_path):
-        os.makedirs(save_path)
+    save_path = get_save_path()
 
-    # yt-dlp configuration
-    ydl_opts = {
-        'outtmpl': os.path.join(save_path, '%(title)s.%(ext)s'),
-        'progress_hooks': [cli_progress_hook],
-        'noplaylist': True,
-        'quiet': True,
-        'no_warnings': True,
-        # Format selection logic
-        'format': 'bestaudio/best' if audio_only else f'bestvideo[height<={quality}]+bestaudio/best[height<={quality}]/best',
-        'http_headers': {'User-Agent': 'Mozilla/5.0'},
-    }
-
-    # FFmpeg Post-processing for Audio
-    if audio_only:
-        ydl_opts['postprocessors'] = [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }]
-    else:
-        # Merge video+audio into mp4
-        ydl_opts['merge_output_format'] = 'mp4'
+    job = build_cli_job(url, save_path, audio_only, quality, connections, audio_format=audio_format)
 
     try:
-        with YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        run_download(job, cli_progress)
         print(f"🎉 Saved to: {save_path}")
+        return True
     except Exception as e:
-        print(f"\n❌ Error: {str(e)}")
\ No newline at end of file
+        print(f"\n❌ Error: {str(e)}")
+        return False
+
+# ------------------------------------------------------------------------
+# BATCH MODE
+# ------------------------------------------------------------------------
+
+def read_batch_urls(source):
+    """
+    Reads URLs from a file path, or from stdin if source is '-'.
+    Blank lines and '#' comments are skipped; duplicates are dropped (first one wins).
+    """
+    if source == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    urls = []
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or line in seen:
+            continue
+        seen.add(line)
+        urls.append(line)
+    return urls
+
+class BatchProgress:
+    """
+    Combined progress line for a batch run.
+    Worker threads report through per-URL hooks; the line is redrawn at most
+    every 'interval' seconds so parallel hooks don't fight over the terminal.
+    """
+
+    def __init__(self, total, interval=0.25):
+        self.total = total  # None while playlists are still being expanded
+        self.discovered = 0
+        self.interval = interval
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0  # Already in the download archive
+        self.postprocessing = 0  # Downloaded, waiting for / running their conversion
+        self._active = {}  # url -> (downloaded_bytes, total_bytes, speed)
+        self._lock = threading.Lock()
+        self._last_draw = 0.0
+
+    def make_listener(self, url):
+        """Engine event callback for one URL."""
+        def on_event(event, data):
+            if event == EVENT_PROGRESS and data['status'] == 'downloading':
+                with self._lock:
+                    self._active[url] = (data['downloaded_bytes'], data['total_bytes'], data['speed'])
+                self.draw()
+        return on_event
+
+    def job_skipped(self, url):
+        with self._lock:
+            self.skipped += 1
+        self.draw(force=True)
+
+    def job_downloaded(self, url):
+        """The download finished; its conversion was queued on the postprocessing pool."""
+        with self._lock:
+            self._active.pop(url, None)
+            self.postprocessing += 1
+        self.draw(force=True)
+
+    def job_done(self, url, ok, postprocessed=False):
+        with self._lock:
+            self._active.pop(url, None)
+            if postprocessed:
+                self.postprocessing -= 1
+            if ok:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+        self.draw(force=True)
+
+    def draw(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_draw < self.interval:
+                return
+            self._last_draw = now
+
+            done = self.succeeded + self.failed + self.skipped
+            downloaded = sum(a[0] for a in self._active.values())
+            total = sum(a[1] for a in self._active.values())
+            speed = sum(a[2] for a in self._active.values()) / (1024 * 1024)
+            percent = (downloaded / total * 100) if total else 0.0
+
+            total_text = self.total if self.total is not None else f'{self.discovered}+'
+            line = (f'\r📦 [{done}/{total_text}] ✅ {self.succeeded} ❌ {self.failed} ⏭️ {self.skipped} | '
+                    f'⏳ {len(self._active)} active ({percent:.1f}%) | ⚙️ {self.postprocessing} | '
+                    f'{speed:.2f} MiB/s')
+            sys.stdout.write(line.ljust(80))
+            sys.stdout.flush()
+
+def run_batch_mode(source, audio_only=False, quality="1080", jobs=4, connections=1, force=False,
+                   audio_format=DEFAULT_AUDIO_FORMAT):
+    """
+    Downloads every URL from a file (or stdin) in one process using a worker pool.
+    Prints a per-URL summary and returns the process exit code (1 if any URL failed).
+    """
+    try:
+        urls = read_batch_urls(source)
+    except OSError as e:
+        print(f"❌ Cannot read batch list: {e}")
+        return 2
+
+    if not urls:
+        print("⚠️ No URLs found in batch list.")
+        return 0
+
+    return run_url_batch(urls, audio_only, quality, jobs, connections, force, audio_format)
+
+def run_url_batch(urls, audio_only=False, quality="1080", jobs=4, connections=1, force=False,
+                  audio_format=DEFAULT_AUDIO_FORMAT):
+    """
+    Downloads a list of URLs with a worker pool. Playlist and channel URLs are
+    expanded lazily, so their videos start downloading while later pages are
+    still being listed. Videos already in the download archive are skipped
+    without a network call unless 'force' is set. Returns the process exit code.
+    """
+    jobs = max(1, int(jobs))
+    has_playlists = any(is_playlist_url(u) for u in urls)
+    total = None if has_playlists else len(urls)  # Unknown until expansion finishes
+    label = quality_label(audio_only, quality, audio_format)
+
+    print(f"🚀 Starting Batch Downloader")
+    print(f"📄 {total if total is not None else 'Streaming'} URLs | 🧵 {jobs} workers | "
+          f"🎧 Mode: {label if audio_only else 'Video (MP4)'}")
+
+    save_path = get_save_path()
+    set_pool_size(jobs + 1)  # One warm YoutubeDL per worker (+1 for playlist listing)
+    progress = BatchProgress(total)
+    results = {}  # url -> error message (None on success), in submission order
+    postprocess_pool = get_postprocess_pool()
+    conversions = []  # One event per conversion, set once its result is recorded
+    archive = get_download_archive()
+    skipped = set()
+    seen = set()  # Canonical video keys, so 'youtu.be/X' and 'watch?v=X' in one list download once
+
+    def converted(url, future, recorded):
+        try:
+            error = future.exception()
+            results[url] = clean_error(error) if error is not None else None
+            progress.job_done(url, error is None, postprocessed=True)
+        finally:
+            recorded.set()
+
+    def worker(url):
+        # Conversions go to the CPU-sized pool so this worker can start the next download
+        job = build_cli_job(url, save_path, audio_only, quality, connections, defer_postprocessing=True,
+                            audio_format=audio_format)
+        try:
+            result = run_download(job, progress.make_listener(url))
+        except Exception as e:
+            results[url] = clean_error(e)
+            progress.job_done(url, False)
+            return
+        if result['postprocessors']:
+            progress.job_downloaded(url)
+            recorded = threading.Event()
+            conversions.append(recorded)
+            future = postprocess_pool.submit(job, result)
+            future.add_done_callback(lambda f: converted(url, f, recorded))
+        else:
+            results[url] = None
+            progress.job_done(url, True)
+
+    # Bounded submission: never hold more than a few pages of entries in memory
+    slots = threading.BoundedSemaphore(jobs * 2)
+
+    def release(_future):
+        slots.release()
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        try:
+            for url in expand_urls(urls):
+                key = cache_key(url)
+                if key in seen:
+                    continue
+                seen.add(key)
+                progress.discovered += 1
+                if not force and archive.contains(url, label):
+                    results.setdefault(url, None)
+                    skipped.add(url)
+                    progress.job_skipped(url)
+                    continue
+                slots.acquire()
+                results.setdefault(url, 'Not started')
+                future = pool.submit(worker, url)
+                future.add_done_callback(release)
+                futures.append(future)
+        except Exception as e:
+            print(f"\n❌ Playlist expansion failed: {e}")
+            results['(playlist expansion)'] = str(e)
+        for future in futures:
+            # Re-raises anything unexpected from the workers
+            future.result()
+    # Not future.exception(): it returns before the done-callbacks have run
+    for recorded in conversions:
+        recorded.wait()
+
+    urls = list(results)
+    # --- SUMMARY ---
+    print("\n\n📋 Summary")
+    for url in urls:
+        error = results.get(url)
+        if url in skipped:
+            print(f"  ⏭️ {url} (already downloaded)")
+        elif error is None:
+            print(f"  ✅ {url}")
+        else:
+            print(f"  ❌ {url}\n      {error}")
+
+    failed = sum(1 for e in results.values() if e is not None)
+    print(f"\n🎉 {len(urls) - failed - len(skipped)} succeeded, {failed} failed, "
+          f"{len(skipped)} already downloaded. Saved to: {save_path}")
+    return 1 if failed else 0
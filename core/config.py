@@ -0,0 +1,15 @@
+import os
+
+# Environment variable that moves all persistent state (cache, journal, archive)
+DATA_DIR_ENV = 'SMART_YTDL_HOME'
+
+
+def get_data_dir():
+    """
+    Returns the directory used for persistent application state.
+    Defaults to '~/.smart-ytdl' and is created on first use.
+    """
+    path = os.environ.get(DATA_DIR_ENV) or os.path.join(os.path.expanduser('~'), '.smart-ytdl')
+    if not os.path.exists(path):
+        os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,554 @@
+"""
+Qt-free download engine.
+
+Everything a download needs (format selection, yt-dlp options, progress
+snapshots, metadata caching, metrics) lives here as plain functions over a
+DownloadJob. The Qt workers, the CLI and the 'serve' daemon are adapters that
+turn engine events into signals, terminal output or HTTP events.
+
+    job = DownloadJob(url, "720p", "downloads")
+    result = run_download(job, on_event=print)           # any thread
+
+    with ThreadPoolExecutor(4) as pool:                  # thread pools
+        pool.map(run_download, jobs)
+
+    with ProcessPoolExecutor(4) as pool:                 # process pools: plain jobs only
+        pool.map(run_download, jobs)                     # (no ticket, metrics or callback)
+
+    async for event, data in stream_download(job):       # asyncio
+        ...
+"""
+import asyncio
+import copy
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.session import get_ydl_pool
+from core.cache import get_metadata_cache
+from core.archive import info_key
+from core.cleaner import get_retention_manager
+from core.storage import get_io_config, place_file
+from core.cancel import CancelToken, CancellableLogger, DownloadCancelled, track_subprocesses
+from core.metadata import (build_video_info, build_format_table, select_format_id, info_is_fresh, audio_mode,
+                           is_stream_copy, AUDIO_FORMATS, AUDIO_MP3, DEFAULT_AUDIO_FORMAT)
+from core.metrics import (get_metrics_recorder, PHASE_EXTRACT, PHASE_POSTPROCESS_QUEUED, PHASE_POSTPROCESS,
+                          PHASE_FINALIZE, FETCH_METADATA)
+from core.progress import snapshot_from_hook
+
+log = logging.getLogger(__name__)
+
+# Event types passed to on_event(event, data)
+EVENT_STATUS = 'status'  # data: short status text (metadata fetches)
+EVENT_PROGRESS = 'progress'  # data: snapshot (see snapshot_from_hook)
+EVENT_POSTPROCESS = 'postprocess'  # data: postprocessor name (merge, audio conversion)
+EVENT_DOWNLOADED = 'downloaded'  # data: result dict, postprocessing deferred (see run_postprocess)
+EVENT_FINISHED = 'finished'  # data: result dict (see run_download)
+
+AUDIO_ONLY = AUDIO_MP3
+# Bitrate for audio that has to be re-encoded
+AUDIO_QUALITY = '192'
+
+# Options for single-video metadata extraction
+INFO_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noplaylist': True,
+    'extract_flat': False,
+    'socket_timeout': 10,
+    'geolocation_bypass': True,
+}
+
+
+# ------------------------------------------------------------------------
+# FORMAT SELECTION
+# ------------------------------------------------------------------------
+
+def quality_label(audio_only=False, height="1080", audio_format=DEFAULT_AUDIO_FORMAT):
+    """Maps CLI-style flags onto the quality labels used everywhere else ("1080p", "Audio Only (M4A)")."""
+    if audio_only:
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Invalid audio format: {audio_format!r} (expected {', '.join(AUDIO_FORMATS)})")
+        return AUDIO_FORMATS[audio_format]
+    return f"{height}p"
+
+
+def quality_format_string(quality):
+    """Parses the quality selection string into yt-dlp format codes."""
+
+    # Case 1: Audio Only (best stream that only needs a remux, else the best one to convert)
+    if "Audio Only" in quality:
+        return f'bestaudio[acodec^={audio_mode(quality)[0][0]}]/bestaudio/best'
+
+    # Extract the resolution number (e.g., "1080" from "1080p")
+    height = ''.join(filter(str.isdigit, quality))
+    if not height:
+        return 'best'  # Fallback ("Best Quality")
+
+    # Case 2: Video Only (Silent)
+    if "Video Only" in quality:
+        # Download best video matching height, no audio
+        return f'bestvideo[height<={height}]'
+
+    # Case 3: Normal Video (Video + Audio)
+    # Best video matching height + best audio (merged), else the best single file
+    return f'bestvideo[height<={height}]+bestaudio/best[height<={height}]/best'
+
+
+def resolve_format(info, quality):
+    """
+    Returns (info, format_spec) for a download.
+    While 'info' is fresh the spec is an exact format ID (e.g. '137+251') and
+    info is returned for reuse; otherwise info is None and the spec is a selector.
+    """
+    # Reuse the extracted info only while its stream URLs are still valid
+    if info_is_fresh(info):
+        format_spec = select_format_id(build_format_table(info), quality)
+        if format_spec:
+            return info, format_spec
+    return None, quality_format_string(quality)
+
+
+# ------------------------------------------------------------------------
+# JOBS
+# ------------------------------------------------------------------------
+
+class DownloadJob:
+    """
+    One download: what to fetch, where to, and how.
+    Picklable (for process pools) as long as no bandwidth ticket or metrics
+    are attached; those only make sense inside one process anyway.
+    """
+
+    def __init__(self, url, quality="Best Quality", output_path='.', info=None, format_spec=None,
+                 connections=1, bandwidth_ticket=None, metrics=None, use_cache=True, defer_postprocessing=False,
+                 archive=None, io_config=None):
+        self.url = url
+        self.quality = quality  # e.g., "1080p", "720p (Video Only)", "Audio Only (M4A)"
+        self.output_path = output_path
+        self.info = info  # Extracted info dict (optional, skips re-extraction while fresh)
+        # Exact format chosen earlier (e.g. for a resumed job); resolved from 'info' if None
+        self.format_spec = format_spec
+        self.connections = max(1, int(connections))  # > 1 enables segmented downloading
+        self.bandwidth_ticket = bandwidth_ticket  # Share of the global bandwidth limit (optional)
+        self.metrics = metrics  # Optional JobMetrics (phase timing, bytes, retries)
+        self.use_cache = use_cache  # Look up / store metadata in the shared metadata cache
+        # Leave CPU-heavy conversions to run_postprocess() (e.g. on a PostprocessPool)
+        self.defer_postprocessing = defer_postprocessing
+        self.archive = archive  # Optional DownloadArchive; the finished download is recorded there
+        # Staging folder, chunk/buffer sizes, preallocation, fsync (process-wide settings by default)
+        self.io = io_config or get_io_config()
+        self.token = CancelToken()  # Cancel / pause, checked throughout the download
+
+    @property
+    def audio_only(self):
+        return "Audio Only" in self.quality
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    @property
+    def paused(self):
+        return self.token.paused
+
+    def cancel(self):
+        """
+        Stops the job from any thread: at the next progress callback or yt-dlp
+        log line, with open segmented connections and FFmpeg killed right away.
+        """
+        self.token.cancel()
+        if self.bandwidth_ticket is not None:
+            self.bandwidth_ticket.cancel()  # Don't stay blocked on the rate limiter
+
+    def pause(self):
+        """Holds the job where it is; the '.part' file and open connections are kept."""
+        self.token.pause()
+
+    def resume(self):
+        self.token.resume()
+
+
+def build_download_options(job, format_spec, progress_hook=None, postprocessor_hook=None):
+    """The yt-dlp options for a job. The single source for GUI, CLI and daemon downloads."""
+    ydl_opts = {
+        'format': format_spec,
+        # The staging folder if configured: the finished file is moved to output_path afterwards
+        'outtmpl': os.path.join(job.io.work_dir(job.output_path), '%(title)s.%(ext)s'),
+        'progress_hooks': [progress_hook] if progress_hook else [],
+        'postprocessor_hooks': [postprocessor_hook] if postprocessor_hook else [],
+        'noplaylist': True,
+        # Continue an existing '.part' file (e.g. after a crash) instead of restarting
+        'continuedl': True,
+        # mtime = download time (not the upload date), so retention ages files by when they arrived
+        'updatetime': False,
+        'ignoreerrors': False,  # Stop on error so we can catch it
+        'no_warnings': True,
+        'quiet': True,
+        # Safe headers to prevent HTTP 403
+        'http_headers': {'User-Agent': 'Mozilla/5.0'},
+    }
+
+    # Shared bandwidth limit: paid per received block
+    if job.bandwidth_ticket is not None:
+        ydl_opts['progress_hooks'].append(job.bandwidth_ticket.hook)
+        ydl_opts['bandwidth_ticket'] = job.bandwidth_ticket
+
+    # Per-phase timing: hooks advance the phases, the logger counts retries
+    if job.metrics is not None:
+        ydl_opts['progress_hooks'].append(job.metrics.progress_hook)
+        ydl_opts['postprocessor_hooks'].append(job.metrics.postprocessor_hook)
+
+    # Cancel / pause also take effect during extraction and retries (every log line checks)
+    ydl_opts['logger'] = CancellableLogger(job.token, job.metrics.logger if job.metrics is not None else None)
+    ydl_opts['cancel_token'] = job.token
+
+    # Chunk / buffer sizes, preallocation and fsync policy
+    ydl_opts.update(job.io.ydl_options())
+
+    # Parallel byte ranges for plain HTTP formats, parallel fragments for DASH/HLS
+    if job.connections > 1:
+        ydl_opts['segmented_connections'] = job.connections
+        ydl_opts['concurrent_fragment_downloads'] = job.connections
+
+    if not job.defer_postprocessing:
+        ydl_opts['postprocessors'] = postprocessor_defs(job)
+    if not job.audio_only:
+        # Merged video+audio always ends up as mp4 (a remux, so it stays in the download)
+        ydl_opts['merge_output_format'] = 'mp4'
+
+    return ydl_opts
+
+
+def postprocessor_defs(job):
+    """
+    The conversions a job needs after downloading. For audio, FFmpegExtractAudio
+    stream-copies a source already in the target codec (see is_stream_copy())
+    and only re-encodes otherwise.
+    """
+    if job.audio_only:
+        return [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': audio_mode(job.quality)[1],
+            'preferredquality': AUDIO_QUALITY,
+        }]
+    return []
+
+
+def run_postprocessors(ydl, info, pp_defs, token):
+    """Runs postprocessor definitions on a downloaded file's info. Returns the updated info."""
+    from yt_dlp.postprocessor import get_postprocessor
+    for pp_def in pp_defs:
+        token.check()
+        pp_def = dict(pp_def)
+        pp = get_postprocessor(pp_def.pop('key'))(ydl, **pp_def)
+        # Same bookkeeping as yt-dlp's post_process (deletes the source file afterwards)
+        info = ydl.run_pp(pp, info)
+    return info
+
+
+def clean_error(e):
+    """Error text without yt-dlp's ANSI 'ERROR:' prefix."""
+    return str(e).replace('\033[0;31mERROR:\033[0m ', '')
+
+
+def run_download(job, on_event=None):
+    """
+    Runs one download in the calling thread.
+    'on_event(event, data)' receives EVENT_STATUS / EVENT_PROGRESS /
+    EVENT_POSTPROCESS / EVENT_FINISHED, called from this thread.
+    Returns a result dict with 'url', 'title', 'filepath' and 'format'.
+    Raises DownloadCancelled if the job was cancelled and any other
+    exception if the download failed.
+
+    With 'job.defer_postprocessing' the conversions are skipped: the result
+    then lists them under 'postprocessors' (with the downloaded file's
+    'info'), EVENT_DOWNLOADED replaces EVENT_FINISHED, and run_postprocess()
+    completes the job. Audio that only needs a stream copy is finished here either way.
+    """
+    metrics = job.metrics
+    if metrics is not None:
+        metrics.enter(PHASE_EXTRACT)
+    emit = on_event or (lambda event, data: None)
+
+    def progress_hook(d):
+        job.token.check()  # Raises when cancelled, blocks while paused
+        if d['status'] in ('downloading', 'finished'):
+            emit(EVENT_PROGRESS, snapshot_from_hook(d))
+
+    def postprocessor_hook(d):
+        job.token.check()
+        if d.get('status') == 'started':
+            emit(EVENT_POSTPROCESS, d.get('postprocessor'))
+
+    track_subprocesses()
+    try:
+        # 1. Exact format from fresh metadata (given, or from the shared cache), else a selector
+        info = job.info
+        if info is None and job.use_cache:
+            cached = get_metadata_cache().get(job.url)
+            if cached and info_is_fresh(cached.get('info')):
+                info = cached['info']
+                emit(EVENT_STATUS, f"Using cached metadata: {cached['title']}")
+        if job.format_spec:
+            info = info if info_is_fresh(info) else None
+            format_spec = job.format_spec
+        else:
+            info, format_spec = resolve_format(info, job.quality)
+        if metrics is not None:
+            metrics.cache_hit = info is not None
+
+        ydl_opts = build_download_options(job, format_spec, progress_hook, postprocessor_hook)
+
+        # 2. Download on a warm instance from the shared pool (no extractor setup, keep-alive connections)
+        # The bound token lets cancel() kill the FFmpeg merge this thread may start
+        with get_ydl_pool().lease(ydl_opts) as ydl, job.token.bind():
+            job.token.check()
+            if info:
+                # Same path as yt-dlp's --load-info-json: no second extract_info
+                result_info = ydl.process_ie_result(copy.deepcopy(info), download=True)
+            else:
+                # Single pass: extract + download, then remember the metadata
+                result_info = ydl.extract_info(job.url, download=True)
+                if result_info and job.use_cache:
+                    try:
+                        get_metadata_cache().put(job.url, build_video_info(ydl.sanitize_info(result_info), job.url))
+                    except Exception as e:
+                        log.warning("Metadata cache write failed: %s", e)
+
+            requested = (result_info or {}).get('requested_downloads') or [{}]
+            downloaded = requested[-1]
+            deferred = postprocessor_defs(job) if job.defer_postprocessing else []
+            if deferred and is_stream_copy(job.quality, downloaded.get('acodec')):
+                # A remux costs little more than a file copy: no reason to wait for a CPU slot
+                downloaded = run_postprocessors(ydl, downloaded, deferred, job.token)
+                deferred = []
+
+        result = {
+            'url': job.url,
+            'title': (result_info or {}).get('title'),
+            'filepath': downloaded.get('filepath'),
+            'format': format_spec,
+            'video_key': info_key(result_info),
+            'postprocessors': deferred,
+        }
+        if result['postprocessors']:
+            # What yt-dlp's own postprocessing would have seen (JSON-safe, so it can cross processes)
+            result['info'] = ydl.sanitize_info(downloaded)
+    except Exception as e:
+        if metrics is not None:
+            metrics.finish('cancelled' if job.cancelled else 'error', None if job.cancelled else clean_error(e))
+        if job.cancelled:
+            raise DownloadCancelled() from e
+        raise
+
+    if result['postprocessors']:
+        if metrics is not None:
+            metrics.enter(PHASE_POSTPROCESS_QUEUED)
+        # Not evicted while it waits for the pool (released in PostprocessPool._done)
+        get_retention_manager().hold(result['filepath'])
+        emit(EVENT_DOWNLOADED, result)
+        return result
+
+    _place_output(job, result)
+    _record_finished(job, result)
+    if metrics is not None:
+        metrics.finish('done')
+    emit(EVENT_FINISHED, result)
+    return result
+
+
+def _place_output(job, result):
+    """Moves the finished file from the staging folder into job.output_path (see place_file())."""
+    if not result['filepath']:
+        return
+    staged = os.path.dirname(os.path.abspath(result['filepath'])) != os.path.abspath(job.output_path)
+    if staged and job.metrics is not None:
+        job.metrics.enter(PHASE_FINALIZE)
+    try:
+        result['filepath'] = place_file(result['filepath'], job.output_path, job.io)
+    except Exception as e:
+        if job.metrics is not None:
+            job.metrics.finish('error', f"Moving the file into place failed: {e}")
+        raise
+
+
+def _record_finished(job, result):
+    """Archives a finished download and lets the retention policy (if any) make room after it."""
+    if job.archive is not None:
+        try:
+            job.archive.record(job.url, job.quality, result['title'], result['filepath'], result['video_key'])
+        except Exception as e:
+            log.warning("Archive write failed: %s", e)
+    try:
+        get_retention_manager().after_job(job.output_path, protect=result['filepath'])
+    except Exception as e:
+        log.warning("Retention check failed: %s", e)
+
+
+def run_postprocess(job, result, on_event=None):
+    """
+    Runs the conversions run_download() deferred, in the calling thread.
+    Emits EVENT_POSTPROCESS per step and EVENT_FINISHED at the end, and returns
+    the result with 'filepath' pointing at the converted file. Raises on failure.
+    """
+    metrics = job.metrics
+    if metrics is not None:
+        metrics.enter(PHASE_POSTPROCESS)
+    emit = on_event or (lambda event, data: None)
+
+    def postprocessor_hook(d):
+        job.token.check()
+        if d.get('status') == 'started':
+            emit(EVENT_POSTPROCESS, d.get('postprocessor'))
+
+    track_subprocesses()
+    try:
+        opts = {'quiet': True, 'no_warnings': True, 'postprocessor_hooks': [postprocessor_hook],
+                'logger': CancellableLogger(job.token)}
+        with get_ydl_pool().lease(opts) as ydl, job.token.bind():
+            info = run_postprocessors(ydl, dict(result['info']), result['postprocessors'], job.token)
+    except Exception as e:
+        if metrics is not None:
+            metrics.finish('cancelled' if job.cancelled else 'error', None if job.cancelled else clean_error(e))
+        if job.cancelled:
+            raise DownloadCancelled() from e
+        raise
+
+    result = dict(result, filepath=info.get('filepath'), postprocessors=[])
+    result.pop('info', None)
+    _place_output(job, result)
+    _record_finished(job, result)
+    if metrics is not None:
+        metrics.finish('done')
+    emit(EVENT_FINISHED, result)
+    return result
+
+
+class PostprocessPool:
+    """
+    The CPU stage of the pipeline: deferred conversions run here, one per
+    core by default, while the download slots move on to the next item.
+    FFmpeg runs as a subprocess, so threads are enough to use every core.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or os.cpu_count() or 2)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='postprocess')
+        self._lock = threading.Lock()
+        self._depth = 0  # Queued + running
+
+    def submit(self, job, result, on_event=None):
+        """Queues run_postprocess(job, result, on_event). Returns a Future."""
+        with self._lock:
+            self._depth += 1
+        future = self._executor.submit(run_postprocess, job, result, on_event)
+        future.add_done_callback(lambda f: self._done(job, result, f))
+        return future
+
+    def _done(self, job, result, future):
+        with self._lock:
+            self._depth -= 1
+        get_retention_manager().release(result['filepath'])
+        if future.cancelled() and job.metrics is not None:
+            job.metrics.finish('cancelled')
+
+    def depth(self):
+        """Conversions queued or running."""
+        return self._depth
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_default_postprocess_pool = None
+_default_postprocess_pool_lock = threading.Lock()
+
+
+def get_postprocess_pool():
+    """Returns the process-wide PostprocessPool (one worker per CPU core)."""
+    global _default_postprocess_pool
+    with _default_postprocess_pool_lock:
+        if _default_postprocess_pool is None:
+            _default_postprocess_pool = PostprocessPool()
+        return _default_postprocess_pool
+
+
+async def stream_download(job, executor=None):
+    """
+    Runs a job on 'executor' (default: the loop's thread pool) and yields
+    (event, data) tuples as they happen. Ends after EVENT_FINISHED; failures
+    are raised from the iterator.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def on_event(event, data):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    future = loop.run_in_executor(executor, run_download, job, on_event)
+    # Runs after every event the worker posted (call_soon_threadsafe keeps FIFO order)
+    future.add_done_callback(lambda _f: queue.put_nowait(None))
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+        future.result()
+    finally:
+        if not future.done():
+            job.cancel()
+
+
+# ------------------------------------------------------------------------
+# METADATA
+# ------------------------------------------------------------------------
+
+def fetch_video_info(url, on_status=None, use_cache=False, token=None):
+    """
+    Extracts a video's metadata and returns build_video_info()'s result,
+    storing it in the metadata cache. With 'use_cache' a cached result is
+    returned without a request. 'on_status(text)' receives progress texts.
+    Cancelling 'token' (a CancelToken) stops the extraction at its next
+    request with DownloadCancelled.
+    """
+    status = on_status or (lambda text: None)
+    recorder = get_metrics_recorder()
+    cache = get_metadata_cache()
+
+    if use_cache:
+        cached = cache.get(url)
+        if cached is not None:
+            recorder.record_fetch(FETCH_METADATA, cache_hit=True)
+            return cached
+
+    opts = INFO_OPTS
+    if token is not None:
+        token.check()
+        opts = dict(INFO_OPTS, logger=CancellableLogger(token))
+
+    started = time.monotonic()
+    try:
+        status("Connecting to YouTube API...")
+        with get_ydl_pool().lease(opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            recorder.record_fetch(FETCH_METADATA, time.monotonic() - started)
+
+            status("Parsing video formats...")
+            # JSON-safe copy: it is cached and later fed back to process_ie_result
+            result = build_video_info(ydl.sanitize_info(info), url)
+    except DownloadCancelled:
+        raise  # Superseded, not a failed fetch
+    except Exception:
+        recorder.record_fetch(FETCH_METADATA, time.monotonic() - started, ok=False)
+        raise
+
+    # Thumbnail is fetched separately (ThumbnailLoader) so it never delays this result
+    status("Finalizing data...")
+    try:
+        cache.put(url, result)
+    except Exception as e:
+        log.warning("Metadata cache write failed: %s", e)
+    return result
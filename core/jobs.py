@@ -0,0 +1,254 @@
+import itertools
+import time
+from collections import deque
+from core.urls import cache_key, host_key
+
+# Job states
+STATUS_PENDING = 'pending'
+STATUS_DOWNLOADING = 'downloading'
+STATUS_POSTPROCESSING = 'postprocessing'  # Downloaded, converting on the postprocessing pool
+STATUS_RETRYING = 'retrying'  # Failed, waiting out its backoff without holding a slot
+STATUS_DONE = 'done'
+STATUS_ERROR = 'error'
+
+# Per-video metadata (formats, thumbnail) state
+META_NONE = 'none'  # Only the flat playlist entry is known
+META_LOADING = 'loading'
+META_READY = 'ready'
+META_FAILED = 'failed'
+
+# Default status column text per state
+STATUS_TEXT = {
+    STATUS_PENDING: "Pending",
+    STATUS_DOWNLOADING: "⏳ Downloading...",
+    STATUS_POSTPROCESSING: "⚙️ Postprocessing...",
+    STATUS_RETRYING: "🔁 Retrying...",
+    STATUS_DONE: "Completed ✅",
+    STATUS_ERROR: "Error ❌",
+}
+
+
+class QueueJob:
+    """One queue entry: what to download and its current state."""
+
+    __slots__ = ('job_id', 'url', 'quality', 'title', 'video_key', 'host', 'status', 'status_text',
+                 'progress', 'priority', 'info', 'thumbnail_url', 'tooltip', 'order_key',
+                 'metadata_state', 'output_path', 'format_spec', 'queued_at', 'attempts', 'retry_quality')
+
+    def __init__(self, job_id, url, quality, title, info=None, thumbnail_url=None, tooltip='',
+                 metadata_state=META_READY):
+        self.job_id = job_id
+        self.url = url
+        self.quality = quality
+        self.title = title
+        self.video_key = cache_key(url)
+        self.host = host_key(url)
+        self.status = STATUS_PENDING
+        self.status_text = STATUS_TEXT[STATUS_PENDING]
+        self.progress = 0
+        self.priority = 0
+        self.info = info  # Extracted info dict, handed to the downloader once
+        self.thumbnail_url = thumbnail_url  # Fetched lazily when the row is painted
+        self.tooltip = tooltip
+        self.order_key = 0  # Position in the pending queue (lower runs first)
+        self.metadata_state = metadata_state
+        self.output_path = None  # Set when started (or restored from the journal)
+        self.format_spec = None  # Exact format once pinned, so a resume picks the same streams
+        self.queued_at = time.monotonic()  # For the 'queued' phase in job metrics
+        self.attempts = 0  # Download attempts started (see core.retry)
+        self.retry_quality = None  # Lower quality chosen by a format fallback; 'quality' stays the key
+
+
+class JobStore:
+    """
+    Queue backing store with stable job IDs.
+    - Jobs keep their ID for life; row positions are derived from it.
+    - (video key, quality) is indexed, so duplicate checks are O(1).
+    - Pending jobs wait in one FIFO deque per host, so picking the next job
+      that fits the per-host limit costs O(number of hosts), not O(queue).
+    - If a journal is attached, every add/remove/status change is logged to it.
+    """
+
+    def __init__(self, journal=None):
+        self.journal = journal  # Optional JobJournal
+        self._jobs = {}  # job_id -> QueueJob
+        self._order = []  # Row order (job IDs)
+        self._rows = {}  # job_id -> row
+        self._index = {}  # (video_key, quality) -> job_id
+        self._by_video = {}  # video_key -> set of job IDs (all qualities)
+        self._pending = {}  # host -> deque of (order_key, job_id), sorted by order_key
+        self._pending_count = 0
+        self._ids = itertools.count()
+        self._back = itertools.count(1)  # Order keys for normal appends
+        self._front = itertools.count(-1, -1)  # Order keys for jump-the-queue
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        return (self._jobs[job_id] for job_id in self._order)
+
+    # ------------------------------------------------------------------------
+    # LOOKUP
+    # ------------------------------------------------------------------------
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def find(self, url, quality):
+        """Returns the job with the same video and quality, or None."""
+        job_id = self._index.get((cache_key(url), quality))
+        return self._jobs.get(job_id) if job_id is not None else None
+
+    def jobs_for_video(self, video_key):
+        """Job IDs of every queue entry for a video (any quality)."""
+        return list(self._by_video.get(video_key, ()))
+
+    def row_of(self, job_id):
+        return self._rows.get(job_id, -1)
+
+    def job_at(self, row):
+        return self._jobs[self._order[row]]
+
+    def pending_count(self):
+        return self._pending_count
+
+    # ------------------------------------------------------------------------
+    # MUTATION
+    # ------------------------------------------------------------------------
+
+    def add(self, url, quality, title, info=None, thumbnail_url=None, tooltip='', metadata_state=META_READY):
+        """Appends a pending job. Returns it, or None if it is a duplicate."""
+        job = self._insert(url, quality, title, info, thumbnail_url, tooltip, metadata_state)
+        if job is not None and self.journal is not None:
+            self.journal.record_add(job)
+        return job
+
+    def add_many(self, entries, quality, metadata_state=META_NONE):
+        """
+        Appends flat entries ({'url', 'title'}), skipping duplicates, and
+        journals them in one write. Returns the new jobs.
+        """
+        jobs = [job for job in (self._insert(e['url'], quality, e['title'], metadata_state=metadata_state)
+                                for e in entries) if job is not None]
+        if jobs and self.journal is not None:
+            self.journal.record_adds(jobs)
+        return jobs
+
+    def _insert(self, url, quality, title, info=None, thumbnail_url=None, tooltip='', metadata_state=META_READY):
+        if self.find(url, quality) is not None:
+            return None
+
+        job = QueueJob(next(self._ids), url, quality, title, info, thumbnail_url, tooltip, metadata_state)
+        self._jobs[job.job_id] = job
+        self._rows[job.job_id] = len(self._order)
+        self._order.append(job.job_id)
+        self._index[(job.video_key, quality)] = job.job_id
+        self._by_video.setdefault(job.video_key, set()).add(job.job_id)
+        self._enqueue(job)
+        return job
+
+    def remove(self, job_id):
+        """Removes a job. Returns the row it occupied, or -1."""
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return -1
+        row = self._rows.pop(job_id)
+        del self._order[row]
+        for r in range(row, len(self._order)):
+            self._rows[self._order[r]] = r
+        self._index.pop((job.video_key, job.quality), None)
+        siblings = self._by_video.get(job.video_key)
+        if siblings is not None:
+            siblings.discard(job_id)
+            if not siblings:
+                del self._by_video[job.video_key]
+        if job.status == STATUS_PENDING:
+            self._pending_count -= 1  # Its deque entry is skipped lazily
+        if self.journal is not None:
+            self.journal.record_remove(job)
+        return row
+
+    def set_status(self, job_id, status, text=None):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        was_pending = job.status == STATUS_PENDING
+        job.status = status
+        job.status_text = text or STATUS_TEXT.get(status, status)
+        if was_pending and status != STATUS_PENDING:
+            self._pending_count -= 1
+        elif status == STATUS_PENDING and not was_pending:
+            self._enqueue(job)
+        if self.journal is not None and (status != STATUS_PENDING or not was_pending):
+            self.journal.record_state(job)
+        return job
+
+    def checkpoint(self, job_id, snapshot):
+        """Logs a running job's byte offset (from a progress snapshot) to the journal."""
+        job = self._jobs.get(job_id)
+        if job is not None and self.journal is not None:
+            self.journal.checkpoint(job, snapshot)
+
+    def prioritize(self, job_id, priority=1):
+        """Moves a pending job to the front of the queue."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status != STATUS_PENDING:
+            return
+        job.priority = priority
+        job.order_key = next(self._front)
+        # The old entry further back no longer matches order_key and is skipped
+        self._pending.setdefault(job.host, deque()).appendleft((job.order_key, job_id))
+
+    def next_pending(self, host_allowed=None):
+        """
+        Returns the earliest pending job whose host passes 'host_allowed(host)',
+        or None. The job is taken off the queue; the caller marks it as started.
+        """
+        best = None
+        for host in list(self._pending):
+            queue = self._pending[host]
+            self._drop_stale(queue)
+            if not queue:
+                del self._pending[host]
+                continue
+            if host_allowed is not None and not host_allowed(host):
+                continue
+            head = self._jobs[queue[0][1]]
+            if best is None or head.order_key < best.order_key:
+                best = head
+
+        if best is not None:
+            self._pending[best.host].popleft()
+        return best
+
+    def peek_pending(self, limit):
+        """Returns (without removing) up to 'limit' jobs that would be dispatched next."""
+        heads = []
+        for queue in self._pending.values():
+            found = 0
+            for order_key, job_id in queue:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != STATUS_PENDING or job.order_key != order_key:
+                    continue
+                heads.append(job)
+                found += 1
+                if found >= limit:
+                    break
+        heads.sort(key=lambda job: job.order_key)
+        return heads[:limit]
+
+    def _enqueue(self, job):
+        if job.status == STATUS_PENDING:
+            self._pending_count += 1
+        job.order_key = next(self._back)
+        self._pending.setdefault(job.host, deque()).append((job.order_key, job.job_id))
+
+    def _drop_stale(self, queue):
+        """Pops removed, no-longer-pending, or superseded entries off the head of a deque."""
+        while queue:
+            order_key, job_id = queue[0]
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == STATUS_PENDING and job.order_key == order_key:
+                return
+            queue.popleft()
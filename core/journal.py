@@ -0,0 +1,234 @@
+import json
+import os
+import threading
+import time
+from core.config import get_data_dir
+from core.jobs import STATUS_PENDING, STATUS_DOWNLOADING, STATUS_POSTPROCESSING, STATUS_DONE, STATUS_ERROR, META_NONE
+
+# Byte-offset checkpoints are rate-limited per job; state transitions are always written
+DEFAULT_CHECKPOINT_INTERVAL = 2.0  # seconds
+
+# States that start or end a phase: only these transitions are fsynced. Losing a
+# pending/retrying line in a crash just replays the job as it was before.
+SYNC_STATUSES = (STATUS_DOWNLOADING, STATUS_POSTPROCESSING, STATUS_DONE, STATUS_ERROR)
+
+# Phases recorded for running jobs
+PHASE_DOWNLOADING = 'downloading'
+PHASE_POSTPROCESSING = 'postprocessing'
+
+
+def job_key(job):
+    """Stable journal key for a queue job (store job IDs only live for one run)."""
+    return f"{job.video_key}|{job.quality}"
+
+
+class JobJournal:
+    """
+    Append-only, line-delimited JSON log of queue job state transitions.
+    Every line is one record ('add', 'state', 'progress' or 'remove'), flushed
+    to the OS as it is written, so a crashed process loses at most the line
+    being written. Adds (one write per batch) and phase boundaries are also
+    fsynced, so they survive a power loss.
+    load() replays the log and rewrites it compactly (one 'add' + 'state'
+    pair per unfinished job). All writes happen on the thread owning the JobStore.
+    """
+
+    def __init__(self, path=None, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path or os.path.join(get_data_dir(), 'journal.jsonl')
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_checkpoint = {}  # key -> (monotonic time, phase)
+
+    # ------------------------------------------------------------------------
+    # REPLAY
+    # ------------------------------------------------------------------------
+
+    def load(self):
+        """
+        Replays the journal and returns the unfinished jobs in queue order:
+        [{'url', 'quality', 'title', 'status', 'phase', 'bytes', 'filename',
+          'output_path', 'format_spec'}, ...]. Compacts the file afterwards.
+        """
+        live = {}  # key -> record (insertion ordered)
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn final line from a crash
+                    self._apply(live, entry)
+
+        records = [r for r in live.values() if r['status'] != STATUS_DONE]
+        self._rewrite(records)
+        return records
+
+    def _apply(self, live, entry):
+        op = entry.get('op')
+        key = entry.get('key')
+        if op == 'add':
+            live.pop(key, None)  # Re-added after removal: goes to the back
+            live[key] = {
+                'key': key,
+                'url': entry['url'],
+                'quality': entry['quality'],
+                'title': entry.get('title') or entry['url'],
+                'status': STATUS_PENDING,
+                'phase': None,
+                'bytes': 0,
+                'filename': None,
+                'output_path': None,
+                'format_spec': None,
+            }
+        elif key not in live:
+            return
+        elif op == 'state':
+            record = live[key]
+            record['status'] = entry['status']
+            for field in ('output_path', 'format_spec'):
+                if entry.get(field):
+                    record[field] = entry[field]
+            if entry['status'] == STATUS_DOWNLOADING:
+                record['phase'] = PHASE_DOWNLOADING
+            elif entry['status'] == STATUS_POSTPROCESSING:
+                record['phase'] = PHASE_POSTPROCESSING
+        elif op == 'progress':
+            record = live[key]
+            record['phase'] = entry.get('phase') or PHASE_DOWNLOADING
+            record['bytes'] = entry.get('bytes') or 0
+            if entry.get('filename'):
+                record['filename'] = entry['filename']
+        elif op == 'remove':
+            del live[key]
+
+    def _rewrite(self, records):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for r in records:
+                f.write(json.dumps({'op': 'add', 'key': r['key'], 'url': r['url'],
+                                    'quality': r['quality'], 'title': r['title']}) + '\n')
+                f.write(json.dumps({'op': 'state', 'key': r['key'], 'status': r['status'],
+                                    'output_path': r['output_path'],
+                                    'format_spec': r['format_spec']}) + '\n')
+                if r['phase']:
+                    f.write(json.dumps({'op': 'progress', 'key': r['key'], 'phase': r['phase'],
+                                        'bytes': r['bytes'], 'filename': r['filename']}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    # ------------------------------------------------------------------------
+    # RECORDING (called by JobStore)
+    # ------------------------------------------------------------------------
+
+    def record_add(self, job):
+        self.record_adds([job])
+
+    def record_adds(self, jobs):
+        """Logs added jobs with one write and one fsync (a whole playlist at once)."""
+        self._write(*({'op': 'add', 'key': job_key(job), 'url': job.url,
+                       'quality': job.quality, 'title': job.title} for job in jobs), sync=True)
+
+    def record_state(self, job):
+        self._write({'op': 'state', 'key': job_key(job), 'status': job.status,
+                     'output_path': job.output_path, 'format_spec': job.format_spec},
+                    sync=job.status in SYNC_STATUSES)
+        if job.status != STATUS_DOWNLOADING:
+            self._last_checkpoint.pop(job_key(job), None)
+
+    def record_remove(self, job):
+        self._write({'op': 'remove', 'key': job_key(job)})
+        self._last_checkpoint.pop(job_key(job), None)
+
+    def checkpoint(self, job, snapshot):
+        """Records the byte offset of a running job (at most every 'checkpoint_interval' s per job)."""
+        key = job_key(job)
+        phase = PHASE_POSTPROCESSING if snapshot['status'] == 'finished' else PHASE_DOWNLOADING
+        now = time.monotonic()
+        last = self._last_checkpoint.get(key)
+        if last is not None and last[1] == phase and now - last[0] < self.checkpoint_interval:
+            return
+        self._last_checkpoint[key] = (now, phase)
+        # Only phase changes are fsynced; offsets in between are best effort
+        phase_changed = last is None or last[1] != phase
+        self._write({'op': 'progress', 'key': key, 'phase': phase,
+                     'bytes': snapshot['downloaded_bytes'], 'filename': snapshot.get('filename')},
+                    sync=phase_changed)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write(self, *entries, sync=False):
+        if not entries:
+            return
+        lines = ''.join(json.dumps(entry) + '\n' for entry in entries)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(lines)
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+
+def partial_size(record):
+    """Bytes already on disk for an interrupted job (its '.part' file), or 0."""
+    filename = record.get('filename')
+    if not filename:
+        return 0
+    for path in (filename + '.part', filename):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            continue
+    return 0
+
+
+def restore_jobs(store, journal):
+    """
+    Re-creates the unfinished jobs of a previous run in 'store' (before the
+    journal is attached to it). Interrupted downloads come back as pending
+    jobs pinned to the same output folder and format, so yt-dlp continues
+    their '.part' files instead of starting over.
+    Returns (restored, interrupted) counts.
+    """
+    restored = interrupted = 0
+    for record in journal.load():
+        job = store.add(record['url'], record['quality'], record['title'], metadata_state=META_NONE)
+        if job is None:
+            continue
+        restored += 1
+        job.output_path = record['output_path']
+        job.format_spec = record['format_spec']
+
+        if record['status'] == STATUS_ERROR:
+            store.set_status(job.job_id, STATUS_ERROR)
+        elif record['status'] in (STATUS_DOWNLOADING, STATUS_POSTPROCESSING):
+            # A finished download is found on disk again and only the conversion reruns
+            interrupted += 1
+            on_disk = partial_size(record)
+            if record['phase'] == PHASE_POSTPROCESSING:
+                text = "Interrupted while processing (will redo)"
+            elif on_disk:
+                text = f"Resumes at {on_disk / (1024 * 1024):.1f} MiB"
+            else:
+                text = "Interrupted (will restart)"
+            store.set_status(job.job_id, STATUS_PENDING, text)
+    return restored, interrupted
+
+
+_default_journal = None
+_default_journal_lock = threading.Lock()
+
+
+def get_job_journal():
+    """Returns the process-wide JobJournal."""
+    global _default_journal
+    with _default_journal_lock:
+        if _default_journal is None:
+            _default_journal = JobJournal()
+        return _default_journal
@@ -0,0 +1,172 @@
+import time
+from urllib.parse import urlparse, parse_qs
+from core.thumbnails import choose_thumbnail
+
+# Re-extract if any stream URL expires within this many seconds
+FRESHNESS_MARGIN = 10 * 60
+# Fallback lifetime for infos whose URLs carry no 'expire' parameter
+DEFAULT_INFO_LIFETIME = 60 * 60
+
+# Audio-only quality labels
+AUDIO_M4A = "Audio Only (M4A)"
+AUDIO_OPUS = "Audio Only (Opus)"
+AUDIO_MP3 = "Audio Only (MP3)"
+# Label -> (stream codecs FFmpeg only has to stream-copy, FFmpegExtractAudio codec)
+AUDIO_MODES = {
+    AUDIO_M4A: (('mp4a', 'aac'), 'm4a'),
+    AUDIO_OPUS: (('opus',), 'opus'),
+    AUDIO_MP3: (('mp3',), 'mp3'),
+}
+# CLI / API names for the labels
+AUDIO_FORMATS = {'m4a': AUDIO_M4A, 'opus': AUDIO_OPUS, 'mp3': AUDIO_MP3}
+DEFAULT_AUDIO_FORMAT = 'm4a'
+
+
+def audio_mode(quality):
+    """(copyable codecs, output codec) for an audio-only label; unknown labels convert to MP3."""
+    return AUDIO_MODES.get(quality, AUDIO_MODES[AUDIO_MP3])
+
+
+def is_stream_copy(quality, acodec):
+    """True if a stream with 'acodec' becomes the label's format by remuxing alone (no re-encode)."""
+    return bool(acodec) and acodec.lower().startswith(audio_mode(quality)[0])
+
+
+def build_video_info(info, url):
+    """
+    Turns a yt-dlp info dict into the compact result used by the UI and CLI.
+    Returns a dict with 'title', 'formats' (display labels), 'url', 'thumbnail_url',
+    'format_table' (one compact row per stream) and 'info' (the full,
+    JSON-safe info dict so the download can skip a second extraction).
+    """
+    unique_heights = set()
+    for f in info.get('formats') or []:
+        if f.get('vcodec') != 'none' and f.get('height'):
+            unique_heights.add(f['height'])
+
+    sorted_heights = sorted(list(unique_heights), reverse=True)
+
+    display_formats = []
+    if not sorted_heights:
+        display_formats.append("Best Quality")
+    else:
+        for h in sorted_heights:
+            display_formats.append(f"{h}p")
+            display_formats.append(f"{h}p (Video Only)")
+
+    # Stream-copy modes only where such a stream exists; MP3 always (re-encoded)
+    acodecs = [(f.get('acodec') or 'none').lower() for f in info.get('formats') or []]
+    for label in (AUDIO_M4A, AUDIO_OPUS):
+        if any(c.startswith(audio_mode(label)[0]) for c in acodecs):
+            display_formats.append(label)
+    display_formats.append(AUDIO_MP3)
+
+    return {
+        'title': info.get('title', 'Unknown Title'),
+        'formats': display_formats,
+        'format_table': build_format_table(info),
+        'info': info,
+        'thumbnail_url': choose_thumbnail(info),
+        'url': url,
+    }
+
+
+def build_format_table(info):
+    """Returns one dict per available stream: id, container, codecs, bitrate, size."""
+    table = []
+    for f in info.get('formats') or []:
+        table.append({
+            'format_id': f.get('format_id'),
+            'ext': f.get('ext'),
+            'vcodec': f.get('vcodec') or 'none',
+            'acodec': f.get('acodec') or 'none',
+            'height': f.get('height'),
+            'tbr': f.get('tbr'),
+            'abr': f.get('abr'),
+            'filesize': f.get('filesize') or f.get('filesize_approx'),
+        })
+    return table
+
+
+def _bitrate(f):
+    return f.get('tbr') or f.get('abr') or 0
+
+
+def select_format_id(format_table, quality):
+    """
+    Picks exact yt-dlp format IDs for a quality label ("1080p", "720p (Video Only)",
+    "Audio Only (M4A)") from a format table.
+    Returns a format spec such as '137+140', or None if nothing matches.
+    """
+    audio = [f for f in format_table if f['acodec'] != 'none' and f['vcodec'] == 'none']
+    video = [f for f in format_table if f['vcodec'] != 'none' and f['acodec'] == 'none' and f.get('height')]
+    muxed = [f for f in format_table if f['vcodec'] != 'none' and f['acodec'] != 'none']
+
+    best_audio = max(audio, key=_bitrate, default=None)
+
+    # Case 1: Audio Only (a stream that only needs a remux beats a higher bitrate)
+    if "Audio Only" in quality:
+        best = max(audio, key=lambda f: (is_stream_copy(quality, f['acodec']), _bitrate(f)), default=None)
+        return best['format_id'] if best else None
+
+    height = ''.join(filter(str.isdigit, quality))
+    height = int(height) if height else None
+
+    def fits(f):
+        return height is None or (f.get('height') or 0) <= height
+
+    best_video = max((f for f in video if fits(f)), key=lambda f: (f['height'], _bitrate(f)), default=None)
+
+    # Case 2: Video Only (Silent)
+    if "Video Only" in quality:
+        return best_video['format_id'] if best_video else None
+
+    # Case 3: Normal Video (Video + Audio)
+    if best_video and best_audio:
+        return f"{best_video['format_id']}+{best_audio['format_id']}"
+
+    best_muxed = max((f for f in muxed if fits(f)), key=lambda f: (f.get('height') or 0, _bitrate(f)), default=None)
+    return best_muxed['format_id'] if best_muxed else None
+
+
+def estimate_size(format_table, format_spec):
+    """Returns the summed size in bytes of the formats in a spec like '137+140', or None."""
+    sizes = {f['format_id']: f.get('filesize') for f in format_table}
+    total = 0
+    for format_id in format_spec.split('+'):
+        if not sizes.get(format_id):
+            return None
+        total += sizes[format_id]
+    return total
+
+
+def _url_expiry(url):
+    """Reads the expiry timestamp from a signed stream URL (query or '/expire/<ts>/' path)."""
+    parsed = urlparse(url)
+    value = parse_qs(parsed.query).get('expire', [None])[0]
+    if value is None and '/expire/' in parsed.path:
+        value = parsed.path.split('/expire/', 1)[1].split('/', 1)[0]
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def info_is_fresh(info, margin=FRESHNESS_MARGIN):
+    """
+    True if the stream URLs in an extracted info dict are still usable.
+    Uses the earliest 'expire' stamp found in the format URLs; if none carry one,
+    falls back to the extraction time ('epoch') plus DEFAULT_INFO_LIFETIME.
+    """
+    if not info or not info.get('formats'):
+        return False
+
+    now = time.time()
+    expiries = [_url_expiry(f['url']) for f in info['formats'] if f.get('url')]
+    expiries = [e for e in expiries if e]
+    if expiries:
+        return min(expiries) - now > margin
+
+    epoch = info.get('epoch')
+    return bool(epoch) and (epoch + DEFAULT_INFO_LIFETIME) - now > margin
+
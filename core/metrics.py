@@ -0,0 +1,334 @@
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from core.config import get_data_dir
+from core.urls import extract_video_id
+
+log = logging.getLogger(__name__)
+
+# Environment variables: where the Prometheus text file goes (e.g. the node
+# exporter's textfile collector directory) and an off switch ('0')
+TEXTFILE_ENV = 'SMART_YTDL_METRICS_TEXTFILE'
+METRICS_ENV = 'SMART_YTDL_METRICS'
+
+# Phases of one job, in the order they normally happen
+PHASE_QUEUED = 'queued'  # Waiting for a free slot (GUI queue only)
+PHASE_EXTRACT = 'extract'  # extract_info / format selection, until the first byte
+PHASE_DOWNLOAD = 'download'  # Network transfer
+PHASE_POSTPROCESS_QUEUED = 'postprocess_queued'  # Downloaded, waiting for a postprocessing worker
+PHASE_POSTPROCESS = 'postprocess'  # FFmpeg merge / audio conversion
+PHASE_FINALIZE = 'finalize'  # Moving the finished file from the staging folder into place
+PHASES = (PHASE_QUEUED, PHASE_EXTRACT, PHASE_DOWNLOAD, PHASE_POSTPROCESS_QUEUED, PHASE_POSTPROCESS, PHASE_FINALIZE)
+
+# Background fetches recorded with record_fetch()
+FETCH_METADATA = 'metadata'
+FETCH_THUMBNAIL = 'thumbnail'
+
+MAX_LOG_BYTES = 16 * 1024 * 1024  # The JSON-lines log is rotated to '.1' past this size
+TEXTFILE_INTERVAL = 1.0  # Minimum seconds between text file rewrites caused by fetches
+
+
+class JobMetrics:
+    """
+    Timing and transfer statistics for one download.
+
+    Attach 'progress_hook', 'postprocessor_hook' and 'logger' to the yt-dlp
+    options; phases then advance on their own (extract -> download ->
+    postprocess). finish() closes the record and hands it to the recorder.
+    """
+
+    def __init__(self, recorder, url, source, quality=None, cache_hit=False, queued_since=None):
+        self.recorder = recorder
+        self.url = url
+        self.source = source  # 'gui' or 'cli'
+        self.quality = quality
+        self.cache_hit = cache_hit  # Metadata came from the cache, no extract_info needed
+        self.retries = 0
+        self.peak_speed = 0.0
+        self.phases = {}  # phase -> seconds
+
+        self._files = {}  # file -> bytes received
+        self._lock = threading.Lock()
+        self._finished = False
+        self._started = queued_since or time.monotonic()
+        self._phase = None
+        self._phase_start = self._started
+        self.enter(PHASE_QUEUED if queued_since else PHASE_EXTRACT)
+
+    @property
+    def bytes(self):
+        return sum(self._files.values())
+
+    def enter(self, phase):
+        """Ends the current phase and starts 'phase' (no-op if it is already running)."""
+        with self._lock:
+            if phase == self._phase or self._finished:
+                return
+            self._close_phase(time.monotonic())
+            self._phase = phase
+
+    def _close_phase(self, now):
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + (now - self._phase_start)
+        self._phase_start = now
+
+    # ------------------------------------------------------------------------
+    # YT-DLP CALLBACKS
+    # ------------------------------------------------------------------------
+
+    def progress_hook(self, d):
+        if d.get('status') == 'downloading':
+            self.enter(PHASE_DOWNLOAD)
+            key = d.get('tmpfilename') or d.get('filename')
+            self._files[key] = d.get('downloaded_bytes') or 0
+            speed = d.get('speed') or 0
+            if speed > self.peak_speed:
+                self.peak_speed = speed
+        elif d.get('status') == 'finished':
+            key = d.get('tmpfilename') or d.get('filename')
+            total = d.get('total_bytes') or d.get('downloaded_bytes')
+            if total:
+                self._files[key] = total
+
+    def postprocessor_hook(self, d):
+        if d.get('status') == 'started':
+            self.enter(PHASE_POSTPROCESS)
+
+    @property
+    def logger(self):
+        """yt-dlp 'logger' that counts retries and otherwise behaves like quiet mode."""
+        return _RetryCountingLogger(self)
+
+    # ------------------------------------------------------------------------
+    # RESULT
+    # ------------------------------------------------------------------------
+
+    def finish(self, status, error=None):
+        """Closes the record ('done', 'error' or 'cancelled') and reports it. Only the first call counts."""
+        with self._lock:
+            if self._finished:
+                return None
+            self._finished = True
+            now = time.monotonic()
+            self._close_phase(now)
+            total = now - self._started
+
+        transfer = self.phases.get(PHASE_DOWNLOAD, 0.0)
+        nbytes = self.bytes
+        record = {
+            'type': 'job',
+            'ts': round(time.time(), 3),
+            'source': self.source,
+            'url': self.url,
+            'video_id': extract_video_id(self.url),
+            'quality': self.quality,
+            'status': status,
+            'error': error,
+            'total_s': round(total, 3),
+            'phases': {phase: round(self.phases[phase], 3) for phase in PHASES if phase in self.phases},
+            'bytes': nbytes,
+            'avg_speed': round(nbytes / transfer, 1) if transfer > 0 else None,
+            'peak_speed': round(self.peak_speed, 1),
+            'retries': self.retries,
+            'cache_hit': self.cache_hit,
+        }
+        if self.recorder is not None:
+            self.recorder.record_job(record)
+        return record
+
+
+class _RetryCountingLogger:
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def _count(self, msg):
+        if 'Retrying' in msg:
+            self.metrics.retries += 1
+
+    def debug(self, msg):
+        self._count(msg)
+
+    def info(self, msg):
+        self._count(msg)
+
+    def warning(self, msg):
+        self._count(msg)
+
+    def error(self, msg):
+        # Same destination yt-dlp uses without a logger
+        print(msg, file=sys.stderr)
+
+
+class MetricsRecorder:
+    """
+    Collects job and fetch metrics for this process.
+
+    Every finished job (and every metadata/thumbnail fetch) is appended to a
+    JSON-lines log. Process totals are kept in memory and written atomically
+    to a Prometheus text-format file, which the node exporter's textfile
+    collector can scrape. Counters start at zero with every process.
+    """
+
+    def __init__(self, log_path=None, textfile_path=None, enabled=True):
+        self.enabled = enabled
+        self.log_path = log_path or os.path.join(get_data_dir(), 'metrics.jsonl')
+        self.textfile_path = textfile_path or os.environ.get(TEXTFILE_ENV) or \
+            os.path.join(get_data_dir(), 'metrics.prom')
+
+        self._lock = threading.Lock()
+        self._jobs = {}  # (source, status) -> count
+        self._phase_sum = {phase: 0.0 for phase in PHASES}
+        self._phase_count = {phase: 0 for phase in PHASES}
+        self._bytes = 0
+        self._retries = 0
+        self._peak_speed = 0.0
+        self._cache = {}  # (kind, 'hit'/'miss') -> count
+        self._fetch_sum = {}  # kind -> seconds
+        self._fetch_count = {}  # kind -> fetches
+        self._fetch_errors = {}  # kind -> failed fetches
+        self._last_job = None
+        self._dirty = False
+        self._last_write = 0.0
+
+    def job(self, url, source, quality=None, cache_hit=False, queued_since=None):
+        """Starts a JobMetrics; 'queued_since' (time.monotonic()) adds a queued phase."""
+        return JobMetrics(self if self.enabled else None, url, source, quality, cache_hit, queued_since)
+
+    def record_job(self, record):
+        with self._lock:
+            key = (record['source'], record['status'])
+            self._jobs[key] = self._jobs.get(key, 0) + 1
+            for phase, seconds in record['phases'].items():
+                self._phase_sum[phase] += seconds
+                self._phase_count[phase] += 1
+            self._bytes += record['bytes']
+            self._retries += record['retries']
+            self._peak_speed = max(self._peak_speed, record['peak_speed'])
+            result = 'hit' if record['cache_hit'] else 'miss'
+            self._cache[('job', result)] = self._cache.get(('job', result), 0) + 1
+            self._last_job = record['ts']
+            self._append(record)
+        self.write_textfile()
+
+    def record_fetch(self, kind, seconds=None, cache_hit=False, ok=True):
+        """Records a metadata or thumbnail lookup. Cache hits need no 'seconds'."""
+        if not self.enabled:
+            return
+        with self._lock:
+            result = 'hit' if cache_hit else 'miss'
+            self._cache[(kind, result)] = self._cache.get((kind, result), 0) + 1
+            if seconds is not None:
+                self._fetch_sum[kind] = self._fetch_sum.get(kind, 0.0) + seconds
+                self._fetch_count[kind] = self._fetch_count.get(kind, 0) + 1
+            if not ok:
+                self._fetch_errors[kind] = self._fetch_errors.get(kind, 0) + 1
+            self._append({
+                'type': 'fetch',
+                'ts': round(time.time(), 3),
+                'kind': kind,
+                'seconds': round(seconds, 3) if seconds is not None else None,
+                'cache_hit': cache_hit,
+                'ok': ok,
+            })
+            due = time.monotonic() - self._last_write >= TEXTFILE_INTERVAL
+        if due:
+            self.write_textfile()
+
+    # ------------------------------------------------------------------------
+    # OUTPUT
+    # ------------------------------------------------------------------------
+
+    def _append(self, record):
+        """Appends one JSON line (called with the lock held)."""
+        self._dirty = True
+        try:
+            if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > MAX_LOG_BYTES:
+                os.replace(self.log_path, self.log_path + '.1')
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            log.warning("Metrics log write failed: %s", e)
+
+    def render(self):
+        """Returns the current totals in Prometheus text exposition format."""
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            header('ytdl_jobs_total', 'counter', 'Finished downloads by source and status.')
+            for (source, status), count in sorted(self._jobs.items()):
+                lines.append(f'ytdl_jobs_total{{source="{source}",status="{status}"}} {count}')
+
+            header('ytdl_job_phase_seconds', 'summary', 'Time spent per job phase.')
+            for phase in PHASES:
+                lines.append(f'ytdl_job_phase_seconds_sum{{phase="{phase}"}} {self._phase_sum[phase]:.3f}')
+                lines.append(f'ytdl_job_phase_seconds_count{{phase="{phase}"}} {self._phase_count[phase]}')
+
+            header('ytdl_downloaded_bytes_total', 'counter', 'Bytes received by finished downloads.')
+            lines.append(f'ytdl_downloaded_bytes_total {self._bytes}')
+
+            header('ytdl_download_retries_total', 'counter', 'Retries reported by yt-dlp.')
+            lines.append(f'ytdl_download_retries_total {self._retries}')
+
+            header('ytdl_peak_speed_bytes', 'gauge', 'Highest speed seen by any download (bytes/s).')
+            lines.append(f'ytdl_peak_speed_bytes {self._peak_speed:.1f}')
+
+            header('ytdl_cache_lookups_total', 'counter', 'Metadata, thumbnail and per-job cache lookups.')
+            for (kind, result), count in sorted(self._cache.items()):
+                lines.append(f'ytdl_cache_lookups_total{{kind="{kind}",result="{result}"}} {count}')
+
+            header('ytdl_fetch_seconds', 'summary', 'Time spent fetching metadata and thumbnails.')
+            for kind in sorted(self._fetch_count):
+                lines.append(f'ytdl_fetch_seconds_sum{{kind="{kind}"}} {self._fetch_sum[kind]:.3f}')
+                lines.append(f'ytdl_fetch_seconds_count{{kind="{kind}"}} {self._fetch_count[kind]}')
+
+            header('ytdl_fetch_errors_total', 'counter', 'Failed metadata and thumbnail fetches.')
+            for kind, count in sorted(self._fetch_errors.items()):
+                lines.append(f'ytdl_fetch_errors_total{{kind="{kind}"}} {count}')
+
+            if self._last_job is not None:
+                header('ytdl_last_job_timestamp_seconds', 'gauge', 'Unix time of the last finished job.')
+                lines.append(f'ytdl_last_job_timestamp_seconds {self._last_job}')
+
+            self._dirty = False
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self):
+        """Atomically rewrites the Prometheus text file (a scrape never sees a partial file)."""
+        if not self.enabled:
+            return
+        text = self.render()
+        temp_path = f'{self.textfile_path}.{os.getpid()}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_path, self.textfile_path)
+        except OSError as e:
+            log.warning("Metrics text file write failed: %s", e)
+        self._last_write = time.monotonic()
+
+    def flush(self):
+        """Writes the text file if anything changed since the last write."""
+        if self._dirty:
+            self.write_textfile()
+
+
+_default_recorder = None
+_default_recorder_lock = threading.Lock()
+
+
+def get_metrics_recorder():
+    """Returns the process-wide MetricsRecorder (disabled if SMART_YTDL_METRICS=0)."""
+    global _default_recorder
+    with _default_recorder_lock:
+        if _default_recorder is None:
+            _default_recorder = MetricsRecorder(enabled=os.environ.get(METRICS_ENV, '1') != '0')
+            atexit.register(_default_recorder.flush)
+        return _default_recorder
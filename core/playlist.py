@@ -0,0 +1,70 @@
+from core.session import get_ydl_pool
+from core.urls import extract_video_id, is_playlist_url
+
+
+def iter_playlist_entries(url):
+    """
+    Yields {'url', 'id', 'title'} for every video of a playlist or channel.
+    Uses flat, lazy extraction: entries are produced page by page as
+    YouTube returns them, without fetching per-video metadata.
+    Channel pages (whose entries are tabs such as Videos/Shorts) are expanded recursively.
+    """
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'noplaylist': False,
+        'socket_timeout': 10,
+    }
+    with get_ydl_pool().lease(ydl_opts) as ydl:
+        yield from _walk(ydl, url, depth=0)
+
+
+def _walk(ydl, url, depth):
+    # process=False keeps 'entries' as the extractor's generator (no eager paging)
+    info = ydl.extract_info(url, download=False, process=False)
+    entries = info.get('entries') if info else None
+    if entries is None:
+        if info and info.get('id'):
+            yield _entry(info)
+        return
+
+    for entry in entries:
+        if not entry:
+            continue
+        is_nested = entry.get('_type') == 'playlist' or (
+            entry.get('_type') == 'url' and entry.get('ie_key') == 'YoutubeTab'
+        )
+        if is_nested:
+            if depth < 2 and entry.get('url'):
+                yield from _walk(ydl, entry['url'], depth + 1)
+            continue
+        if entry.get('id') or entry.get('url'):
+            yield _entry(entry)
+
+
+def _entry(entry):
+    video_id = entry.get('id')
+    url = entry.get('url') or entry.get('webpage_url')
+    if video_id and (not url or not url.startswith('http')):
+        url = f"https://www.youtube.com/watch?v={video_id}"
+    return {
+        'url': url,
+        'id': video_id,
+        'title': entry.get('title') or video_id or url,
+    }
+
+
+def expand_urls(urls):
+    """
+    Yields plain video URLs: playlist/channel URLs are expanded lazily,
+    everything else passes through. Repeated videos are yielded once.
+    """
+    seen = set()
+    for url in urls:
+        items = (e['url'] for e in iter_playlist_entries(url)) if is_playlist_url(url) else [url]
+        for item in items:
+            key = extract_video_id(item) or item
+            if key in seen:
+                continue
+            seen.add(key)
+            yield item
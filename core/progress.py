@@ -0,0 +1,108 @@
+import threading
+
+# Default UI refresh rate for coalesced progress updates
+DEFAULT_PROGRESS_HZ = 10
+
+
+def snapshot_from_hook(d):
+    """
+    Builds a numeric progress snapshot from a yt-dlp progress hook dict.
+    Uses the raw byte counters (falling back to fragment counts) instead of
+    the ANSI-coloured '_percent_str' / '_speed_str' strings.
+    """
+    downloaded = d.get('downloaded_bytes') or 0
+    total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+    speed = d.get('speed') or 0.0
+    eta = d.get('eta')
+
+    if total:
+        percent = min(100.0, downloaded * 100.0 / total)
+    elif d.get('fragment_count'):
+        percent = min(100.0, (d.get('fragment_index') or 0) * 100.0 / d['fragment_count'])
+    else:
+        percent = 0.0
+
+    if eta is None and speed and total:
+        eta = max(0, (total - downloaded) / speed)
+
+    return {
+        'status': d.get('status'),
+        'downloaded_bytes': downloaded,
+        'total_bytes': total,
+        'speed': speed,
+        'eta': eta,
+        'percent': percent,
+        'filename': d.get('filename'),  # Final name; yt-dlp writes to '<filename>.part' meanwhile
+    }
+
+
+def format_speed(bytes_per_sec):
+    if not bytes_per_sec:
+        return 'N/A'
+    for unit in ('B/s', 'KiB/s', 'MiB/s', 'GiB/s'):
+        if bytes_per_sec < 1024 or unit == 'GiB/s':
+            return f'{bytes_per_sec:.2f}{unit}'
+        bytes_per_sec /= 1024
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return 'N/A'
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f'{hours}:{minutes:02d}:{secs:02d}' if hours else f'{minutes:02d}:{secs:02d}'
+
+
+def format_status(snapshot):
+    """Status column text for a snapshot, e.g. '2.31MiB/s | ETA: 00:42'."""
+    if snapshot['status'] == 'finished':
+        return 'Processing...'
+    return f"{format_speed(snapshot['speed'])} | ETA: {format_eta(snapshot['eta'])}"
+
+
+class ProgressAggregator:
+    """
+    Coalesces progress events from many download threads.
+    Producers call report() on every yt-dlp callback; the consumer calls
+    drain() at its own frame rate and gets only the latest snapshot per job.
+    Events overwritten before a drain are counted as merged.
+    """
+
+    def __init__(self):
+        self.received = 0
+        self.delivered = 0
+        self.merged = 0
+        self._pending = {}  # job_id -> latest snapshot
+        self._latest_speed = {}  # job_id -> bytes/s, kept between drains for throughput
+        self._lock = threading.Lock()
+
+    def report(self, job_id, snapshot):
+        with self._lock:
+            self.received += 1
+            if job_id in self._pending:
+                self.merged += 1
+            self._pending[job_id] = snapshot
+            self._latest_speed[job_id] = snapshot['speed'] if snapshot['status'] == 'downloading' else 0.0
+
+    def drain(self):
+        """Returns {job_id: snapshot} for every job that reported since the last drain."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self.delivered += len(batch)
+        return batch
+
+    def discard(self, job_id):
+        """Forgets a job (call when it finishes so a stale frame can't overwrite its final status)."""
+        with self._lock:
+            if self._pending.pop(job_id, None) is not None:
+                self.merged += 1
+            self._latest_speed.pop(job_id, None)
+
+    def total_speed(self):
+        with self._lock:
+            return sum(self._latest_speed.values())
+
+    def stats(self):
+        with self._lock:
+            return {'received': self.received, 'delivered': self.delivered, 'merged': self.merged}
@@ -0,0 +1,117 @@
+import random
+import re
+
+# Error classes (see classify_error)
+ERROR_THROTTLED = 'throttled'  # HTTP 403 / 429: the site wants us to slow down
+ERROR_NETWORK = 'network'  # Timeouts, resets, DNS, HTTP 5xx
+ERROR_FORMAT = 'format'  # The chosen format is gone or cannot be served
+ERROR_FATAL = 'fatal'  # Private, removed, geo-blocked...: retrying cannot help
+ERROR_CANCELLED = 'cancelled'
+ERROR_UNKNOWN = 'unknown'
+
+# First match wins, so the more specific classes come first
+ERROR_PATTERNS = [
+    (ERROR_CANCELLED, r'^cancelled$|cancelled by user'),
+    (ERROR_FATAL, r'private video|video unavailable|has been removed|not available in your country|'
+                  r'members-only|sign in to confirm|copyright|unsupported url|is not a valid url|'
+                  r'account .* terminated|no space left on device|permission denied'),
+    (ERROR_FORMAT, r'requested format is not available|no video formats found|format .* not available'),
+    (ERROR_THROTTLED, r'\b(403|429)\b|forbidden|too many requests|rate.?limit'),
+    (ERROR_NETWORK, r'timed? ?out|connection (reset|refused|aborted)|temporary failure|name resolution|'
+                    r'network is unreachable|remote end closed|incompleteread|'
+                    r'http error 5\d\d|bad gateway|service unavailable|\bssl\b'),
+]
+_PATTERNS = [(error_class, re.compile(pattern, re.IGNORECASE)) for error_class, pattern in ERROR_PATTERNS]
+
+# Heights tried, in order, when a format keeps failing
+FALLBACK_HEIGHTS = (2160, 1440, 1080, 720, 480, 360, 240, 144)
+
+
+def classify_error(message):
+    """Maps an error message (yt-dlp or our own) to one of the ERROR_* classes."""
+    text = message or ''
+    for error_class, pattern in _PATTERNS:
+        if pattern.search(text):
+            return error_class
+    return ERROR_UNKNOWN
+
+
+def fallback_quality(quality):
+    """
+    The next lower quality label for a format error ("1080p" -> "720p",
+    "720p (Video Only)" -> "480p (Video Only)", "Best Quality" -> "1080p"),
+    or None if there is nothing lower (or for audio).
+    """
+    if "Audio Only" in quality:
+        return None
+    digits = ''.join(filter(str.isdigit, quality))
+    suffix = " (Video Only)" if "Video Only" in quality else ""
+    if not digits:
+        return f"1080p{suffix}"
+    lower = [h for h in FALLBACK_HEIGHTS if h < int(digits)]
+    return f"{lower[0]}p{suffix}" if lower else None
+
+
+class RetryPolicy:
+    """How one error class is retried: attempts in total, and exponential backoff with jitter."""
+
+    __slots__ = ('max_attempts', 'base_delay', 'max_delay', 'multiplier', 'jitter', 'fallback_format')
+
+    def __init__(self, max_attempts=1, base_delay=0.0, max_delay=0.0, multiplier=2.0, jitter=0.5,
+                 fallback_format=False):
+        self.max_attempts = max(1, int(max_attempts))  # Including the first try
+        self.base_delay = base_delay  # Seconds before the first retry
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter  # +/- fraction, so jobs that failed together don't retry together
+        self.fallback_format = fallback_format  # Retry one quality step lower each time
+
+    def delay(self, attempt, rng=random):
+        """Seconds to wait after failed attempt number 'attempt' (1 = the first try)."""
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        return max(0.0, delay * rng.uniform(1 - self.jitter, 1 + self.jitter))
+
+
+DEFAULT_POLICIES = {
+    ERROR_THROTTLED: RetryPolicy(max_attempts=5, base_delay=30, max_delay=15 * 60),
+    ERROR_NETWORK: RetryPolicy(max_attempts=6, base_delay=5, max_delay=5 * 60),
+    ERROR_FORMAT: RetryPolicy(max_attempts=4, base_delay=2, max_delay=10, fallback_format=True),
+    ERROR_UNKNOWN: RetryPolicy(max_attempts=2, base_delay=15, max_delay=60),
+    ERROR_FATAL: RetryPolicy(),
+    ERROR_CANCELLED: RetryPolicy(),
+}
+
+
+class RetryDecision:
+    """What to do after a failed attempt. 'delay' is None when the job gives up."""
+
+    __slots__ = ('error_class', 'attempt', 'max_attempts', 'delay', 'quality')
+
+    def __init__(self, error_class, attempt, max_attempts, delay=None, quality=None):
+        self.error_class = error_class
+        self.attempt = attempt  # The attempt that just failed (1-based)
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.quality = quality  # Lower quality for the next attempt (None: unchanged)
+
+    @property
+    def retry(self):
+        return self.delay is not None
+
+
+class RetryEngine:
+    """Applies per-error-class RetryPolicies. Stateless: the caller counts attempts per job."""
+
+    def __init__(self, policies=None, rng=None):
+        self.policies = dict(DEFAULT_POLICIES)
+        self.policies.update(policies or {})
+        self.rng = rng or random.Random()
+
+    def decide(self, error_msg, attempt, quality):
+        """Decision after attempt number 'attempt' of a job at 'quality' failed with 'error_msg'."""
+        error_class = classify_error(error_msg)
+        policy = self.policies.get(error_class, self.policies[ERROR_UNKNOWN])
+        if attempt >= policy.max_attempts:
+            return RetryDecision(error_class, attempt, policy.max_attempts)
+        lower = fallback_quality(quality) if policy.fallback_format else None
+        return RetryDecision(error_class, attempt, policy.max_attempts, policy.delay(attempt, self.rng), lower)
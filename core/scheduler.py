@@ -0,0 +1,406 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from core.downloader import DownloadWorker
+from core.engine import resolve_format, clean_error, get_postprocess_pool
+from core.bandwidth import get_bandwidth_governor, NORMAL_WEIGHT, URGENT_WEIGHT
+from core.metrics import get_metrics_recorder
+from core.archive import get_download_archive
+from core.jobs import (STATUS_PENDING, STATUS_DOWNLOADING, STATUS_POSTPROCESSING, STATUS_RETRYING, STATUS_DONE,
+                       STATUS_ERROR)
+from core.retry import RetryEngine, ERROR_FORMAT
+from core.progress import ProgressAggregator, DEFAULT_PROGRESS_HZ, format_status, format_eta
+
+# A cancelled job gives its slot back after at most this long, even if its thread is still unwinding
+CANCEL_GRACE_MS = 1000
+
+
+class DownloadScheduler(QObject):
+    """
+    Runs the pending jobs of a JobStore in parallel.
+    Keeps up to 'max_slots' DownloadWorker threads busy, never more than
+    'per_host_limit' against the same host, and starts the next job as soon
+    as a slot opens. Job states in the store are updated as jobs progress.
+    Conversions (e.g. MP3 extraction) run on the shared PostprocessPool, so a
+    slot is freed as soon as its download is on disk.
+    Failed jobs are retried as their error class's policy allows (see
+    core.retry); while a job waits out its backoff its slot runs other jobs.
+    """
+    # Signals (all carry store job IDs)
+    job_started = pyqtSignal(object)
+    jobs_changed = pyqtSignal(list)  # Job IDs whose status/progress changed this frame
+    job_finished = pyqtSignal(object)
+    job_failed = pyqtSignal(object, str)  # Final: no retries left
+    job_retrying = pyqtSignal(object, str, object)  # job_id, error text, RetryDecision
+    throughput_updated = pyqtSignal(float, int)  # total bytes/s, active jobs
+    queue_drained = pyqtSignal()
+    upcoming_jobs = pyqtSignal(list)  # Job IDs likely to start next (for metadata prefetch)
+    _postprocess_done = pyqtSignal(object, object)  # job_id, error text or None (from pool threads)
+
+    def __init__(self, store, max_slots=3, per_host_limit=3, progress_hz=DEFAULT_PROGRESS_HZ, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.max_slots = max(1, int(max_slots))
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.connections = 1  # Connections per download (segmented mode when > 1)
+        self.governor = get_bandwidth_governor()  # Shared with every other download in the process
+        self.metrics = get_metrics_recorder()  # Per-job phase timing (JSON lines + Prometheus file)
+        self.postprocess_pool = get_postprocess_pool()  # One conversion per CPU core
+        self.archive = get_download_archive()  # Finished downloads, checked before queueing
+        self.retry_engine = RetryEngine()  # Per-error-class backoff and format fallback
+        self.output_path = None
+        self.running = False  # Dispatch pending jobs only after start()
+
+        self._active = {}  # job_id -> (DownloadWorker, host)
+        self._host_load = {}  # host -> running job count
+        self._retired = []  # Workers that reported completion but may still be unwinding
+        self._postprocessing = {}  # job_id -> (Future of its deferred conversion, engine DownloadJob)
+        self._paused = set()  # Running job IDs on hold (they keep their slot and partial file)
+        self._retrying = {}  # job_id -> single-shot QTimer that requeues it after its backoff
+        self._expansions = 0  # Playlist listings still adding jobs (the batch can't end before them)
+        self._postprocess_done.connect(self._on_postprocess_done)
+
+        # Coalesced per-job progress, flushed at 'progress_hz'
+        self.progress = ProgressAggregator()
+        self._frame_timer = QTimer(self)
+        self._frame_timer.timeout.connect(self._flush_progress)
+        self.set_progress_rate(progress_hz)
+
+        # Aggregate throughput report (1 Hz)
+        self._stats_timer = QTimer(self)
+        self._stats_timer.setInterval(1000)
+        self._stats_timer.timeout.connect(self._report_throughput)
+
+    # ------------------------------------------------------------------------
+    # PUBLIC API
+    # ------------------------------------------------------------------------
+
+    def start(self, output_path):
+        """Starts (or keeps) dispatching pending jobs into 'output_path'."""
+        self.output_path = output_path
+        self.running = True
+        self.dispatch()
+
+    def dispatch(self):
+        """Fills free slots. Call after adding or reprioritizing jobs."""
+        if self.running:
+            self._fill_slots()
+
+    def begin_expansion(self):
+        """A playlist listing started: keeps the batch open until end_expansion()."""
+        self._expansions += 1
+
+    def end_expansion(self):
+        """A listing finished (or failed). Ends the batch if nothing else is left."""
+        self._expansions = max(0, self._expansions - 1)
+        self.dispatch()
+
+    def set_max_slots(self, count):
+        """Changes the number of concurrent downloads. Extra slots are filled immediately."""
+        self.max_slots = max(1, int(count))
+        self.dispatch()
+
+    def set_per_host_limit(self, count):
+        self.per_host_limit = max(1, int(count))
+        self.dispatch()
+
+    def set_connections(self, count):
+        """Sets the connections used per download. Applies to jobs started afterwards."""
+        self.connections = max(1, int(count))
+
+    def set_priority(self, job_id, priority):
+        """Changes a running job's share of the bandwidth limit."""
+        entry = self._active.get(job_id)
+        if entry is not None:
+            entry[0].bandwidth_ticket.set_weight(self._weight(priority))
+
+    def set_progress_rate(self, hz):
+        """Sets how many times per second progress is pushed to the UI."""
+        self._frame_timer.setInterval(max(1, int(1000 / max(0.1, hz))))
+
+    def cancel(self, job_id):
+        """Stops a running job (pending jobs are simply removed from the store)."""
+        entry = self._active.get(job_id)
+        if entry is not None:
+            worker = entry[0]
+            worker.stop()
+            # Normally the worker reports back within milliseconds; if it is stuck
+            # (e.g. on a stalled socket) the slot is reclaimed anyway
+            QTimer.singleShot(CANCEL_GRACE_MS, lambda: self._release_cancelled(job_id, worker))
+        pending = self._postprocessing.get(job_id)
+        if pending is not None:
+            future, engine_job = pending
+            future.cancel()  # Still queued: never runs
+            engine_job.cancel()  # Running: FFmpeg is killed
+        timer = self._retrying.pop(job_id, None)
+        if timer is not None:
+            # Waiting for a retry: there is nothing running to stop
+            timer.stop()
+            timer.deleteLater()
+            self.store.set_status(job_id, STATUS_ERROR, "Cancelled")
+            if self.running:
+                self._fill_slots()
+
+    def pause(self, job_id):
+        """Holds a running job. It keeps its slot, partial file and connections."""
+        entry = self._active.get(job_id)
+        if entry is None or job_id in self._paused:
+            return False
+        entry[0].pause()
+        self._paused.add(job_id)
+        self.progress.discard(job_id)  # Its last speed no longer counts
+        job = self.store.get(job_id)
+        if job is not None:
+            job.status_text = f"⏸️ Paused ({job.progress}%)"
+            self.jobs_changed.emit([job_id])
+        return True
+
+    def resume(self, job_id):
+        entry = self._active.get(job_id)
+        if entry is None or job_id not in self._paused:
+            return False
+        self._paused.discard(job_id)
+        entry[0].resume()
+        job = self.store.get(job_id)
+        if job is not None:
+            job.status_text = "▶️ Resuming..."
+            self.jobs_changed.emit([job_id])
+        return True
+
+    def is_paused(self, job_id):
+        return job_id in self._paused
+
+    def is_active(self, job_id):
+        return job_id in self._active
+
+    def is_postprocessing(self, job_id):
+        return job_id in self._postprocessing
+
+    def is_retrying(self, job_id):
+        return job_id in self._retrying
+
+    def is_busy(self):
+        return (bool(self._active) or bool(self._postprocessing) or bool(self._retrying)
+                or (self.running and (self.store.pending_count() > 0 or self._expansions > 0)))
+
+    def requeue(self, job_id):
+        """Puts a failed job back in the queue with a fresh set of attempts."""
+        job = self.store.get(job_id)
+        if job is None or job.status != STATUS_ERROR:
+            return False
+        job.attempts = 0
+        job.retry_quality = None
+        self.store.set_status(job_id, STATUS_PENDING)
+        self.jobs_changed.emit([job_id])
+        return True
+
+    def active_count(self):
+        return len(self._active)
+
+    def pending_count(self):
+        return self.store.pending_count()
+
+    def postprocessing_count(self):
+        """Downloaded jobs queued or running on the postprocessing pool."""
+        return len(self._postprocessing)
+
+    def retrying_count(self):
+        """Failed jobs waiting out a backoff before their next attempt."""
+        return len(self._retrying)
+
+    def total_speed(self):
+        """Sum of the last reported speeds of all running jobs (bytes/s)."""
+        return self.progress.total_speed()
+
+    # ------------------------------------------------------------------------
+    # SLOT MANAGEMENT
+    # ------------------------------------------------------------------------
+
+    def _host_allowed(self, host):
+        return self._host_load.get(host, 0) < self.per_host_limit
+
+    def _weight(self, priority):
+        return URGENT_WEIGHT if priority > 0 else NORMAL_WEIGHT
+
+    def _fill_slots(self):
+        """Starts pending jobs until all slots are busy or nothing else fits."""
+        while len(self._active) < self.max_slots:
+            job = self.store.next_pending(self._host_allowed)
+            if job is None:
+                break
+            self._start(job)
+
+        # Let the UI warm metadata for the jobs that will take the next free slots
+        upcoming = self.store.peek_pending(self.max_slots)
+        if upcoming:
+            self.upcoming_jobs.emit([job.job_id for job in upcoming])
+
+        if (self._active or self._postprocessing) and not self._stats_timer.isActive():
+            self._stats_timer.start()
+            self._frame_timer.start()
+        elif (not self._active and not self._postprocessing and not self._retrying and not self._expansions
+              and self.running):
+            # Idle between two pages of a listing is not the end of the batch
+            self._finish_batch()
+
+    def _start(self, job):
+        job_id = job.job_id
+        # Pin output folder and exact format before the job is journaled as
+        # downloading, so a resumed run finds and continues the same '.part' files
+        job.output_path = job.output_path or self.output_path
+        quality = job.retry_quality or job.quality
+        if not job.format_spec:
+            info, format_spec = resolve_format(job.info, quality)
+            if info is not None:
+                job.format_spec = format_spec
+        job.attempts += 1
+        metrics = self.metrics.job(job.url, 'gui', quality, queued_since=job.queued_at)
+        worker = DownloadWorker(
+            job.url, quality, job.output_path, job.info,
+            progress_sink=lambda snapshot: self.progress.report(job_id, snapshot),
+            format_spec=job.format_spec,
+            connections=self.connections,
+            bandwidth_ticket=self.governor.ticket(self._weight(job.priority)),
+            metrics=metrics,
+            defer_postprocessing=True,
+            archive=self.archive,
+        )
+        job.info = None  # The worker owns it now
+
+        worker.finished.connect(lambda: self._on_job_done(job_id, None))
+        worker.error_occurred.connect(lambda err: self._on_job_done(job_id, err))
+
+        self._active[job_id] = (worker, job.host)
+        self._host_load[job.host] = self._host_load.get(job.host, 0) + 1
+        self.store.set_status(job_id, STATUS_DOWNLOADING)
+        self.job_started.emit(job_id)
+        worker.start()
+
+    def _flush_progress(self):
+        """Writes the latest snapshot of every job that changed since the last frame into the store."""
+        changed = []
+        for job_id, snap in self.progress.drain().items():
+            job = self.store.get(job_id)
+            if job is None or job_id not in self._active or job_id in self._paused:
+                continue
+            job.progress = int(snap['percent'])
+            job.status_text = format_status(snap)
+            self.store.checkpoint(job_id, snap)
+            changed.append(job_id)
+        if changed:
+            self.jobs_changed.emit(changed)
+
+    def _on_job_done(self, job_id, error_msg):
+        entry = self._active.pop(job_id, None)
+        if entry is None:
+            return
+        worker, host = entry
+        self._host_load[host] -= 1
+        self._paused.discard(job_id)
+        self.progress.discard(job_id)
+
+        # The custom 'finished' signal fires before run() returns,
+        # so keep the thread object alive until it has really stopped.
+        self._retired = [w for w in self._retired if not w.isFinished()]
+        self._retired.append(worker)
+
+        result = worker.result
+        if error_msg is None and result and result['postprocessors']:
+            # Downloaded: hand the conversion to the CPU pool and give the slot to the next job
+            future = self.postprocess_pool.submit(worker.job, result)
+            self._postprocessing[job_id] = (future, worker.job)
+            future.add_done_callback(lambda f: self._postprocess_done.emit(job_id, self._future_error(f)))
+            if self.store.get(job_id) is not None:
+                self.store.set_status(job_id, STATUS_POSTPROCESSING)
+                self.jobs_changed.emit([job_id])
+        else:
+            self._complete(job_id, error_msg)
+
+        self._fill_slots()
+
+    def _release_cancelled(self, job_id, worker):
+        """Frees a cancelled job's slot if its worker has not reported back yet."""
+        entry = self._active.get(job_id)
+        if entry is not None and entry[0] is worker:
+            # Its late finished/error signal finds no entry and is ignored
+            self._on_job_done(job_id, "Cancelled")
+
+    def _on_postprocess_done(self, job_id, error_msg):
+        """A deferred conversion ended (delivered in the GUI thread)."""
+        if self._postprocessing.pop(job_id, None) is None:
+            return
+        self._complete(job_id, error_msg)
+        if not self._active and not self._postprocessing and not self._retrying and self.running:
+            self._fill_slots()
+
+    @staticmethod
+    def _future_error(future):
+        if future.cancelled():
+            return "Cancelled"
+        error = future.exception()
+        return clean_error(error) if error is not None else None
+
+    def _complete(self, job_id, error_msg):
+        # The job may have been removed from the store meanwhile
+        if self.store.get(job_id) is None:
+            return
+        if error_msg is None:
+            self.store.get(job_id).progress = 100
+            self.store.set_status(job_id, STATUS_DONE)
+            self.job_finished.emit(job_id)
+            return
+
+        job = self.store.get(job_id)
+        decision = self.retry_engine.decide(error_msg, job.attempts, job.retry_quality or job.quality)
+        if decision.retry:
+            self._schedule_retry(job, error_msg, decision)
+        else:
+            self.store.set_status(job_id, STATUS_ERROR)
+            self.job_failed.emit(job_id, error_msg)
+
+    # ------------------------------------------------------------------------
+    # RETRIES
+    # ------------------------------------------------------------------------
+
+    def _schedule_retry(self, job, error_msg, decision):
+        """Parks a failed job (no slot) until its backoff has passed, then requeues it."""
+        job_id = job.job_id
+        if decision.error_class == ERROR_FORMAT:
+            job.format_spec = None  # The pinned streams are what failed
+        if decision.quality:
+            job.retry_quality = decision.quality
+        job.progress = 0
+
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: self._retry_due(job_id))
+        timer.start(int(decision.delay * 1000))
+        self._retrying[job_id] = timer
+
+        quality_note = f", at {job.retry_quality}" if job.retry_quality else ""
+        self.store.set_status(job_id, STATUS_RETRYING,
+                              f"🔁 Retry {decision.attempt + 1}/{decision.max_attempts} in "
+                              f"{format_eta(decision.delay)}{quality_note}")
+        self.jobs_changed.emit([job_id])
+        self.job_retrying.emit(job_id, error_msg, decision)
+
+    def _retry_due(self, job_id):
+        timer = self._retrying.pop(job_id, None)
+        if timer is not None:
+            timer.deleteLater()
+        job = self.store.get(job_id)
+        if job is not None and job.status == STATUS_RETRYING:
+            # Back of the queue: jobs that never failed go first
+            self.store.set_status(job_id, STATUS_PENDING, f"🔁 Waiting for attempt {job.attempts + 1}")
+            self.jobs_changed.emit([job_id])
+        if self.running:
+            self._fill_slots()
+
+    def _finish_batch(self):
+        """Every dispatchable job has run: stop timers and report the end of the batch."""
+        self.running = False
+        self._stats_timer.stop()
+        self._frame_timer.stop()
+        self.throughput_updated.emit(0.0, 0)
+        self.queue_drained.emit()
+
+    def _report_throughput(self):
+        self.throughput_updated.emit(self.total_speed(), len(self._active))
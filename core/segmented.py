@@ -0,0 +1,360 @@
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+from core.storage import preallocate
+
+# Connections per file when segmented mode is enabled without a count
+DEFAULT_CONNECTIONS = 4
+
+# Adaptive request sizing: each connection starts small and doubles its
+# range requests while they stay fast, up to MAX_REQUEST (YouTube throttles
+# single ranges larger than ~10 MiB, so yt-dlp's http_chunk_size wins if set)
+MIN_REQUEST = 1024 * 1024
+MAX_REQUEST = 10 * 1024 * 1024
+FAST_REQUEST = 1.0  # seconds; a request quicker than this grows the next one
+
+# A running segment is split for an idle connection only if both halves are at least this big
+MIN_SPLIT = 2 * 1024 * 1024
+
+READ_SIZE = 256 * 1024
+RETRIES = 3
+STATE_SUFFIX = '.segments'  # Sidecar recording per-segment progress, for resume
+
+CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+
+class RangeNotSupported(Exception):
+    """The server ignored a Range request (or its size is unknown)."""
+
+
+class _Segment:
+    __slots__ = ('start', 'pos', 'end', 'active')
+
+    def __init__(self, start, pos, end):
+        self.start = start
+        self.pos = pos  # Next byte to write
+        self.end = end  # Exclusive; lowered when another connection takes the tail
+        self.active = False
+
+
+def _connect(url, timeout):
+    parts = urlsplit(url)
+    conn_cls = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    return conn_cls(parts.hostname, parts.port, timeout=timeout)
+
+
+def _request_target(url):
+    parts = urlsplit(url)
+    return (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+
+
+def probe_size(url, headers=None, timeout=10):
+    """
+    Returns the total size of 'url' if the server answers ranged requests.
+    Raises RangeNotSupported otherwise.
+    """
+    conn = _connect(url, timeout)
+    try:
+        conn.request('GET', _request_target(url), headers=dict(headers or {}, Range='bytes=0-0'))
+        resp = conn.getresponse()
+        resp.read()
+        match = CONTENT_RANGE_RE.match(resp.getheader('Content-Range') or '')
+        if resp.status != 206 or not match or match.group(3) == '*':
+            raise RangeNotSupported(f'HTTP {resp.status} for a ranged request')
+        return int(match.group(3))
+    finally:
+        conn.close()
+
+
+class SegmentedDownload:
+    """
+    Downloads one file over several HTTP connections at once.
+
+    The file is preallocated and every connection writes its byte ranges
+    straight into place, so no reassembly pass is needed. Work is balanced
+    adaptively: connections start with one segment each, grow their range
+    requests while they are fast, and an idle connection takes over the
+    second half of the largest unfinished segment.
+
+    Progress per segment is kept in '<path>.segments', so an interrupted
+    download continues where each segment stopped; a '.part' left by a
+    single-connection download is continued after its last byte.
+    Connections write unbuffered, so a checkpoint only counts bytes already
+    handed to the OS; with 'sync' the file is also fsynced before every
+    checkpoint, so a resume after a power loss never trusts bytes that had
+    not reached the disk.
+    """
+
+    def __init__(self, url, path, total_size, connections=DEFAULT_CONNECTIONS, headers=None,
+                 max_request=MAX_REQUEST, progress=None, throttle=None, timeout=20,
+                 preallocate=True, read_size=READ_SIZE, sync=False):
+        self.url = url
+        self.path = path
+        self.total_size = int(total_size)
+        self.connections = max(1, int(connections))
+        self.headers = dict(headers or {})
+        self.max_request = max(MIN_REQUEST, int(max_request or MAX_REQUEST))
+        # progress(downloaded_bytes, total_bytes, speed) runs on the calling thread; raising aborts
+        self.progress = progress
+        # throttle(nbytes) is called by each connection after every write and may block (rate limiting)
+        self.throttle = throttle
+        self.timeout = timeout
+        self.preallocate = preallocate  # False: sparse file (fallocate can be slow on network shares)
+        self.read_size = max(4096, int(read_size or READ_SIZE))  # Bytes per read and write
+        self.sync = sync
+
+        self.state_path = path + STATE_SUFFIX
+        self._segments = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._errors = []
+        self._socks = set()  # Sockets with a response being read, so abort() can unblock them
+
+    # ------------------------------------------------------------------------
+    # PUBLIC API
+    # ------------------------------------------------------------------------
+
+    def run(self):
+        """Downloads the file. Raises the first connection error (or progress callback exception)."""
+        self._prepare()
+        threads = [threading.Thread(target=self._worker, name=f'segment-{i}', daemon=True)
+                   for i in range(min(self.connections, len(self._segments)) or 1)]
+        for t in threads:
+            t.start()
+
+        last_save = last_tick = time.monotonic()
+        last_done = self.downloaded_bytes()
+        speed = 0.0
+        try:
+            while any(t.is_alive() for t in threads):
+                time.sleep(0.1)
+                now = time.monotonic()
+                done = self.downloaded_bytes()
+                if now > last_tick:
+                    # Smoothed rate over the last ticks
+                    rate = (done - last_done) / (now - last_tick)
+                    speed = rate if not speed else speed * 0.7 + rate * 0.3
+                    last_tick, last_done = now, done
+                    if self.progress is not None:
+                        self.progress(done, self.total_size, speed)
+                if now - last_save >= 1.0:
+                    self._save_state()
+                    last_save = now
+        except BaseException:
+            self._stop.set()
+            for t in threads:
+                t.join()
+            self._save_state()
+            raise
+
+        if self._errors:
+            self._save_state()
+            raise self._errors[0]
+
+        if self.downloaded_bytes() < self.total_size:
+            self._save_state()
+            raise OSError(f'Segmented download ended early ({self.downloaded_bytes()}/{self.total_size} bytes)')
+
+        try:
+            os.unlink(self.state_path)
+        except OSError:
+            pass
+
+    def abort(self):
+        """
+        Stops every connection now (any thread): reads blocked on a stalled
+        socket return at once instead of waiting for the timeout.
+        """
+        self._stop.set()
+        with self._lock:
+            socks = list(self._socks)
+        for sock in socks:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def downloaded_bytes(self):
+        with self._lock:
+            return sum(s.pos - s.start for s in self._segments)
+
+    # ------------------------------------------------------------------------
+    # SETUP / RESUME STATE
+    # ------------------------------------------------------------------------
+
+    def _prepare(self):
+        segments = self._load_state()
+        if segments is None:
+            # Fresh start: one segment per connection, file sized (and optionally preallocated) up front.
+            # A '.part' from a single-connection run keeps its bytes as one finished leading segment.
+            done = self._sequential_prefix()
+            with open(self.path, 'r+b' if done else 'wb') as f:
+                if self.preallocate:
+                    preallocate(f, self.total_size)
+                else:
+                    f.truncate(self.total_size)
+            step = -(-(self.total_size - done) // self.connections)
+            segments = [_Segment(0, done, done)] if done else []
+            segments += [_Segment(start, start, min(start + step, self.total_size))
+                         for start in range(done, self.total_size, step)]
+        self._segments = segments
+        self._save_state()
+
+    def _sequential_prefix(self):
+        """Length of a '.part' written front to back (e.g. by yt-dlp's HttpFD) without a sidecar, else 0."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return 0
+        # A segmented file always has the full size, so a shorter one holds a contiguous prefix
+        return size if size < self.total_size else 0
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state['total_size'] != self.total_size or os.path.getsize(self.path) != self.total_size:
+                return None
+            return [_Segment(start, pos, end) for start, pos, end in state['segments']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_state(self):
+        with self._lock:
+            segments = [[s.start, s.pos, s.end] for s in self._segments]
+        temp_path = self.state_path + '.tmp'
+        try:
+            if self.sync:
+                # Everything the checkpoint claims must be on disk first
+                fd = os.open(self.path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'total_size': self.total_size, 'segments': segments}, f)
+            os.replace(temp_path, self.state_path)
+        except OSError:
+            pass  # Resume info is best effort
+
+    # ------------------------------------------------------------------------
+    # CONNECTIONS
+    # ------------------------------------------------------------------------
+
+    def _claim(self):
+        """Returns an unassigned segment, or splits the biggest running one. None when done."""
+        with self._lock:
+            for seg in self._segments:
+                if not seg.active and seg.pos < seg.end:
+                    seg.active = True
+                    return seg
+
+            running = [s for s in self._segments if s.active and s.end - s.pos >= 2 * MIN_SPLIT]
+            if not running:
+                return None
+            victim = max(running, key=lambda s: s.end - s.pos)
+            middle = victim.pos + (victim.end - victim.pos) // 2
+            tail = _Segment(middle, middle, victim.end)
+            tail.active = True
+            victim.end = middle
+            self._segments.append(tail)
+            return tail
+
+    def _worker(self):
+        conn = None
+        request_size = MIN_REQUEST
+        try:
+            # Unbuffered: once seg.pos advances the bytes are in the OS, where a checkpoint fsync reaches them
+            with open(self.path, 'r+b', buffering=0) as f:
+                while not self._stop.is_set():
+                    seg = self._claim()
+                    if seg is None:
+                        return
+                    failures = 0
+                    while not self._stop.is_set():
+                        with self._lock:
+                            if seg.pos >= seg.end:
+                                seg.active = False
+                                break
+                            start, stop = seg.pos, min(seg.end, seg.pos + request_size)
+                        try:
+                            if conn is None:
+                                conn = _connect(self.url, self.timeout)
+                            began = time.monotonic()
+                            complete = self._fetch_range(conn, f, seg, start, stop)
+                        except (OSError, http.client.HTTPException):
+                            if conn is not None:
+                                conn.close()
+                                conn = None
+                            if self._stop.is_set():
+                                return
+                            failures += 1
+                            if failures > RETRIES:
+                                raise
+                            time.sleep(0.5 * failures)
+                            continue
+                        failures = 0
+                        if not complete:
+                            # Response abandoned (segment was split): the connection cannot be reused
+                            conn.close()
+                            conn = None
+                        elif time.monotonic() - began < FAST_REQUEST:
+                            request_size = min(self.max_request, request_size * 2)
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _fetch_range(self, conn, f, seg, start, stop):
+        """
+        Writes bytes [start, stop) into place. Returns False if the response
+        was abandoned before its end (the segment shrank or a stop was requested).
+        """
+        conn.request('GET', _request_target(self.url),
+                     headers=dict(self.headers, Range=f'bytes={start}-{stop - 1}'))
+        # The response may take the socket over (Connection: close), so keep it from here
+        sock = conn.sock
+        with self._lock:
+            self._socks.add(sock)
+        try:
+            if self._stop.is_set():
+                return False
+            return self._read_range(conn.getresponse(), f, seg, start, stop)
+        finally:
+            with self._lock:
+                self._socks.discard(sock)
+
+    def _read_range(self, resp, f, seg, start, stop):
+        if resp.status != 206:
+            resp.read()
+            raise RangeNotSupported(f'HTTP {resp.status} for bytes {start}-{stop - 1}')
+
+        offset = start
+        while offset < stop:
+            data = resp.read(min(self.read_size, stop - offset))
+            if not data:
+                raise http.client.IncompleteRead(b'', stop - offset)
+            with self._lock:
+                # Never write past the segment end: the tail may belong to another connection now
+                usable = max(0, min(len(data), seg.end - offset))
+            if usable:
+                f.seek(offset)
+                view = memoryview(data)[:usable]
+                while view:
+                    view = view[f.write(view):]  # Raw writes may be short
+                offset += usable
+                with self._lock:
+                    seg.pos = offset
+                if self.throttle is not None:
+                    self.throttle(usable)
+            if usable < len(data) or self._stop.is_set():
+                return False
+        resp.read()  # Drain an (empty) remainder so the connection stays reusable
+        return True
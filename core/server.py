@@ -0,0 +1,443 @@
+import asyncio
+import itertools
+import json
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from core.cli import build_cli_job, get_save_path
+from core.engine import run_download, clean_error, EVENT_PROGRESS
+from core.metadata import AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT
+from core.playlist import expand_urls
+from core.session import set_pool_size
+from core.urls import is_playlist_url
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Job states ('pending', 'downloading', 'done', 'error' match core.jobs)
+STATUS_PENDING = 'pending'
+STATUS_DOWNLOADING = 'downloading'
+STATUS_DONE = 'done'
+STATUS_ERROR = 'error'
+STATUS_CANCELLED = 'cancelled'
+FINAL_STATES = (STATUS_DONE, STATUS_ERROR, STATUS_CANCELLED)
+
+PROGRESS_HZ = 4  # Progress events per job and second on the event stream
+KEEP_FINISHED = 1000  # Finished jobs still listed by GET /jobs
+MAX_BODY = 1024 * 1024
+SSE_HEARTBEAT = 15.0  # Seconds between keep-alive comments on idle event streams
+SUBSCRIBER_QUEUE = 1000  # Events buffered per slow event-stream client
+
+REASONS = {200: 'OK', 201: 'Created', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServerJob:
+    """One submitted download and its latest progress."""
+
+    def __init__(self, job_id, url, audio_only, quality, connections, audio_format=DEFAULT_AUDIO_FORMAT):
+        self.job_id = job_id
+        self.url = url
+        self.audio_only = audio_only
+        self.audio_format = audio_format
+        self.quality = quality
+        self.connections = connections
+        self.status = STATUS_PENDING
+        self.error = None
+        self.snapshot = None  # Latest progress snapshot (see snapshot_from_hook)
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancelled = False
+        self.paused = False
+        self.engine_job = None  # core.engine.DownloadJob while running
+
+    def to_dict(self):
+        snap = self.snapshot or {}
+        return {
+            'id': self.job_id,
+            'url': self.url,
+            'audio_only': self.audio_only,
+            'audio_format': self.audio_format,
+            'quality': self.quality,
+            'status': self.status,
+            'paused': self.paused,
+            'error': self.error,
+            'percent': round(snap.get('percent', 100.0 if self.status == STATUS_DONE else 0.0), 1),
+            'downloaded_bytes': snap.get('downloaded_bytes', 0),
+            'total_bytes': snap.get('total_bytes', 0),
+            'speed': snap.get('speed', 0.0),
+            'eta': snap.get('eta'),
+            'filename': snap.get('filename'),
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class DownloadServer:
+    """
+    Long-running download service with a local HTTP/JSON API.
+
+    Jobs wait in an asyncio queue and run on a bounded thread pool as engine
+    jobs (see core.engine), so warm YoutubeDL instances and keep-alive
+    connections are reused across requests. Endpoints:
+
+        POST   /jobs              {"url", "audio_only", "audio_format", "quality", "connections"}
+        GET    /jobs              all jobs (newest last)
+        GET    /jobs/<id>         one job
+        DELETE /jobs/<id>         cancel a pending or running job
+        POST   /jobs/<id>/pause   hold a job (keeps its partial file and connections)
+        POST   /jobs/<id>/resume  continue a paused job
+        GET    /events            server-sent events for every job
+        GET    /jobs/<id>/events  server-sent events for one job
+        GET    /health            queue summary
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=4, connections=1, save_path=None):
+        self.host = host
+        self.port = port
+        self.workers = max(1, int(jobs))
+        self.connections = max(1, int(connections))
+        self.save_path = save_path or get_save_path()
+
+        self.jobs = OrderedDict()  # job_id -> ServerJob
+        self._ids = itertools.count(1)
+        self._queue = None  # asyncio.Queue of ServerJob (created in the loop)
+        self._subscribers = set()  # (asyncio.Queue, job_id or None)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='serve')
+        self._loop = None
+        self._server = None
+        self._tasks = []  # Worker and playlist-listing tasks
+
+    # ------------------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------------------
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        set_pool_size(self.workers + 1)  # One warm YoutubeDL per worker (+1 for playlist listing)
+        self._tasks.extend(asyncio.create_task(self._worker()) for _ in range(self.workers))
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"🛰️ Serving on http://{self.host}:{self.port} | 🧵 {self.workers} workers | 📁 {self.save_path}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        for job in self.jobs.values():
+            if job.status not in FINAL_STATES:
+                self._cancel(job)
+        if self._server is not None:
+            self._server.close()
+        for task in self._tasks:
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------------
+    # JOBS
+    # ------------------------------------------------------------------------
+
+    def submit(self, url, audio_only=False, quality='1080', connections=None, audio_format=DEFAULT_AUDIO_FORMAT):
+        job = ServerJob(next(self._ids), url, audio_only, str(quality), connections or self.connections,
+                        audio_format)
+        self.jobs[job.job_id] = job
+        self._prune()
+        self._queue.put_nowait(job)
+        self._publish(job, 'queued')
+        return job
+
+    async def submit_playlist(self, url, audio_only, quality, connections, audio_format=DEFAULT_AUDIO_FORMAT):
+        """Lists a playlist/channel in a worker thread and queues each video as soon as it is found."""
+        entries = expand_urls([url])
+
+        def next_batch():
+            return list(itertools.islice(entries, 25))
+
+        try:
+            while True:
+                batch = await self._loop.run_in_executor(None, next_batch)
+                if not batch:
+                    return
+                for item in batch:
+                    self.submit(item, audio_only, quality, connections, audio_format)
+        except Exception as e:
+            log.warning("Playlist expansion failed for %s: %s", url, e)
+
+    def _cancel(self, job):
+        job.cancelled = True
+        if job.engine_job is not None:
+            job.engine_job.cancel()
+        if job.status == STATUS_PENDING:
+            self._finish(job, STATUS_CANCELLED)
+
+    def _set_paused(self, job, paused):
+        job.paused = paused
+        if job.engine_job is not None:
+            if paused:
+                job.engine_job.pause()
+            else:
+                job.engine_job.resume()
+        self._publish(job, 'paused' if paused else 'resumed')
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        self._publish(job, status)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in FINAL_STATES]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.cancelled:
+                continue
+            job.status = STATUS_DOWNLOADING
+            job.started = time.time()
+            self._publish(job, 'started')
+            try:
+                await self._loop.run_in_executor(self._executor, self._run_job, job)
+            except Exception as e:
+                if job.cancelled:
+                    self._finish(job, STATUS_CANCELLED)
+                else:
+                    self._finish(job, STATUS_ERROR, clean_error(e))
+            else:
+                self._finish(job, STATUS_CANCELLED if job.cancelled else STATUS_DONE)
+
+    def _run_job(self, job):
+        """Runs in a pool thread: the CLI's engine job, with progress posted back to the loop."""
+        engine_job = build_cli_job(job.url, self.save_path, job.audio_only, job.quality, job.connections,
+                                   source='serve', audio_format=job.audio_format)
+        job.engine_job = engine_job
+        if job.cancelled:
+            engine_job.cancel()  # Cancelled between dequeue and now
+        elif job.paused:
+            engine_job.pause()  # Paused while still queued: holds at its first check
+        last_sent = 0.0
+
+        def on_event(event, data):
+            nonlocal last_sent
+            if event != EVENT_PROGRESS:
+                return
+            now = time.monotonic()
+            if data['status'] == 'downloading' and now - last_sent < 1.0 / PROGRESS_HZ:
+                return
+            last_sent = now
+            self._loop.call_soon_threadsafe(self._on_progress, job, data)
+
+        try:
+            run_download(engine_job, on_event)
+        finally:
+            job.engine_job = None
+
+    def _on_progress(self, job, snapshot):
+        if job.status == STATUS_DOWNLOADING:
+            job.snapshot = snapshot
+            self._publish(job, 'progress')
+
+    # ------------------------------------------------------------------------
+    # EVENTS
+    # ------------------------------------------------------------------------
+
+    def _publish(self, job, event):
+        payload = (event, job.to_dict())
+        for queue, job_id in list(self._subscribers):
+            if job_id is not None and job_id != job.job_id:
+                continue
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                pass  # Slow client: it catches up with the next event for this job
+
+    async def _stream_events(self, writer, job_id):
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+                     b'Cache-Control: no-cache\r\nConnection: close\r\n\r\n')
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        entry = (queue, job_id)
+        self._subscribers.add(entry)
+        try:
+            # Current state first, so a client never misses where a job stands
+            jobs = [self.jobs[job_id]] if job_id is not None else list(self.jobs.values())
+            for job in jobs:
+                queue.put_nowait(('snapshot', job.to_dict()))
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    writer.write(b': keep-alive\n\n')
+                else:
+                    writer.write(f'event: {event}\ndata: {json.dumps(data)}\n\n'.encode('utf-8'))
+                    # Also after the first snapshot of a job that had already finished
+                    if job_id is not None and data['status'] in FINAL_STATES:
+                        break
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._subscribers.discard(entry)
+
+    # ------------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------------
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            method, path, body = await self._read_request(reader)
+            await self._route(method, path, body, writer)
+        except HttpError as e:
+            self._respond(writer, e.status, {'error': str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self._respond(writer, 500, {'error': str(e)})
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+            except ConnectionError:
+                pass
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HttpError(400, 'Malformed request line')
+        method, target = parts[0].upper(), parts[1]
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY:
+            raise HttpError(413, 'Request body too large')
+        body = await reader.readexactly(length) if length else b''
+        return method, urlparse(target).path.rstrip('/') or '/', body
+
+    def _respond(self, writer, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+                     f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+                     f'Connection: close\r\n\r\n'.encode('latin-1') + body)
+
+    async def _route(self, method, path, body, writer):
+        """Dispatches one request; event streams return once the client goes away."""
+        segments = [s for s in path.split('/') if s]
+
+        if segments == ['health'] and method == 'GET':
+            states = [job.status for job in self.jobs.values()]
+            self._respond(writer, 200, {
+                'ok': True,
+                'workers': self.workers,
+                'pending': states.count(STATUS_PENDING),
+                'downloading': states.count(STATUS_DOWNLOADING),
+            })
+        elif segments == ['events'] and method == 'GET':
+            await self._stream_events(writer, None)
+        elif segments == ['jobs'] and method == 'GET':
+            self._respond(writer, 200, {'jobs': [job.to_dict() for job in self.jobs.values()]})
+        elif segments == ['jobs'] and method == 'POST':
+            self._handle_submit(writer, body)
+        elif len(segments) in (2, 3) and segments[0] == 'jobs':
+            job = self._get_job(segments[1])
+            if len(segments) == 3 and segments[2] == 'events' and method == 'GET':
+                await self._stream_events(writer, job.job_id)
+            elif len(segments) == 3 and segments[2] in ('pause', 'resume') and method == 'POST':
+                if job.status in FINAL_STATES:
+                    raise HttpError(409, f'Job already {job.status}')
+                self._set_paused(job, segments[2] == 'pause')
+                self._respond(writer, 200, job.to_dict())
+            elif len(segments) == 3:
+                raise HttpError(404, 'Not found')
+            elif method == 'GET':
+                self._respond(writer, 200, job.to_dict())
+            elif method == 'DELETE':
+                if job.status in FINAL_STATES:
+                    raise HttpError(409, f'Job already {job.status}')
+                self._cancel(job)
+                self._respond(writer, 202, job.to_dict())
+            else:
+                raise HttpError(405, 'Method not allowed')
+        else:
+            raise HttpError(404, 'Not found')
+
+    def _get_job(self, raw_id):
+        try:
+            return self.jobs[int(raw_id)]
+        except (ValueError, KeyError):
+            raise HttpError(404, f'No job {raw_id}')
+
+    def _handle_submit(self, writer, body):
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise HttpError(400, 'Body must be JSON')
+        url = str(request.get('url') or '').strip() if isinstance(request, dict) else ''
+        if not url:
+            raise HttpError(400, "Missing 'url'")
+        audio_only = bool(request.get('audio_only', False))
+        audio_format = str(request.get('audio_format', DEFAULT_AUDIO_FORMAT))
+        if audio_format not in AUDIO_FORMATS:
+            raise HttpError(400, f"'audio_format' must be one of: {', '.join(AUDIO_FORMATS)}")
+        quality = str(request.get('quality', '1080'))
+        connections = request.get('connections')
+        # bool is an int subclass, so JSON true/false must be rejected explicitly
+        if connections is not None and (isinstance(connections, bool) or not isinstance(connections, int)
+                                        or connections < 1):
+            raise HttpError(400, "'connections' must be a positive integer")
+
+        if is_playlist_url(url):
+            # Entries become jobs as the listing progresses; follow them on /events
+            task = asyncio.create_task(self.submit_playlist(url, audio_only, quality, connections, audio_format))
+            self._tasks = [t for t in self._tasks if not t.done()]  # Drop listings that have finished
+            self._tasks.append(task)
+            self._respond(writer, 202, {'playlist': url})
+        else:
+            job = self.submit(url, audio_only, quality, connections, audio_format)
+            self._respond(writer, 201, job.to_dict())
+
+
+def run_server_mode(host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=4, connections=1):
+    """
+    Entry point for 'ytdownload serve'. Runs until interrupted.
+    Returns the process exit code.
+    """
+    server = DownloadServer(host, port, jobs, connections)
+
+    async def main():
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped.")
+    except OSError as e:
+        print(f"❌ Cannot listen on {host}:{port}: {e}")
+        return 1
+    return 0
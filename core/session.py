@@ -0,0 +1,200 @@
+import atexit
+import threading
+from contextlib import contextmanager
+
+# yt-dlp and requests are imported on first use (they dominate startup time),
+# so importing this module stays cheap for --help, --clear and the GUI's first paint.
+
+# Warm YoutubeDL instances kept per process (extra leases get a temporary instance)
+DEFAULT_POOL_SIZE = 4
+
+# Options shared by every pooled instance
+BASE_PARAMS = {
+    'quiet': True,
+    'no_warnings': True,
+    'noplaylist': True,
+    # Safe headers to prevent HTTP 403
+    'http_headers': {'User-Agent': 'Mozilla/5.0'},
+}
+
+
+class YoutubeDLPool:
+    """
+    Keeps long-lived YoutubeDL instances so jobs skip extractor setup and
+    reuse keep-alive connections.
+    Each lease gets exclusive use of one instance with the job's options
+    applied on top of BASE_PARAMS; everything is reset when the lease ends.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, base_params=None):
+        self.size = max(1, int(size))
+        self.base_params = dict(BASE_PARAMS, **(base_params or {}))
+        self.created = 0  # Instances built so far (cold starts)
+        self.reused = 0  # Leases served by a warm instance
+
+        self._idle = []
+        self._setup_hooks = []  # Called with every new instance (e.g. to register extractors)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def set_size(self, size):
+        """Changes how many idle instances are kept warm."""
+        with self._lock:
+            self.size = max(1, int(size))
+            surplus = self._idle[self.size:]
+            del self._idle[self.size:]
+        for ydl, _ in surplus:
+            self._dispose(ydl)
+
+    def add_setup_hook(self, hook):
+        """Runs hook(ydl) on every idle instance now and on every instance built later."""
+        with self._lock:
+            self._setup_hooks.append(hook)
+            idle = [ydl for ydl, _ in self._idle]
+        for ydl in idle:
+            hook(ydl)
+
+    @contextmanager
+    def lease(self, params=None):
+        """
+        Context manager yielding a YoutubeDL configured with 'params'.
+        Accepts the same option dict as YoutubeDL(), including
+        'progress_hooks', 'postprocessor_hooks' and 'postprocessors'.
+        """
+        ydl, pristine = self._acquire()
+        try:
+            self._apply(ydl, params or {})
+            yield ydl
+        finally:
+            self._restore(ydl, pristine)
+            self._release(ydl, pristine)
+
+    def close(self):
+        """Closes every idle instance. Instances still leased are closed on release."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for ydl, _ in idle:
+            self._dispose(ydl)
+
+    # ------------------------------------------------------------------------
+    # INTERNALS
+    # ------------------------------------------------------------------------
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self.created += 1
+
+        from core.ytdl import PooledYoutubeDL
+        ydl = PooledYoutubeDL(dict(self.base_params))
+        for hook in list(self._setup_hooks):
+            hook(ydl)
+        # Snapshot of the freshly built state, restored after every lease
+        pristine = {
+            'params': dict(ydl.params),
+            'http_headers': dict(ydl.params.get('http_headers') or {}),
+            'format_selector': ydl.format_selector,
+            'progress_hooks': list(ydl._progress_hooks),
+            'postprocessor_hooks': list(ydl._postprocessor_hooks),
+            'pps': {when: list(pps) for when, pps in ydl._pps.items()},
+        }
+        return ydl, pristine
+
+    def _release(self, ydl, pristine):
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append((ydl, pristine))
+                return
+        self._dispose(ydl)
+
+    def _dispose(self, ydl):
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+    def _apply(self, ydl, params):
+        """Applies per-job options the same way YoutubeDL.__init__ would."""
+        from yt_dlp.postprocessor import get_postprocessor
+        params = dict(params)
+        hooks = params.pop('progress_hooks', None) or []
+        pp_hooks = params.pop('postprocessor_hooks', None) or []
+        postprocessors = params.pop('postprocessors', None) or []
+        headers = params.pop('http_headers', None)
+        outtmpl = params.pop('outtmpl', None)
+
+        ydl.params.update(params)
+
+        if headers:
+            ydl.params['http_headers'].update(headers)
+        if outtmpl is not None:
+            ydl.params['outtmpl'] = outtmpl if isinstance(outtmpl, dict) else {'default': outtmpl}
+        if 'format' in params:
+            # Built once in __init__, so it has to be rebuilt here
+            fmt = params['format']
+            ydl.format_selector = fmt if fmt in (None, '-') or callable(fmt) else ydl.build_format_selector(fmt)
+
+        for hook in hooks:
+            ydl.add_progress_hook(hook)
+        for hook in pp_hooks:
+            # Before the postprocessors are built: they pick up the hooks on creation
+            ydl.add_postprocessor_hook(hook)
+        for pp_def in postprocessors:
+            pp_def = dict(pp_def)
+            when = pp_def.pop('when', 'post_process')
+            pp = get_postprocessor(pp_def.pop('key'))(ydl, **pp_def)
+            ydl.add_post_processor(pp, when=when)
+
+    def _restore(self, ydl, pristine):
+        ydl.params.clear()
+        ydl.params.update(pristine['params'])
+        ydl.params['http_headers'].clear()
+        ydl.params['http_headers'].update(pristine['http_headers'])
+        ydl.format_selector = pristine['format_selector']
+        ydl._progress_hooks = list(pristine['progress_hooks'])
+        ydl._postprocessor_hooks = list(pristine['postprocessor_hooks'])
+        ydl._pps = {when: list(pps) for when, pps in pristine['pps'].items()}
+
+
+# ------------------------------------------------------------------------
+# SHARED INSTANCES
+# ------------------------------------------------------------------------
+
+_ydl_pool = None
+_http_session = None
+_shared_lock = threading.Lock()
+
+
+def get_ydl_pool():
+    """Returns the process-wide YoutubeDLPool."""
+    global _ydl_pool
+    with _shared_lock:
+        if _ydl_pool is None:
+            _ydl_pool = YoutubeDLPool()
+            atexit.register(_ydl_pool.close)
+        return _ydl_pool
+
+
+def get_http_session(pool_size=DEFAULT_POOL_SIZE):
+    """Returns a process-wide requests.Session with keep-alive connection pooling."""
+    global _http_session
+    with _shared_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size * 2)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(BASE_PARAMS['http_headers'])
+            _http_session = session
+            atexit.register(session.close)
+        return _http_session
+
+
+def set_pool_size(size):
+    """Resizes the shared YoutubeDL pool (e.g. to match the number of download slots)."""
+    get_ydl_pool().set_size(size)
@@ -0,0 +1,167 @@
+import os
+import shutil
+import threading
+from core.cleaner import parse_size
+
+# Environment variables for the I/O layer (CLI flags override them)
+STAGING_ENV = 'SMART_YTDL_STAGING'  # Local folder downloads are written to before they move into place
+CHUNK_SIZE_ENV = 'SMART_YTDL_CHUNK_SIZE'  # e.g. '10M': HTTP range request size
+BUFFER_SIZE_ENV = 'SMART_YTDL_BUFFER_SIZE'  # e.g. '1M': read/write block size
+PREALLOCATE_ENV = 'SMART_YTDL_PREALLOCATE'  # '0' turns preallocation off
+FSYNC_ENV = 'SMART_YTDL_FSYNC'  # 'off', 'file' or 'full'
+
+# When finished data is forced to disk
+FSYNC_OFF = 'off'  # Leave it to the OS (fastest; a crash may truncate the newest files)
+FSYNC_FILE = 'file'  # Each finished file before it gets its final name (and segmented resume checkpoints)
+FSYNC_FULL = 'full'  # Also the folder after the rename, so the rename itself survives power loss
+FSYNC_POLICIES = (FSYNC_OFF, FSYNC_FILE, FSYNC_FULL)
+
+# Block size for copying a staged file to another filesystem: few, large writes suit network shares
+COPY_BUFFER = 16 * 1024 * 1024
+
+
+class IOConfig:
+    """
+    Where and how output files are written: an optional local staging folder,
+    HTTP chunk and buffer sizes, preallocation and the fsync policy.
+    """
+
+    __slots__ = ('staging_dir', 'http_chunk_size', 'buffer_size', 'preallocate', 'fsync')
+
+    def __init__(self, staging_dir=None, http_chunk_size=None, buffer_size=None, preallocate=True,
+                 fsync=FSYNC_OFF):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Invalid fsync policy: {fsync!r} (expected {', '.join(FSYNC_POLICIES)})")
+        self.staging_dir = os.path.abspath(staging_dir) if staging_dir else None  # None: write in place
+        self.http_chunk_size = http_chunk_size  # Bytes per range request; None: one request per file
+        self.buffer_size = buffer_size  # Bytes per read/write; None: yt-dlp's adaptive default
+        self.preallocate = preallocate  # Reserve the full size before writing (segmented and copies)
+        self.fsync = fsync
+
+    @classmethod
+    def from_env(cls):
+        """Config from the SMART_YTDL_* variables above (defaults where unset)."""
+        preallocate = os.environ.get(PREALLOCATE_ENV, '1').strip().lower() not in ('0', 'off', 'no', 'false')
+        return cls(os.environ.get(STAGING_ENV) or None,
+                   parse_size(os.environ.get(CHUNK_SIZE_ENV)),
+                   parse_size(os.environ.get(BUFFER_SIZE_ENV)),
+                   preallocate,
+                   (os.environ.get(FSYNC_ENV) or FSYNC_OFF).strip().lower())
+
+    def work_dir(self, output_path):
+        """The folder a download is written to: the staging folder if set, else 'output_path'."""
+        if not self.staging_dir:
+            return output_path
+        os.makedirs(self.staging_dir, exist_ok=True)
+        return self.staging_dir
+
+    def ydl_options(self):
+        """yt-dlp options for these settings ('preallocate' / 'fsync_policy' are read by SegmentedFD)."""
+        opts = {'preallocate': self.preallocate, 'fsync_policy': self.fsync}
+        if self.http_chunk_size:
+            opts['http_chunk_size'] = self.http_chunk_size
+        if self.buffer_size:
+            # A fixed block size instead of yt-dlp's grow-as-you-go buffer
+            opts['buffersize'] = self.buffer_size
+            opts['noresizebuffer'] = True
+        return opts
+
+
+def fsync_path(path):
+    """Forces a file's (or on POSIX, a folder's) data to disk. Folders are skipped where unsupported."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        if os.path.isdir(path):
+            return  # Windows cannot open folders
+        raise
+    try:
+        os.fsync(fd)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+    finally:
+        os.close(fd)
+
+
+def preallocate(f, size):
+    """Reserves 'size' bytes for an open file (sparse fallback where fallocate is unavailable)."""
+    if not size:
+        return
+    try:
+        # Reserves real blocks, so writes cannot fail half-way on a full disk
+        os.posix_fallocate(f.fileno(), 0, size)
+    except (AttributeError, OSError):
+        f.truncate(size)
+
+
+def place_file(path, dest_dir, config=None):
+    """
+    Moves a finished file into 'dest_dir' and returns its new path.
+    On the same filesystem this is one atomic rename. Otherwise the file is
+    copied once, in large blocks, to a temporary name inside 'dest_dir' and
+    renamed there, so the final name never refers to a partial file.
+    A file already in 'dest_dir' stays where it is (fsynced per the policy).
+    """
+    config = config or get_io_config()
+    dest = os.path.join(dest_dir, os.path.basename(path))
+    if os.path.abspath(path) == os.path.abspath(dest):
+        if config.fsync != FSYNC_OFF:
+            fsync_path(path)
+        return path
+
+    os.makedirs(dest_dir, exist_ok=True)
+    if os.stat(path).st_dev == os.stat(dest_dir).st_dev:
+        if config.fsync != FSYNC_OFF:
+            fsync_path(path)
+        os.replace(path, dest)
+    else:
+        _copy_into_place(path, dest, config)
+        os.unlink(path)
+    if config.fsync == FSYNC_FULL:
+        fsync_path(dest_dir)
+    return dest
+
+
+def _copy_into_place(path, dest, config):
+    # '.tmp' marks it as in progress for the retention policy
+    temp_path = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.{os.getpid()}.tmp")
+    try:
+        with open(path, 'rb') as src, open(temp_path, 'wb') as dst:
+            if config.preallocate:
+                preallocate(dst, os.fstat(src.fileno()).st_size)
+            shutil.copyfileobj(src, dst, max(config.buffer_size or 0, COPY_BUFFER))
+            dst.flush()
+            if config.fsync != FSYNC_OFF:
+                os.fsync(dst.fileno())
+        try:
+            shutil.copystat(path, temp_path)  # Keeps the download time as mtime (see 'updatetime')
+        except OSError:
+            pass  # Some shares refuse metadata changes
+        os.replace(temp_path, dest)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+_default_config = None
+_default_config_lock = threading.Lock()
+
+
+def get_io_config():
+    """Returns the process-wide IOConfig (from the environment until set_io_config())."""
+    global _default_config
+    with _default_config_lock:
+        if _default_config is None:
+            _default_config = IOConfig.from_env()
+        return _default_config
+
+
+def set_io_config(config):
+    """Replaces the process-wide IOConfig. Applies to jobs created afterwards."""
+    global _default_config
+    with _default_config_lock:
+        _default_config = config
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import threading
+from core.config import get_data_dir
+
+# Size of the queue table icons
+ICON_WIDTH = 80
+ICON_HEIGHT = 45
+
+# Downscaled thumbnails kept on disk
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def choose_thumbnail(info, min_width=ICON_WIDTH, min_height=ICON_HEIGHT):
+    """
+    Returns the URL of the smallest thumbnail that still covers the icon size.
+    yt-dlp lists thumbnails smallest-first with maxres last, so the old
+    'thumbnails[-1]' choice downloaded the biggest image for an 80x45 icon.
+    """
+    candidates = [t for t in info.get('thumbnails') or [] if t.get('url')]
+    sized = [t for t in candidates if t.get('width') and t.get('height')]
+
+    fitting = [t for t in sized if t['width'] >= min_width and t['height'] >= min_height]
+    if fitting:
+        return min(fitting, key=lambda t: t['width'] * t['height'])['url']
+    if sized:
+        return max(sized, key=lambda t: t['width'] * t['height'])['url']
+    return info.get('thumbnail') or (candidates[0]['url'] if candidates else None)
+
+
+class ThumbnailCache:
+    """
+    Size-bounded directory of downscaled thumbnails, one file per video key.
+    Least-recently-used files (by mtime, refreshed on every hit) are deleted
+    once the directory grows past 'max_bytes'. Safe to share between threads.
+    """
+
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or os.path.join(get_data_dir(), 'thumbnails')
+        self.max_bytes = max_bytes
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._sizes = {}  # filename -> bytes
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith('.jpg'):
+                    self._sizes[entry.name] = entry.stat().st_size
+                elif entry.name.endswith('.tmp'):
+                    # Left over from an interrupted write
+                    try:
+                        os.unlink(entry.path)
+                    except OSError:
+                        pass
+        self._total = sum(self._sizes.values())
+
+    def _filename(self, key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + '.jpg'
+
+    def get(self, key):
+        """Returns the cached file path for a key (and marks it as recently used), or None."""
+        name = self._filename(key)
+        with self._lock:
+            if name not in self._sizes:
+                return None
+        path = os.path.join(self.path, name)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total -= self._sizes.pop(name, 0)
+            return None
+        return path
+
+    def temp_path(self, key):
+        """A scratch path in the cache directory to write a new thumbnail to before commit()."""
+        return os.path.join(self.path, f"{self._filename(key)}.{threading.get_ident()}.tmp")
+
+    def commit(self, key, temp_path):
+        """Moves a finished temp file into place and evicts old files if over budget."""
+        name = self._filename(key)
+        final_path = os.path.join(self.path, name)
+        os.replace(temp_path, final_path)
+        size = os.path.getsize(final_path)
+
+        with self._lock:
+            self._total += size - self._sizes.get(name, 0)
+            self._sizes[name] = size
+            if self._total > self.max_bytes:
+                self._evict(keep=name)
+        return final_path
+
+    def _evict(self, keep):
+        """Deletes least-recently-used files until under budget. Caller holds the lock."""
+        by_age = []
+        for name in self._sizes:
+            try:
+                by_age.append((os.path.getmtime(os.path.join(self.path, name)), name))
+            except OSError:
+                by_age.append((0, name))
+        by_age.sort()
+
+        for _, name in by_age:
+            if self._total <= self.max_bytes * 0.9:
+                break
+            if name == keep:
+                continue
+            try:
+                os.unlink(os.path.join(self.path, name))
+            except OSError:
+                pass
+            self._total -= self._sizes.pop(name)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_thumbnail_cache():
+    """Returns the process-wide ThumbnailCache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ThumbnailCache()
+        return _default_cache
@@ -0,0 +1,100 @@
+import re
+from urllib.parse import urlparse, parse_qs
+
+# YouTube video IDs are always 11 characters from this alphabet
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+# Path prefixes that carry the video ID as the next path segment
+ID_PATH_PREFIXES = ('shorts', 'embed', 'live', 'v', 'e')
+
+# Channel-style path prefixes ('/@name', '/channel/UC...', '/c/name', '/user/name')
+CHANNEL_PREFIXES = ('channel', 'c', 'user')
+
+
+def extract_video_id(url):
+    """
+    Returns the 11-character YouTube video ID for a URL, or None.
+    Handles watch?v=, youtu.be/, /shorts/, /embed/ and /live/ links.
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if '://' not in url:
+        url = 'https://' + url
+
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    segments = [s for s in parsed.path.split('/') if s]
+
+    candidate = None
+    if host.endswith('youtu.be'):
+        candidate = segments[0] if segments else None
+    elif host.endswith('youtube.com') or host.endswith('youtube-nocookie.com'):
+        if segments and segments[0] == 'watch':
+            candidate = parse_qs(parsed.query).get('v', [None])[0]
+        elif len(segments) >= 2 and segments[0] in ID_PATH_PREFIXES:
+            candidate = segments[1]
+
+    if candidate and VIDEO_ID_RE.match(candidate):
+        return candidate
+    return None
+
+
+def split_urls(text):
+    """
+    Splits pasted text into URLs: whitespace-separated, or run together when a
+    single-line input dropped the newlines ('https://a...https://b...').
+    Duplicate forms of the same video are dropped (first one wins).
+    """
+    urls = []
+    seen = set()
+    for part in re.split(r'\s+|(?=https?://)', text or ''):
+        part = part.strip()
+        if not part or cache_key(part) in seen:
+            continue
+        seen.add(cache_key(part))
+        urls.append(part)
+    return urls
+
+
+def cache_key(url):
+    """Stable key for per-video storage: the video ID if known, else the trimmed URL."""
+    video_id = extract_video_id(url)
+    return f"youtube:{video_id}" if video_id else url.strip()
+
+
+def host_key(url):
+    """
+    Groups URLs by the service that serves them.
+    'www.youtube.com', 'm.youtube.com' and 'youtu.be' all hit the same backend,
+    so they share one per-host slot budget.
+    """
+    host = (urlparse(url).hostname or '').lower()
+    for prefix in ('www.', 'm.', 'music.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    if host == 'youtu.be':
+        host = 'youtube.com'
+    return host
+
+
+def is_playlist_url(url):
+    """
+    True for playlist and channel URLs.
+    A watch link that merely carries '&list=' is still treated as one video.
+    """
+    if '://' not in url:
+        url = 'https://' + url
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if not host.endswith('youtube.com'):
+        return False
+    if extract_video_id(url):
+        return False
+
+    segments = [s for s in parsed.path.split('/') if s]
+    if not segments:
+        return False
+    if segments[0] == 'playlist':
+        return 'list' in parse_qs(parsed.query)
+    return segments[0].startswith('@') or (segments[0] in CHANNEL_PREFIXES and len(segments) >= 2)
@@ -1,8 +1,22 @@
-import requests
-from PyQt6.QtCore import QThread, pyqtSignal
-from yt_dlp import YoutubeDL
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import Qt, QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+from core.session import get_http_session
+from core.engine import fetch_video_info
+from core.cancel import CancelToken, DownloadCancelled
+from core.metrics import get_metrics_recorder, FETCH_THUMBNAIL
+from core.playlist import iter_playlist_entries
+from core.thumbnails import get_thumbnail_cache, ICON_WIDTH, ICON_HEIGHT
+
+log = logging.getLogger(__name__)
 
 class VideoInfoWorker(QThread):
+    """Qt adapter for core.engine.fetch_video_info()."""
     data_loaded = pyqtSignal(dict) 
     error_occurred = pyqtSignal(str)
     status_updated = pyqtSignal(str) # <--- NEW SIGNAL for live feedback
@@ -13,67 +27,232 @@ class VideoInfoWorker(QThread):
 
     def run(self):
         try:
-            self.status_updated.emit("Connecting to YouTube API...") # <--- Feedback 1
-
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'noplaylist': True,
-                'extract_flat': False,
-                'socket_timeout': 10,
-                'geolocation_bypass': True,
-            }
-            
-            with YoutubeDL(ydl_opts) as ydl:
-                # Info extraction
-                info = ydl.extract_info(self.url, download=False)
-                
-                self.status_updated.emit("Parsing video formats...") # <--- Feedback 2
-                
-                unique_heights = set()
-                if 'formats' in info:
-                    for f in info['formats']:
-                        if f.get('vcodec') != 'none' and f.get('height'):
-                            unique_heights.add(f['height'])
-                
-                sorted_heights = sorted(list(unique_heights), reverse=True)
-
-                display_formats = []
-                if not sorted_heights:
-                    display_formats.append("Best Quality")
-                else:
-                    for h in sorted_heights:
-                        display_formats.append(f"{h}p")
-                        display_formats.append(f"{h}p (Video Only)")
-
-                display_formats.append("Audio Only (MP3)")
-
-                # --- Thumbnail ---
-                thumb_url = info.get('thumbnail')
-                if info.get('thumbnails'):
-                    thumb_url = info['thumbnails'][-1].get('url', thumb_url)
-
-                thumb_data = None
-                if thumb_url:
-                    self.status_updated.emit("Downloading thumbnail...") # <--- Feedback 3
-                    try:
-                        headers = {'User-Agent': 'Mozilla/5.0'}
-                        response = requests.get(thumb_url, headers=headers, timeout=3, stream=True)
-                        if response.status_code == 200:
-                            thumb_data = response.content
-                    except Exception:
-                        pass 
-
-                self.status_updated.emit("Finalizing data...") # <--- Feedback 4
-
-                result = {
-                    'title': info.get('title', 'Unknown Title'),
-                    'formats': display_formats,
-                    'thumbnail_bytes': thumb_data,
-                    'url': self.url
-                }
-                self.data_loaded.emit(result)
+            # Stores the result in the metadata cache
+            result = fetch_video_info(self.url, on_status=self.status_updated.emit)
+            self.data_loaded.emit(result)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+class ThumbnailLoader(QObject):
+    """
+    Fetches thumbnails on a small thread pool, downscales them once to the
+    icon size and stores the result in the on-disk ThumbnailCache.
+    Emits the cached file path; only small pixmaps are ever held in memory.
+    """
+    thumbnail_ready = pyqtSignal(str, str) # video_key, file_path
+
+    def __init__(self, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.cache = get_thumbnail_cache()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnail')
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def request(self, key, url):
+        """
+        Returns the cached file path right away if there is one.
+        Otherwise schedules a fetch (once per key) and returns None.
+        """
+        path = self.cache.get(key)
+        if path or not url:
+            if path:
+                get_metrics_recorder().record_fetch(FETCH_THUMBNAIL, cache_hit=True)
+            return path
+        with self._lock:
+            if key in self._inflight:
+                return None
+            self._inflight.add(key)
+        self._pool.submit(self._fetch, key, url)
+        return None
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch(self, key, url):
+        temp_path = self.cache.temp_path(key)
+        started = time.monotonic()
+        ok = False
+        try:
+            # Shared keep-alive session (headers are set on the session)
+            response = get_http_session().get(url, timeout=5)
+            if response.status_code != 200:
+                return
+
+            # QImage (unlike QPixmap) is safe to use off the GUI thread
+            image = QImage()
+            if not image.loadFromData(response.content):
+                return
+            image = image.scaled(ICON_WIDTH, ICON_HEIGHT,
+                                 Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+            if not image.save(temp_path, "JPG", 85):
+                return
+
+            path = self.cache.commit(key, temp_path)
+            ok = True
+            self.thumbnail_ready.emit(key, path)
+        except Exception as e:
+            log.warning("Thumbnail fetch failed for %s: %s", key, e)
+        finally:
+            get_metrics_recorder().record_fetch(FETCH_THUMBNAIL, time.monotonic() - started, ok=ok)
+            with self._lock:
+                self._inflight.discard(key)
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+class PlaylistWorker(QThread):
+    """
+    Expands a playlist or channel URL in the background.
+    Entries are emitted in small batches as YouTube pages them in,
+    so the first rows show up long before the whole list is known.
+    """
+    entries_found = pyqtSignal(list) # [{'url', 'id', 'title'}, ...]
+    expansion_finished = pyqtSignal(int) # total entries
+    error_occurred = pyqtSignal(str)
+
+    BATCH_SIZE = 25
+    BATCH_INTERVAL = 0.3 # seconds
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._stop = False
+
+    def stop(self):
+        self._stop = True
 
+    def run(self):
+        batch = []
+        total = 0
+        last_emit = time.monotonic()
+        try:
+            for entry in iter_playlist_entries(self.url):
+                if self._stop:
+                    break
+                batch.append(entry)
+                total += 1
+                now = time.monotonic()
+                if len(batch) >= self.BATCH_SIZE or now - last_emit >= self.BATCH_INTERVAL:
+                    self.entries_found.emit(batch)
+                    batch = []
+                    last_emit = now
+            if batch:
+                self.entries_found.emit(batch)
+            self.expansion_finished.emit(total)
+        except Exception as e:
+            if batch:
+                self.entries_found.emit(batch)
+            log.warning("Playlist expansion failed: %s", e)
+            self.error_occurred.emit(str(e))
+
+class MetadataFetchService(QObject):
+    """
+    All background metadata extraction for the GUI, on bounded thread pools.
+
+    - fetch(url): the URL typed into the input box. Every call gets a new
+      request ID and supersedes the previous one: a superseded fetch that has
+      not started never runs, and one already running stops at its next
+      request, giving its YoutubeDL and connection back. Nothing is delivered
+      for either.
+    - request(url) / prefetch(urls): background loads for queue entries and
+      multi-URL pastes. At most 'max_workers' extractions run at once, each
+      URL is fetched once, and cached results are used without a request.
+    """
+    # Input box (request ID, ...); only the latest request is ever delivered
+    fetch_status = pyqtSignal(int, str)
+    fetch_loaded = pyqtSignal(int, dict)
+    fetch_failed = pyqtSignal(int, str)
+    # Background loads
+    metadata_ready = pyqtSignal(str, dict) # url, video info (see build_video_info)
+    metadata_failed = pyqtSignal(str, str) # url, error
+
+    # Worker threads -> GUI thread, where stale request IDs are filtered out
+    _fetch_event = pyqtSignal(int, str, object) # request ID, 'status'/'loaded'/'failed', payload
+
+    def __init__(self, max_workers=3, foreground_workers=2, parent=None):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='metadata')
+        # Separate lane so a typed URL never waits behind a long prefetch list;
+        # two workers, so one superseded fetch still running cannot block the new one
+        self._foreground = ThreadPoolExecutor(max_workers=foreground_workers, thread_name_prefix='metadata-fg')
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        # Input-box fetch state, only touched on the GUI thread
+        self._current_id = 0
+        self._current_future = None
+        self._current_token = None
+        self._fetch_event.connect(self._deliver)
+
+    def fetch(self, url):
+        """Starts loading 'url' for the input box, superseding any earlier fetch. Returns the request ID."""
+        self.cancel_fetch()
+        request_id = self._current_id = next(self._request_ids)
+        self._current_token = CancelToken()
+        self._current_future = self._foreground.submit(self._fetch_foreground, request_id, url,
+                                                       self._current_token)
+        return request_id
+
+    def cancel_fetch(self):
+        """Cancels the current input-box fetch; nothing more is delivered for it."""
+        if self._current_future is not None:
+            self._current_future.cancel()  # Only succeeds if it has not started yet
+            self._current_future = None
+        if self._current_token is not None:
+            self._current_token.cancel()  # A running extraction stops at its next request
+            self._current_token = None
+        self._current_id = 0
+
+    def request(self, url):
+        """Schedules a background metadata fetch for 'url' unless one is already running."""
+        with self._lock:
+            if url in self._inflight:
+                return
+            self._inflight.add(url)
+        self._pool.submit(self._fetch, url)
+
+    def prefetch(self, urls):
+        """Warms the metadata cache for several URLs at once (e.g. a pasted list)."""
+        for url in urls:
+            self.request(url)
+
+    def shutdown(self):
+        self.cancel_fetch()
+        self._foreground.shutdown(wait=False, cancel_futures=True)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_foreground(self, request_id, url, token):
+        # Runs in a pool thread: staleness is decided by 'token' here and by the request ID in _deliver()
+        try:
+            result = fetch_video_info(url, on_status=lambda text: self._fetch_event.emit(request_id, 'status', text),
+                                      token=token)
+            self._fetch_event.emit(request_id, 'loaded', result)
+        except DownloadCancelled:
+            pass  # Superseded
+        except Exception as e:
+            self._fetch_event.emit(request_id, 'failed', str(e))
+
+    def _deliver(self, request_id, kind, payload):
+        if request_id != self._current_id:
+            return  # Stale: a newer fetch (or none) is current
+        if kind == 'status':
+            self.fetch_status.emit(request_id, payload)
+            return
+        self._current_future = None
+        self._current_token = None
+        self._current_id = 0
+        if kind == 'loaded':
+            self.fetch_loaded.emit(request_id, payload)
+        else:
+            self.fetch_failed.emit(request_id, payload)
+
+    def _fetch(self, url):
+        try:
+            result = fetch_video_info(url, use_cache=True)
+            self.metadata_ready.emit(url, result)
         except Exception as e:
-            print(f"DEBUG ERROR: {str(e)}") 
-            self.error_occurred.emit(str(e))
\ No newline at end of file
+            log.warning("Metadata prefetch failed for %s: %s", url, e)
+            self.metadata_failed.emit(url, str(e))
+        finally:
+            with self._lock:
+                self._inflight.discard(url)
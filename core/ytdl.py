@@ -0,0 +1,132 @@
+import os
+import time
+from yt_dlp import YoutubeDL
+from yt_dlp.downloader.common import FileDownloader
+from yt_dlp.downloader.http import HttpFD
+from core.segmented import SegmentedDownload, RangeNotSupported, probe_size, STATE_SUFFIX
+from core.storage import FSYNC_OFF
+
+
+class SegmentedFD(FileDownloader):
+    """
+    yt-dlp downloader for plain HTTP(S) formats that fetches byte ranges over
+    'segmented_connections' parallel connections (see SegmentedDownload).
+    Falls back to yt-dlp's HttpFD when the server does not support ranges.
+    """
+    FD_NAME = 'segmented'
+
+    def accepts(self, filename, info):
+        if info.get('protocol') not in ('http', 'https') or info.get('is_live') or filename == '-':
+            return False
+        if (self.params.get('segmented_connections') or 1) > 1:
+            return True
+        # A segmented '.part' file is preallocated: only this downloader can continue it
+        return os.path.exists(self.temp_name(filename) + STATE_SUFFIX)
+
+    def real_download(self, filename, info_dict):
+        url = info_dict['url']
+        headers = info_dict.get('http_headers') or {}
+        tmpfilename = self.temp_name(filename)
+        try:
+            total = probe_size(url, headers)
+        except RangeNotSupported:
+            return self._single_connection(filename, info_dict, tmpfilename)
+
+        self.report_destination(filename)
+        started = time.time()
+        # Bandwidth is paid per chunk by the connections, not from the (coarser) progress hook
+        ticket = self.params.get('bandwidth_ticket')
+        # Every chunk also checks the job's CancelToken (pause blocks there, keeping the connections)
+        token = self.params.get('cancel_token')
+
+        def report(downloaded, total_bytes, speed):
+            self._hook_progress({
+                'status': 'downloading',
+                'downloaded_bytes': downloaded,
+                'total_bytes': total_bytes,
+                'tmpfilename': tmpfilename,
+                'filename': filename,
+                'speed': speed,
+                'eta': (total_bytes - downloaded) / speed if speed else None,
+                'elapsed': time.time() - started,
+                'throttled': ticket is not None,
+            }, info_dict)
+
+        def throttle(nbytes):
+            if token is not None:
+                token.check()
+            if ticket is not None:
+                ticket.consume(nbytes)
+
+        chunk_size = (info_dict.get('downloader_options') or {}).get('http_chunk_size')
+        download = SegmentedDownload(
+            url, tmpfilename, total,
+            connections=self.params.get('segmented_connections') or 1,
+            headers=headers,
+            max_request=chunk_size or self.params.get('http_chunk_size'),
+            progress=report,
+            throttle=throttle if token is not None or ticket is not None else None,
+            # I/O settings (see core.storage.IOConfig)
+            preallocate=self.params.get('preallocate', True),
+            read_size=self.params.get('buffersize'),
+            sync=self.params.get('fsync_policy', FSYNC_OFF) != FSYNC_OFF,
+        )
+        # Cancel closes the connections at once, even if a read is stalled
+        unregister = token.add_callback(download.abort) if token is not None else None
+        try:
+            download.run()
+        finally:
+            if unregister is not None:
+                unregister()
+
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            'status': 'finished',
+            'downloaded_bytes': total,
+            'total_bytes': total,
+            'filename': filename,
+            'elapsed': time.time() - started,
+        }, info_dict)
+        return True
+
+    def _single_connection(self, filename, info_dict, tmpfilename):
+        # A preallocated segmented file would look complete to HttpFD's resume logic
+        state_path = tmpfilename + STATE_SUFFIX
+        if os.path.exists(state_path):
+            os.unlink(state_path)
+            if os.path.exists(tmpfilename):
+                os.unlink(tmpfilename)
+        fd = HttpFD(self.ydl, self.params)
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        return fd.real_download(filename, info_dict)
+
+
+class PooledYoutubeDL(YoutubeDL):
+    """YoutubeDL that routes plain HTTP formats through SegmentedFD when enabled."""
+
+    def dl(self, name, info, subtitle=False, test=False):
+        fd = SegmentedFD(self, self.params)
+        ticket = self.params.get('bandwidth_ticket')
+        if ticket is not None and not test:
+            tmpfilename = fd.temp_name(name)
+            ticket.start_file(tmpfilename, self._resume_offset(tmpfilename))
+        if subtitle or test or not info.get('url') or not fd.accepts(name, info):
+            return super().dl(name, info, subtitle, test)
+
+        # Same steps as YoutubeDL.dl, with our downloader
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        new_info = self._copy_infodict(info)
+        if new_info.get('http_headers') is None:
+            new_info['http_headers'] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
+    def _resume_offset(self, tmpfilename):
+        """Bytes yt-dlp will continue from (the '.part' size), or 0 when it starts over."""
+        if not self.params.get('continuedl', True):
+            return 0
+        try:
+            return os.path.getsize(tmpfilename)
+        except OSError:
+            return 0
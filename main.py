@@ -1,11 +1,9 @@
 import sys
 import argparse
-from PyQt6.QtWidgets import QApplication
 
-# Import Modules
-from ui.main_window import MainWindow
-from core.cli import run_cli_mode
-from core.cleaner import clear_downloads_folder
+# Modes import their modules only when chosen: the GUI needs PyQt6, CLI
+# downloads need yt-dlp, and --clear/--help need neither (and must work
+# on headless servers without Qt libraries).
 
 def main():
     """
@@ -16,14 +14,46 @@ def main():
     parser = argparse.ArgumentParser(description="Smart YouTube Downloader (GUI & CLI)")
     
     # Positional Argument: URL
-    parser.add_argument("url", nargs="?", help="The YouTube URL to download")
+    parser.add_argument("url", nargs="?", help="The YouTube URL to download, or 'serve' to run the download daemon")
     
     # Optional Flags
-    parser.add_argument("-a", "--audio", action="store_true", help="Download audio only (MP3)")
+    parser.add_argument("-a", "--audio", action="store_true", help="Download audio only (see --audio-format)")
+    parser.add_argument("--audio-format", choices=("m4a", "opus", "mp3"), default="m4a",
+                        help="Audio-only output. m4a/opus keep the original stream (no re-encode) when available; "
+                             "mp3 always re-encodes. Default: m4a")
     parser.add_argument("-q", "--quality", default="1080", help="Max video height (e.g., 1080, 720). Default: 1080")
     
+    # Batch Mode: many URLs in one process
+    parser.add_argument("-b", "--batch", metavar="FILE", help="Download every URL listed in FILE (one per line, '-' for stdin)")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Parallel downloads in batch/playlist mode. Default: 4")
+    parser.add_argument("-n", "--connections", type=int, default=1, help="Parallel connections per file (segmented download). Default: 1 (off)")
+    parser.add_argument("-f", "--force", action="store_true", help="Download even if the video is already in the download archive")
+
+    # Bandwidth: one limit shared by every download (also applies to the GUI)
+    parser.add_argument("-l", "--limit", metavar="RATE", help="Total bandwidth cap, e.g. 500K, 2M (default: unlimited)")
+    parser.add_argument("--limit-schedule", metavar="WINDOWS", help="Time-of-day caps, e.g. '09:00-18:00=2M,18:00-09:00=off'")
+    
+    # Output I/O: where files are written first and how (also applies to the GUI)
+    parser.add_argument("--staging-dir", metavar="DIR", help="Write downloads to a fast local folder first, then move each finished file into place")
+    parser.add_argument("--chunk-size", metavar="SIZE", help="HTTP range request size, e.g. 10M (default: one request per file)")
+    parser.add_argument("--buffer-size", metavar="SIZE", help="Read/write block size, e.g. 1M (default: adaptive)")
+    parser.add_argument("--no-preallocate", action="store_true", help="Don't reserve disk space up front (fallocate can be slow on network shares)")
+    parser.add_argument("--fsync", choices=("off", "file", "full"), help="Force finished files (file) and their folder (full) to disk. Default: off")
+
+    # Daemon Mode: 'ytdownload serve' accepts jobs over a local HTTP/JSON API
+    parser.add_argument("--host", default="127.0.0.1", help="Address for 'serve' to listen on. Default: 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="Port for 'serve' to listen on. Default: 8765")
+
     # NEW ARGUMENT: Clear Downloads
     parser.add_argument("-c", "--clear", action="store_true", help="Delete all files in the downloads folder")
+
+    # Retention: keep the downloads folder within a size quota / maximum age
+    parser.add_argument("--max-size", metavar="SIZE", help="Size quota for the downloads folder, e.g. 50G (checked after every download)")
+    parser.add_argument("--max-age", metavar="AGE", help="Delete downloads older than AGE, e.g. 12h, 30d (checked after every download)")
+    parser.add_argument("--evict", choices=("lru", "oldest"), default="lru", help="Which files go first when over quota. Default: lru")
+    parser.add_argument("--prune", action="store_true", help="Apply --max-size/--max-age to the downloads folder now and exit")
+    parser.add_argument("--dry-run", action="store_true", help="With --clear/--prune: list what would be deleted, delete nothing")
+    parser.add_argument("-y", "--yes", action="store_true", help="With --clear/--prune: do not ask for confirmation (for cron)")
     
     args = parser.parse_args()
 
@@ -31,15 +61,79 @@ def main():
 
     # Case 1: User wants to clear downloads
     if args.clear:
-        clear_downloads_folder()
-        sys.exit() # Exit after cleaning, don't open GUI
+        from core.cleaner import clear_downloads_folder
+        sys.exit(clear_downloads_folder(args.yes, args.dry_run)) # Exit after cleaning, don't open GUI
+
+    # Retention limits apply to '--prune' and after every download in this process
+    if args.max_size or args.max_age or args.prune:
+        from core.cleaner import RetentionPolicy, get_retention_manager, parse_size, parse_age, run_retention
+        try:
+            policy = RetentionPolicy(parse_size(args.max_size), parse_age(args.max_age), args.evict)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.prune:
+            if not policy.enabled:
+                policy = RetentionPolicy.from_env()
+            if not policy.enabled:
+                parser.error("--prune needs --max-size and/or --max-age")
+            sys.exit(run_retention(policy, args.yes, args.dry_run))
+        get_retention_manager().policy = policy
+
+    # I/O settings: environment defaults, overridden by flags
+    if args.staging_dir or args.chunk_size or args.buffer_size or args.no_preallocate or args.fsync:
+        from core.storage import IOConfig, set_io_config
+        from core.cleaner import parse_size
+        try:
+            config = IOConfig.from_env()
+            set_io_config(IOConfig(
+                args.staging_dir or config.staging_dir,
+                parse_size(args.chunk_size) if args.chunk_size else config.http_chunk_size,
+                parse_size(args.buffer_size) if args.buffer_size else config.buffer_size,
+                config.preallocate and not args.no_preallocate,
+                args.fsync or config.fsync,
+            ))
+        except ValueError as e:
+            parser.error(str(e))
 
-    # Case 2: CLI Mode (URL provided)
+    # Every download mode shares one bandwidth limit
+    from core.bandwidth import get_bandwidth_governor, parse_rate, parse_schedule
+    try:
+        governor = get_bandwidth_governor()
+        governor.set_rate(parse_rate(args.limit))
+        governor.set_schedule(parse_schedule(args.limit_schedule))
+    except ValueError as e:
+        parser.error(str(e))
+
+    from core.urls import is_playlist_url
+
+    # Case 2: Daemon Mode (long-running, jobs submitted over HTTP)
+    if args.url == "serve":
+        from core.server import run_server_mode
+        sys.exit(run_server_mode(args.host, args.port, args.jobs, args.connections))
+
+    # Case 3: Batch Mode (URL list provided)
+    elif args.batch:
+        from core.cli import run_batch_mode
+        sys.exit(run_batch_mode(args.batch, args.audio, args.quality, args.jobs, args.connections, args.force,
+                                args.audio_format))
+
+    # Case 4: Playlist / Channel URL (expanded and downloaded like a batch)
+    elif args.url and is_playlist_url(args.url):
+        from core.cli import run_url_batch
+        sys.exit(run_url_batch([args.url], args.audio, args.quality, args.jobs, args.connections, args.force,
+                               args.audio_format))
+
+    # Case 5: CLI Mode (URL provided)
     elif args.url:
-        run_cli_mode(args.url, args.audio, args.quality)
+        from core.cli import run_cli_mode
+        ok = run_cli_mode(args.url, args.audio, args.quality, args.connections, args.force, args.audio_format)
+        sys.exit(0 if ok else 1)
         
-    # Case 3: GUI Mode (No arguments)
+    # Case 6: GUI Mode (No arguments)
     else:
+        from PyQt6.QtWidgets import QApplication
+        from ui.main_window import MainWindow
+
         # Check if QApplication already exists
         app = QApplication.instance()
         if not app:
@@ -5,7 +5,7 @@ setup(
     version="1.0.0",
     description="A Smart YouTube Downloader with GUI and CLI support",
     author="Your Name",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     
     py_modules=['main'],
     
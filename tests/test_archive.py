@@ -0,0 +1,27 @@
+from core.archive import DownloadArchive, info_key
+
+
+def test_record_and_lookup_by_canonical_id(tmp_path):
+    archive = DownloadArchive(str(tmp_path / 'archive.db'))
+    archive.record('https://youtu.be/dQw4w9WgXcQ?t=10', '720p', 'Title', '/x/Title.mp4')
+    assert archive.contains('https://m.youtube.com/watch?v=dQw4w9WgXcQ', '720p')
+    assert not archive.contains('https://youtu.be/dQw4w9WgXcQ', '1080p')
+    assert archive.get('https://youtu.be/dQw4w9WgXcQ', '720p')['filepath'] == '/x/Title.mp4'
+
+    archive.record('https://youtu.be/dQw4w9WgXcQ', '1080p')
+    assert archive.qualities('https://youtu.be/dQw4w9WgXcQ') == ['720p', '1080p']
+    archive.forget('https://youtu.be/dQw4w9WgXcQ', '720p')
+    assert archive.qualities('https://youtu.be/dQw4w9WgXcQ') == ['1080p']
+    archive.forget('https://youtu.be/dQw4w9WgXcQ')
+    assert len(archive) == 0
+
+
+def test_records_the_extractor_key_too(tmp_path):
+    archive = DownloadArchive(str(tmp_path / 'archive.db'))
+    key = info_key({'id': '123456', 'extractor_key': 'Vimeo'})
+    assert key == 'vimeo:123456'
+    assert info_key({'id': '123456'}) is None
+
+    archive.record('https://player.vimeo.com/video/123456?h=abc', 'Best Quality', video_key=key)
+    assert len(archive) == 2  # Under the URL and under the canonical key
+    assert DownloadArchive(archive.path).contains('https://player.vimeo.com/video/123456?h=abc', 'Best Quality')
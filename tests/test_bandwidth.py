@@ -0,0 +1,83 @@
+from datetime import datetime
+import pytest
+from core.bandwidth import BandwidthGovernor, parse_rate, parse_schedule
+
+
+class RecordingGovernor(BandwidthGovernor):
+    """Unlimited governor that remembers what each ticket paid for."""
+
+    def __init__(self):
+        super().__init__()
+        self.paid = []
+
+    def _consume(self, ticket, nbytes):
+        self.paid.append(nbytes)
+
+
+def progress(downloaded, filename='video.mp4.part', **extra):
+    return {'status': 'downloading', 'tmpfilename': filename, 'downloaded_bytes': downloaded, **extra}
+
+
+def test_parse_rate():
+    assert parse_rate('500K') == 500 * 1024
+    assert parse_rate('1.5MiB/s') == int(1.5 * 1024 * 1024)
+    assert parse_rate('2048') == 2048
+    for unlimited in (None, '', '0', 'off', 'None'):
+        assert parse_rate(unlimited) is None
+    with pytest.raises(ValueError):
+        parse_rate('fast')
+
+
+def test_parse_schedule_and_current_rate():
+    windows = parse_schedule('09:00-18:00=2M, 22:00-06:30=off')
+    assert windows == [(540, 1080, 2 * 1024 ** 2), (1320, 390, None)]
+    with pytest.raises(ValueError):
+        parse_schedule('9-18=2M')
+
+    governor = BandwidthGovernor(rate=1024, schedule=windows)
+    assert governor.current_rate(datetime(2024, 1, 1, 12, 0)) == 2 * 1024 ** 2
+    assert governor.current_rate(datetime(2024, 1, 1, 23, 0)) is None  # Wraps past midnight
+    assert governor.current_rate(datetime(2024, 1, 1, 5, 0)) is None
+    assert governor.current_rate(datetime(2024, 1, 1, 20, 0)) == 1024  # Outside any window
+
+
+def test_hook_pays_for_increments_only():
+    governor = RecordingGovernor()
+    ticket = governor.ticket()
+    for downloaded in (0, 1000, 1000, 5000):
+        ticket.hook(progress(downloaded))
+    ticket.hook({'status': 'finished', 'filename': 'video.mp4'})
+    ticket.hook(progress(9000, throttled=True))  # Already paid per chunk by the downloader
+    assert governor.paid == [1000, 4000]
+
+
+def test_hook_charges_a_fresh_files_first_block():
+    governor = RecordingGovernor()
+    ticket = governor.ticket()
+    ticket.start_file('video.mp4.part', 0)
+    ticket.hook(progress(8 * 1024 ** 2))  # One large --chunk-size block before the first report
+    assert governor.paid == [8 * 1024 ** 2]
+
+
+def test_hook_does_not_charge_resumed_prefix():
+    governor = RecordingGovernor()
+    ticket = governor.ticket()
+    prefix = 2 * 1024 ** 3
+    ticket.start_file('video.mp4.part', prefix)  # Resumed .part from an earlier session
+    ticket.hook(progress(prefix + 65536))
+    ticket.hook(progress(prefix + 98304))
+    assert governor.paid == [65536, 32768]
+
+    # Each file (e.g. video and audio of a merged format) has its own baseline
+    ticket.start_file('video.m4a.part', 300)
+    ticket.hook(progress(800, filename='video.m4a.part'))
+    assert governor.paid == [65536, 32768, 500]
+
+
+def test_hook_charges_a_resume_the_server_ignored():
+    governor = RecordingGovernor()
+    ticket = governor.ticket()
+    ticket.start_file('video.mp4.part', 10000)
+    ticket.hook(progress(4000))  # Started over from byte 0
+    ticket.hook(progress(12000))
+    assert governor.paid == [4000, 8000]
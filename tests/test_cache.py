@@ -0,0 +1,42 @@
+import time
+from core.cache import MetadataCache
+
+URL = 'https://www.youtube.com/watch?v=%s'
+
+
+def make_cache(tmp_path, **kwargs):
+    return MetadataCache(str(tmp_path / 'metadata.db'), **kwargs)
+
+
+def test_put_get_by_video_id(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put(URL % 'dQw4w9WgXcQ', {'title': 'a', 'formats': ['1080p']})
+    result = cache.get('https://youtu.be/dQw4w9WgXcQ')  # Same video, other URL form
+    assert result == {'title': 'a', 'formats': ['1080p'], 'url': 'https://youtu.be/dQw4w9WgXcQ'}
+    assert cache.get(URL % 'xxxxxxxxxxx') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_expired_entries_miss(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put(URL % 'dQw4w9WgXcQ', {'title': 'a'})
+    later = time.time() + 61
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert cache.get(URL % 'dQw4w9WgXcQ') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put(URL % 'aaaaaaaaaaa', {'title': 'a'})
+    cache.put(URL % 'bbbbbbbbbbb', {'title': 'b'})
+    cache.get(URL % 'aaaaaaaaaaa')  # 'b' is now the least recently used
+    cache.put(URL % 'ccccccccccc', {'title': 'c'})
+    assert cache.get(URL % 'bbbbbbbbbbb') is None
+    assert cache.get(URL % 'aaaaaaaaaaa')['title'] == 'a'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_survives_reopen(tmp_path):
+    make_cache(tmp_path).put(URL % 'dQw4w9WgXcQ', {'title': 'a'})
+    assert make_cache(tmp_path).get(URL % 'dQw4w9WgXcQ')['title'] == 'a'
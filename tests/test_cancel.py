@@ -0,0 +1,69 @@
+import threading
+import time
+import pytest
+from core.cancel import CancelToken, CancellableLogger, DownloadCancelled, current_token
+
+
+def test_cancel_runs_callbacks_once():
+    token = CancelToken()
+    calls = []
+    unregister = token.add_callback(lambda: calls.append('a'))
+    token.add_callback(lambda: calls.append('b'))
+    unregister()
+    token.cancel()
+    token.cancel()
+    assert calls == ['b']
+    token.add_callback(lambda: calls.append('late'))  # Already cancelled: runs at once
+    assert calls == ['b', 'late']
+    with pytest.raises(DownloadCancelled):
+        token.check()
+
+
+def test_pause_blocks_check_until_resumed():
+    token = CancelToken()
+    token.pause()
+    assert token.paused
+    passed = threading.Event()
+
+    def worker():
+        token.check()
+        passed.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(0.1)
+    assert not passed.is_set()
+    token.resume()
+    assert passed.wait(2)
+    thread.join()
+
+
+def test_cancel_releases_a_paused_check():
+    token = CancelToken()
+    token.pause()
+    errors = []
+
+    def worker():
+        try:
+            token.check()
+        except DownloadCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    token.cancel()
+    thread.join(2)
+    assert len(errors) == 1
+    assert not token.paused
+
+
+def test_logger_checks_and_binding():
+    token = CancelToken()
+    logger = CancellableLogger(token)
+    logger.debug('[youtube] Downloading webpage')
+    with token.bind():
+        assert current_token() is token
+    assert current_token() is None
+    token.cancel()
+    with pytest.raises(DownloadCancelled):
+        logger.info('[download] Destination: x.mp4')
@@ -0,0 +1,92 @@
+import os
+import time
+import pytest
+from core.cleaner import RetentionManager, RetentionPolicy, parse_age, parse_size, plan_retention, enforce_retention, EVICT_OLDEST
+
+DAY = 86400
+
+
+def make_file(root, name, size, mtime=None):
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_parse_size_and_age():
+    assert parse_size('500M') == 500 * 1024 * 1024
+    assert parse_size('off') is None
+    assert parse_age('12h') == 12 * 3600
+    assert parse_age('30') == 30 * DAY
+    assert parse_age('0') is None
+    with pytest.raises(ValueError):
+        parse_age('soon')
+    with pytest.raises(ValueError):
+        parse_size('lots')
+
+
+def test_metadata_changes_do_not_reset_age(tmp_path):
+    # chmod (like a rename or move) bumps ctime; the download time is the mtime
+    path = make_file(str(tmp_path), 'old.mp4', 10, mtime=time.time() - 40 * DAY)
+    os.chmod(path, 0o600)
+    victims, _ = plan_retention(str(tmp_path), RetentionPolicy(max_age=30 * DAY))
+    assert victims == [(path, 10)]
+
+
+def test_max_age_uses_download_time(tmp_path):
+    path = make_file(str(tmp_path), 'a.mp4', 10)
+    policy = RetentionPolicy(max_age=30 * DAY)
+    assert plan_retention(str(tmp_path), policy, now=time.time() + 29 * DAY)[0] == []
+    assert plan_retention(str(tmp_path), policy, now=time.time() + 31 * DAY)[0] == [(path, 10)]
+
+
+def test_quota_evicts_until_it_fits(tmp_path):
+    root = str(tmp_path)
+    for i in range(5):
+        make_file(root, f'sub/{i}.mp4', 100)
+    victims, total = plan_retention(root, RetentionPolicy(max_bytes=250, order=EVICT_OLDEST))
+    assert total == 500
+    assert len(victims) == 3
+    assert total - sum(size for _, size in victims) <= 250
+
+
+def test_protected_and_partial_files_are_kept(tmp_path):
+    root = str(tmp_path)
+    keep = make_file(root, 'new.mp4', 100)
+    make_file(root, 'running.mp4.part', 1000)
+    victims, total = plan_retention(root, RetentionPolicy(max_bytes=1), protect=[keep])
+    assert victims == []
+    assert total == 100
+
+
+def test_merge_intermediates_and_held_downloads_are_kept(tmp_path):
+    root = str(tmp_path)
+    make_file(root, 'merging.f137.mp4', 100)
+    make_file(root, 'merging.f140.m4a', 100)
+    waiting = make_file(root, 'waiting.webm', 100)  # Downloaded, conversion still queued
+    converting = make_file(root, 'waiting.m4a', 100)  # Its conversion output, being written
+    other = make_file(root, 'other.mp4', 100)
+
+    manager = RetentionManager(RetentionPolicy(max_bytes=1))
+    manager.hold(waiting)
+    victims, total = plan_retention(root, manager.policy, protect=manager.held())
+    assert victims == [(other, 100)]
+    assert total == 300
+
+    manager.release(waiting)
+    victims, _ = plan_retention(root, manager.policy, protect=manager.held())
+    assert sorted(victims) == sorted([(waiting, 100), (converting, 100), (other, 100)])
+
+
+def test_dry_run_deletes_nothing(tmp_path):
+    root = str(tmp_path)
+    path = make_file(root, 'a/b.mp4', 100)
+    report = enforce_retention(root, RetentionPolicy(max_bytes=10), dry_run=True)
+    assert report['victims'] == 1 and report['deleted'] == 0
+    assert os.path.exists(path)
+    report = enforce_retention(root, RetentionPolicy(max_bytes=10))
+    assert report['deleted'] == 1
+    assert not os.path.exists(os.path.join(root, 'a'))  # Emptied folder removed
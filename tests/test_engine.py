@@ -0,0 +1,20 @@
+import pytest
+from core.cancel import CancelToken, DownloadCancelled
+from core import engine
+
+
+def test_superseded_metadata_fetch_never_leases(monkeypatch):
+    def lease_pool():
+        raise AssertionError("a cancelled fetch must not take a YoutubeDL")
+
+    monkeypatch.setattr(engine, 'get_ydl_pool', lease_pool)
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(DownloadCancelled):
+        engine.fetch_video_info('https://youtu.be/dQw4w9WgXcQ', token=token)
+
+
+def test_downloads_keep_their_arrival_time_as_mtime():
+    # Retention ages files by mtime, so yt-dlp must not set it to the upload date
+    job = engine.DownloadJob('https://youtu.be/dQw4w9WgXcQ', '720p', '.')
+    assert engine.build_download_options(job, 'best')['updatetime'] is False
@@ -0,0 +1,58 @@
+from core.jobs import JobStore, STATUS_PENDING, STATUS_DOWNLOADING, STATUS_DONE
+
+YOUTUBE = 'https://www.youtube.com/watch?v=%s'
+VIMEO = 'https://vimeo.com/%d'
+
+
+def video_id(n):
+    return f'{n:011d}'
+
+
+def test_duplicates_and_row_order():
+    store = JobStore()
+    first = store.add(YOUTUBE % video_id(1), '720p', 'one')
+    assert store.add(f'https://youtu.be/{video_id(1)}', '720p', 'again') is None  # Same video, same quality
+    second = store.add(YOUTUBE % video_id(1), '1080p', 'other quality')
+    third = store.add(YOUTUBE % video_id(3), '720p', 'three')
+    assert [store.row_of(j.job_id) for j in (first, second, third)] == [0, 1, 2]
+    assert sorted(store.jobs_for_video(first.video_key)) == [first.job_id, second.job_id]
+
+    assert store.remove(second.job_id) == 1
+    assert store.row_of(third.job_id) == 1
+    assert store.job_at(1) is third
+    assert store.pending_count() == 2
+
+
+def test_next_pending_is_fifo_within_host_limits():
+    store = JobStore()
+    jobs = [store.add(YOUTUBE % video_id(i), '720p', str(i)) for i in range(3)]
+    jobs += [store.add(VIMEO % i, '720p', f'v{i}') for i in range(2)]
+
+    picked = store.next_pending()
+    assert picked is jobs[0]
+    store.set_status(picked.job_id, STATUS_DOWNLOADING)
+
+    # YouTube is at its limit: the oldest job of another host goes next
+    picked = store.next_pending(lambda host: host != 'youtube.com')
+    assert picked is jobs[3]
+    store.set_status(picked.job_id, STATUS_DOWNLOADING)
+    assert store.pending_count() == 3
+
+
+def test_prioritize_and_requeue():
+    store = JobStore()
+    jobs = [store.add(YOUTUBE % video_id(i), '720p', str(i)) for i in range(3)]
+    store.prioritize(jobs[2].job_id)
+    assert [j.job_id for j in store.peek_pending(3)] == [jobs[2].job_id, jobs[0].job_id, jobs[1].job_id]
+    assert store.next_pending() is jobs[2]
+    store.set_status(jobs[2].job_id, STATUS_DOWNLOADING)
+
+    store.remove(jobs[0].job_id)  # Its queue entry is skipped lazily
+    assert store.next_pending() is jobs[1]
+    store.set_status(jobs[1].job_id, STATUS_DONE)
+
+    # A job set back to pending (e.g. a retry) goes to the back of the queue
+    store.set_status(jobs[2].job_id, STATUS_PENDING)
+    assert store.pending_count() == 1
+    assert store.next_pending() is jobs[2]
+    assert store.next_pending() is None
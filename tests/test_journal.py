@@ -0,0 +1,83 @@
+import json
+import os
+from core.jobs import JobStore, STATUS_DOWNLOADING, STATUS_POSTPROCESSING, STATUS_DONE, STATUS_ERROR, STATUS_PENDING
+from core.journal import JobJournal, restore_jobs
+
+URL = 'https://www.youtube.com/watch?v=%s'
+
+
+def attached_store(tmp_path):
+    journal = JobJournal(str(tmp_path / 'journal.jsonl'))
+    return JobStore(journal), journal
+
+
+def test_replay_keeps_unfinished_jobs_in_order(tmp_path):
+    store, journal = attached_store(tmp_path)
+    done, failed, running, removed, waiting = (store.add(URL % v, '720p', v) for v in 'abcde')
+    running.output_path = str(tmp_path)
+    running.format_spec = '136+140'
+    store.set_status(done.job_id, STATUS_DONE)
+    store.set_status(failed.job_id, STATUS_ERROR)
+    store.set_status(running.job_id, STATUS_DOWNLOADING)
+    store.checkpoint(running.job_id, {'status': 'downloading', 'downloaded_bytes': 4096,
+                                      'filename': str(tmp_path / 'c.mp4')})
+    store.remove(removed.job_id)
+    journal.close()
+
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "state", "key": ')  # Torn last line from a crash
+
+    records = JobJournal(journal.path).load()
+    assert [r['title'] for r in records] == ['b', 'c', 'e']
+    assert [r['status'] for r in records] == [STATUS_ERROR, STATUS_DOWNLOADING, STATUS_PENDING]
+    assert records[1]['phase'] == 'downloading'
+    assert records[1]['bytes'] == 4096
+    assert records[1]['format_spec'] == '136+140'
+
+    # load() compacts the log; replaying the compacted file gives the same jobs
+    assert JobJournal(journal.path).load() == records
+
+
+def test_restore_jobs_requeues_interrupted(tmp_path):
+    store, journal = attached_store(tmp_path)
+    job = store.add(URL % 'a', '1080p', 'a')
+    job.output_path = str(tmp_path)
+    store.set_status(job.job_id, STATUS_DOWNLOADING)
+    partial = tmp_path / 'a.mp4'
+    partial.with_name('a.mp4.part').write_bytes(b'x' * 2 * 1024 * 1024)
+    store.checkpoint(job.job_id, {'status': 'downloading', 'downloaded_bytes': 1, 'filename': str(partial)})
+    pp_job = store.add(URL % 'b', '1080p', 'b')
+    store.set_status(pp_job.job_id, STATUS_POSTPROCESSING)
+    journal.close()
+
+    fresh = JobStore()
+    assert restore_jobs(fresh, JobJournal(journal.path)) == (2, 2)
+    restored = list(fresh)
+    assert [j.status for j in restored] == [STATUS_PENDING, STATUS_PENDING]
+    assert restored[0].output_path == str(tmp_path)
+    assert restored[0].status_text == "Resumes at 2.0 MiB"
+    assert restored[1].status_text == "Interrupted while processing (will redo)"
+    assert fresh.pending_count() == 2
+
+
+def test_add_many_writes_and_syncs_once(tmp_path, monkeypatch):
+    store, journal = attached_store(tmp_path)
+    syncs = []
+    monkeypatch.setattr(os, 'fsync', syncs.append)
+
+    entries = [{'url': URL % i, 'title': str(i)} for i in range(2000)]
+    entries.append(entries[0])  # Duplicates are skipped
+    assert len(store.add_many(entries, '720p')) == 2000
+    assert len(syncs) == 1
+
+    # Pending/retrying churn is not fsynced; phase boundaries are
+    job = store.job_at(0)
+    store.set_status(job.job_id, STATUS_DOWNLOADING)
+    store.set_status(job.job_id, STATUS_PENDING)
+    store.remove(store.job_at(1).job_id)
+    assert len(syncs) == 2
+    journal.close()
+
+    with open(journal.path, encoding='utf-8') as f:
+        ops = [json.loads(line)['op'] for line in f]
+    assert ops.count('add') == 2000
@@ -0,0 +1,48 @@
+import pytest
+from core.metadata import (AUDIO_M4A, AUDIO_OPUS, AUDIO_MP3, build_video_info, build_format_table, is_stream_copy,
+                           select_format_id)
+from core.engine import DownloadJob, postprocessor_defs, quality_format_string, quality_label
+
+INFO = {
+    'title': 'Test',
+    'formats': [
+        {'format_id': '140', 'ext': 'm4a', 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': 129},
+        {'format_id': '251', 'ext': 'webm', 'vcodec': 'none', 'acodec': 'opus', 'abr': 135},
+        {'format_id': '137', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none', 'height': 1080, 'tbr': 4000},
+        {'format_id': '136', 'ext': 'mp4', 'vcodec': 'avc1', 'acodec': 'none', 'height': 720, 'tbr': 2000},
+    ],
+}
+
+
+def test_stream_copy_detection():
+    assert is_stream_copy(AUDIO_M4A, 'mp4a.40.2')
+    assert is_stream_copy(AUDIO_OPUS, 'opus')
+    assert not is_stream_copy(AUDIO_M4A, 'opus')
+    assert not is_stream_copy(AUDIO_MP3, 'opus')
+    assert not is_stream_copy(AUDIO_M4A, None)
+
+
+def test_audio_labels_follow_the_available_streams():
+    assert build_video_info(INFO, 'u')['formats'][-3:] == [AUDIO_M4A, AUDIO_OPUS, AUDIO_MP3]
+    opus_only = dict(INFO, formats=[f for f in INFO['formats'] if f['format_id'] != '140'])
+    assert AUDIO_M4A not in build_video_info(opus_only, 'u')['formats']
+
+
+def test_audio_selection_prefers_a_remux_over_bitrate():
+    table = build_format_table(INFO)
+    assert select_format_id(table, AUDIO_M4A) == '140'  # Lower bitrate, but no re-encode
+    assert select_format_id(table, AUDIO_OPUS) == '251'
+    assert select_format_id(table, AUDIO_MP3) == '251'  # Re-encoded either way: best bitrate
+    assert select_format_id(table, '720p') == '136+251'
+    assert select_format_id(table, '1080p (Video Only)') == '137'
+
+
+def test_quality_labels_and_postprocessing():
+    assert quality_label(True, audio_format='opus') == AUDIO_OPUS
+    assert quality_label(False, '720') == '720p'
+    with pytest.raises(ValueError):
+        quality_label(True, audio_format='flac')
+
+    assert quality_format_string(AUDIO_M4A) == 'bestaudio[acodec^=mp4a]/bestaudio/best'
+    assert postprocessor_defs(DownloadJob('u', AUDIO_OPUS))[0]['preferredcodec'] == 'opus'
+    assert postprocessor_defs(DownloadJob('u', '1080p')) == []
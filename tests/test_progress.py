@@ -0,0 +1,35 @@
+from core.progress import ProgressAggregator, format_eta, format_speed, snapshot_from_hook
+
+
+def test_snapshot_uses_raw_counters():
+    snap = snapshot_from_hook({'status': 'downloading', 'downloaded_bytes': 250,
+                               'total_bytes': 1000, 'speed': 50.0, 'filename': 'a.mp4'})
+    assert snap['percent'] == 25.0
+    assert snap['eta'] == 15
+    frag = snapshot_from_hook({'status': 'downloading', 'fragment_index': 3, 'fragment_count': 4})
+    assert frag['percent'] == 75.0
+    assert frag['eta'] is None
+
+
+def test_formatting():
+    assert format_speed(0) == 'N/A'
+    assert format_speed(2048) == '2.00KiB/s'
+    assert format_eta(None) == 'N/A'
+    assert format_eta(42) == '00:42'
+    assert format_eta(3725) == '1:02:05'
+
+
+def test_aggregator_keeps_latest_snapshot_per_job():
+    agg = ProgressAggregator()
+    agg.report('a', {'status': 'downloading', 'speed': 10.0})
+    agg.report('a', {'status': 'downloading', 'speed': 30.0})
+    agg.report('b', {'status': 'finished', 'speed': 99.0})
+    assert agg.total_speed() == 30.0
+    batch = agg.drain()
+    assert batch['a']['speed'] == 30.0 and set(batch) == {'a', 'b'}
+    assert agg.drain() == {}
+    agg.report('a', {'status': 'downloading', 'speed': 5.0})
+    agg.discard('a')
+    assert agg.drain() == {}
+    assert agg.total_speed() == 0
+    assert agg.stats() == {'received': 4, 'delivered': 2, 'merged': 2}
@@ -0,0 +1,70 @@
+import random
+import pytest
+from core.retry import (RetryEngine, RetryPolicy, classify_error, fallback_quality, ERROR_THROTTLED, ERROR_NETWORK,
+                        ERROR_FORMAT, ERROR_FATAL, ERROR_CANCELLED, ERROR_UNKNOWN)
+
+
+@pytest.mark.parametrize('message, expected', [
+    ("ERROR: unable to download video data: HTTP Error 403: Forbidden", ERROR_THROTTLED),
+    ("HTTP Error 429: Too Many Requests", ERROR_THROTTLED),
+    ("<urlopen error [Errno -3] Temporary failure in name resolution>", ERROR_NETWORK),
+    ("Read timed out.", ERROR_NETWORK),
+    ("HTTP Error 503: Service Unavailable", ERROR_NETWORK),
+    ("Requested format is not available. Use --list-formats", ERROR_FORMAT),
+    ("ERROR: [youtube] abc: Private video. Sign in if you've been granted access", ERROR_FATAL),
+    ("Video unavailable. This video has been removed by the uploader", ERROR_FATAL),
+    ("[Errno 28] No space left on device", ERROR_FATAL),
+    ("Download cancelled by user", ERROR_CANCELLED),
+    ("Cancelled", ERROR_CANCELLED),
+    ("Something odd happened", ERROR_UNKNOWN),
+    (None, ERROR_UNKNOWN),
+])
+def test_classify_error(message, expected):
+    assert classify_error(message) == expected
+
+
+def test_fallback_quality():
+    assert fallback_quality("1080p") == "720p"
+    assert fallback_quality("720p (Video Only)") == "480p (Video Only)"
+    assert fallback_quality("Best Quality") == "1080p"
+    assert fallback_quality("1000p") == "720p"  # Non-standard heights step to the next lower one
+    assert fallback_quality("144p") is None
+    assert fallback_quality("Audio Only (M4A)") is None
+
+
+def test_delay_grows_and_is_capped():
+    policy = RetryPolicy(max_attempts=10, base_delay=5, max_delay=60, jitter=0)
+    assert [policy.delay(a) for a in range(1, 6)] == [5, 10, 20, 40, 60]
+
+    jittered = RetryPolicy(max_attempts=10, base_delay=10, max_delay=60, jitter=0.5)
+    rng = random.Random(1)
+    for attempt in range(1, 8):
+        nominal = min(60, 10 * 2 ** (attempt - 1))
+        assert nominal * 0.5 <= jittered.delay(attempt, rng) <= nominal * 1.5
+
+
+def test_decide_retries_until_the_policy_gives_up():
+    engine = RetryEngine(rng=random.Random(0))
+    first = engine.decide("HTTP Error 429: Too Many Requests", 1, "1080p")
+    assert first.retry and first.error_class == ERROR_THROTTLED
+    assert 15 <= first.delay <= 45
+    assert first.quality is None  # Throttling is not the format's fault
+
+    last = engine.decide("HTTP Error 429: Too Many Requests", first.max_attempts, "1080p")
+    assert not last.retry and last.delay is None
+
+    assert not engine.decide("Private video", 1, "1080p").retry
+    assert not engine.decide("Download cancelled by user", 1, "1080p").retry
+
+
+def test_decide_lowers_quality_on_format_errors():
+    engine = RetryEngine(policies={ERROR_FORMAT: RetryPolicy(max_attempts=3, base_delay=1, max_delay=1,
+                                                               fallback_format=True)},
+                         rng=random.Random(0))
+    decision = engine.decide("Requested format is not available", 1, "1440p")
+    assert decision.retry and decision.quality == "1080p"
+    assert engine.decide("Requested format is not available", 1, "144p").quality is None
+    assert not engine.decide("Requested format is not available", 3, "720p").retry
+
+    # Other classes keep their defaults
+    assert engine.decide("Connection reset by peer", 1, "720p").error_class == ERROR_NETWORK
@@ -0,0 +1,72 @@
+import http.server
+import os
+import threading
+import pytest
+from core.segmented import SegmentedDownload, probe_size, STATE_SUFFIX
+
+DATA = os.urandom(5 * 1024 * 1024 + 321)
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    served = []  # Byte ranges answered, for the resume checks
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        first, last = (int(v) for v in self.headers['Range'][len('bytes='):].split('-'))
+        body = DATA[first:last + 1]
+        self.served.append((first, last + 1))
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {first}-{last}/{len(DATA)}')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def url():
+    RangeHandler.served = []
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/video.mp4'
+    server.shutdown()
+    server.server_close()
+
+
+def served_bytes():
+    return sum(stop - start for start, stop in RangeHandler.served if stop - start > 1)  # Not the size probe
+
+
+def test_download_in_parallel(url, tmp_path):
+    path = str(tmp_path / 'video.mp4.part')
+    SegmentedDownload(url, path, probe_size(url), connections=4, read_size=64 * 1024).run()
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert not os.path.exists(path + STATE_SUFFIX)
+    assert served_bytes() == len(DATA)
+
+
+def test_continues_single_connection_part(url, tmp_path):
+    path = str(tmp_path / 'video.mp4.part')
+    prefix = 3 * 1024 * 1024 + 7
+    with open(path, 'wb') as f:  # What HttpFD leaves behind: a contiguous prefix, no sidecar
+        f.write(DATA[:prefix])
+
+    SegmentedDownload(url, path, probe_size(url), connections=3, preallocate=False).run()
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert served_bytes() == len(DATA) - prefix
+    assert min(start for start, stop in RangeHandler.served if stop - start > 1) == prefix
+
+
+def test_full_size_part_without_sidecar_starts_over(url, tmp_path):
+    path = str(tmp_path / 'video.mp4.part')
+    with open(path, 'wb') as f:  # Preallocated segmented file whose sidecar was lost: nothing to trust
+        f.truncate(len(DATA))
+
+    SegmentedDownload(url, path, probe_size(url), connections=2).run()
+    with open(path, 'rb') as f:
+        assert f.read() == DATA
+    assert served_bytes() == len(DATA)
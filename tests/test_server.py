@@ -0,0 +1,54 @@
+import asyncio
+import json
+from core.server import DownloadServer, ServerJob, STATUS_DONE
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n'
+                 .encode('latin-1') + data)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)  # Returns once the server closes the connection
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), payload.decode('utf-8')
+
+
+def serve(tmp_path, scenario):
+    async def main():
+        server = DownloadServer(port=0, jobs=1, save_path=str(tmp_path))
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_submit_rejects_boolean_connections(tmp_path):
+    async def scenario(server):
+        status, payload = await request(server.port, 'POST', '/jobs',
+                                        {'url': 'https://youtu.be/dQw4w9WgXcQ', 'connections': True})
+        return status, payload, len(server.jobs)
+
+    status, payload, jobs = serve(tmp_path, scenario)
+    assert status == 400
+    assert 'connections' in json.loads(payload)['error']
+    assert jobs == 0
+
+
+def test_events_of_finished_job_close_after_snapshot(tmp_path):
+    async def scenario(server):
+        job = ServerJob(7, 'https://youtu.be/dQw4w9WgXcQ', False, '1080', 1)
+        job.status = STATUS_DONE
+        server.jobs[job.job_id] = job
+        status, payload = await request(server.port, 'GET', '/jobs/7/events')
+        await asyncio.sleep(0)
+        return status, payload, len(server._subscribers)
+
+    status, payload, subscribers = serve(tmp_path, scenario)
+    assert status == 200
+    assert payload.startswith('event: snapshot\n')
+    assert '"status": "done"' in payload
+    assert subscribers == 0
@@ -0,0 +1,70 @@
+import os
+import pytest
+from core.storage import IOConfig, place_file, FSYNC_FILE, FSYNC_FULL, CHUNK_SIZE_ENV, STAGING_ENV, FSYNC_ENV
+
+
+def make_file(path, data=b'video', mtime=1_600_000_000):
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_config_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv(STAGING_ENV, str(tmp_path))
+    monkeypatch.setenv(CHUNK_SIZE_ENV, '10M')
+    monkeypatch.setenv(FSYNC_ENV, 'FULL')
+    config = IOConfig.from_env()
+    assert config.staging_dir == str(tmp_path)
+    assert config.ydl_options() == {'preallocate': True, 'fsync_policy': FSYNC_FULL,
+                                    'http_chunk_size': 10 * 1024 * 1024}
+    assert config.work_dir('/downloads') == str(tmp_path)
+    assert IOConfig().work_dir('/downloads') == '/downloads'
+    with pytest.raises(ValueError):
+        IOConfig(fsync='always')
+
+
+@pytest.mark.parametrize('fsync', ['off', FSYNC_FILE, FSYNC_FULL])
+def test_place_file_renames_into_place(tmp_path, fsync):
+    staged = make_file(tmp_path / 'video.mp4')
+    dest_dir = str(tmp_path / 'downloads')
+    placed = place_file(staged, dest_dir, IOConfig(fsync=fsync))
+    assert placed == os.path.join(dest_dir, 'video.mp4')
+    assert not os.path.exists(staged)
+    assert os.path.getmtime(placed) == 1_600_000_000  # The download time survives the move
+
+
+def test_place_file_copies_across_filesystems(tmp_path, monkeypatch):
+    staged = make_file(tmp_path / 'video.mp4', os.urandom(100_000))
+    with open(staged, 'rb') as f:
+        data = f.read()
+    dest_dir = tmp_path / 'share'
+    dest_dir.mkdir()
+
+    real_stat = os.stat
+
+    class OtherDevice:
+        def __init__(self, st):
+            self._st = st
+            self.st_dev = st.st_dev + 1
+
+        def __getattr__(self, name):
+            return getattr(self._st, name)
+
+    # Pretend the destination is another filesystem, so the copy path runs
+    monkeypatch.setattr(os, 'stat', lambda p, *a, **k: OtherDevice(real_stat(p, *a, **k))
+                        if os.path.abspath(p) == str(dest_dir) else real_stat(p, *a, **k))
+    placed = place_file(staged, str(dest_dir), IOConfig(buffer_size=4096, fsync=FSYNC_FILE))
+    monkeypatch.undo()
+
+    with open(placed, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(staged)
+    assert os.listdir(dest_dir) == ['video.mp4']  # No temporary file left behind
+    assert os.path.getmtime(placed) == 1_600_000_000
+
+
+def test_file_already_in_place_stays(tmp_path):
+    path = make_file(tmp_path / 'video.mp4')
+    assert place_file(path, str(tmp_path), IOConfig(fsync=FSYNC_FILE)) == path
+    assert os.path.exists(path)
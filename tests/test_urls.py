@@ -0,0 +1,42 @@
+import pytest
+from core.urls import extract_video_id, split_urls, cache_key, host_key, is_playlist_url
+
+VIDEO_ID = 'dQw4w9WgXcQ'
+
+
+@pytest.mark.parametrize('url', [
+    f'https://www.youtube.com/watch?v={VIDEO_ID}',
+    f'https://m.youtube.com/watch?feature=share&v={VIDEO_ID}&list=PL123',
+    f'youtube.com/watch?v={VIDEO_ID}',
+    f'https://youtu.be/{VIDEO_ID}?t=42',
+    f'https://www.youtube.com/shorts/{VIDEO_ID}',
+    f'https://www.youtube-nocookie.com/embed/{VIDEO_ID}',
+    f'https://www.youtube.com/live/{VIDEO_ID}',
+    f'  https://youtu.be/{VIDEO_ID}  ',
+])
+def test_extract_video_id(url):
+    assert extract_video_id(url) == VIDEO_ID
+
+
+@pytest.mark.parametrize('url', [
+    '', None, 'https://www.youtube.com/watch?v=short', 'https://vimeo.com/123456789',
+    'https://www.youtube.com/playlist?list=PL123', f'https://example.com/watch?v={VIDEO_ID}',
+])
+def test_extract_video_id_rejects(url):
+    assert extract_video_id(url) is None
+
+
+def test_cache_key_and_split_urls():
+    assert cache_key(f'https://youtu.be/{VIDEO_ID}') == cache_key(f'youtube.com/watch?v={VIDEO_ID}')
+    assert cache_key(' https://vimeo.com/1 ') == 'https://vimeo.com/1'
+    text = f'https://youtu.be/{VIDEO_ID}https://www.youtube.com/watch?v={VIDEO_ID}\nhttps://vimeo.com/1'
+    assert split_urls(text) == [f'https://youtu.be/{VIDEO_ID}', 'https://vimeo.com/1']
+
+
+def test_host_key_and_playlists():
+    assert host_key('https://m.youtube.com/watch') == host_key('https://youtu.be/x') == 'youtube.com'
+    assert is_playlist_url('https://www.youtube.com/playlist?list=PL123')
+    assert is_playlist_url('https://www.youtube.com/@channel/videos')
+    assert is_playlist_url('youtube.com/channel/UC123')
+    assert not is_playlist_url(f'https://www.youtube.com/watch?v={VIDEO_ID}&list=PL123')
+    assert not is_playlist_url('https://www.youtube.com/playlist')
@@ -0,0 +1,85 @@
+import time
+from PyQt6.QtWidgets import QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QTreeWidget, QTreeWidgetItem, QPushButton
+from PyQt6.QtCore import Qt, pyqtSignal
+from core.retry import classify_error
+from core.progress import format_eta
+
+# Oldest entries are dropped beyond this, so an overnight run can't grow the log without bound
+MAX_ENTRIES = 500
+
+COLUMNS = ["Time", "Video", "Error", "Outcome"]
+
+
+class ErrorLogPanel(QDockWidget):
+    """
+    Non-modal log of failed download attempts: retries with their backoff and
+    jobs that gave up. New entries never block the queue or take focus.
+    """
+    retry_failed_requested = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__("⚠️ Errors", parent)
+        self.setObjectName("error_log")
+        self.setAllowedAreas(Qt.DockWidgetArea.BottomDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea)
+        self.failed_count = 0
+
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(COLUMNS)
+        self.tree.setRootIsDecorated(False)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setColumnWidth(0, 70)
+        self.tree.setColumnWidth(1, 220)
+        self.tree.setColumnWidth(2, 380)
+
+        self.btn_retry = QPushButton("🔁 Retry Failed")
+        self.btn_retry.setEnabled(False)
+        self.btn_retry.clicked.connect(self.retry_failed_requested)
+        btn_clear = QPushButton("Clear")
+        btn_clear.clicked.connect(self.clear)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(self.btn_retry)
+        buttons.addWidget(btn_clear)
+
+        body = QWidget()
+        layout = QVBoxLayout(body)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.addWidget(self.tree)
+        layout.addLayout(buttons)
+        self.setWidget(body)
+
+    def add_retry(self, title, error_msg, decision):
+        outcome = (f"🔁 [{decision.error_class}] retry {decision.attempt + 1}/{decision.max_attempts} "
+                   f"in {format_eta(decision.delay)}")
+        if decision.quality:
+            outcome += f" at {decision.quality}"
+        self._add(title, error_msg, outcome)
+
+    def add_failure(self, title, error_msg, attempts):
+        self.failed_count += 1
+        self.btn_retry.setEnabled(True)
+        self._add(title, error_msg, f"❌ [{classify_error(error_msg)}] gave up after {attempts} attempt(s)")
+
+    def clear(self):
+        self.tree.clear()
+        self.failed_count = 0
+        self.btn_retry.setEnabled(False)
+        self._update_title()
+
+    def _add(self, title, error_msg, outcome):
+        message = ' '.join((error_msg or '').split())  # One line per entry
+        item = QTreeWidgetItem([time.strftime('%H:%M:%S'), title, message, outcome])
+        item.setToolTip(1, title)
+        item.setToolTip(2, error_msg)
+        self.tree.addTopLevelItem(item)
+        while self.tree.topLevelItemCount() > MAX_ENTRIES:
+            self.tree.takeTopLevelItem(0)
+        self.tree.scrollToItem(item)
+        self._update_title()
+        if self.isHidden():
+            self.show()  # Appears docked; the window keeps focus
+
+    def _update_title(self):
+        count = self.tree.topLevelItemCount()
+        self.setWindowTitle(f"⚠️ Errors ({count})" if count else "⚠️ Errors")
@@ -1,11 +1,25 @@
 import os
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QLineEdit, QPushButton, QTableWidget, 
-                             QTableWidgetItem, QComboBox, QHeaderView, QMessageBox, QAbstractItemView, QProgressBar)
+                             QLabel, QLineEdit, QPushButton, QTableView,
+                             QComboBox, QHeaderView, QMessageBox, QAbstractItemView, QProgressBar,
+                             QSpinBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer
-from PyQt6.QtGui import QPixmap, QIcon
-from core.workers import VideoInfoWorker
-from core.downloader import DownloadWorker
+from core.workers import ThumbnailLoader, PlaylistWorker, MetadataFetchService
+from core.urls import cache_key, is_playlist_url, split_urls
+from core.cache import get_metadata_cache
+from core.scheduler import DownloadScheduler
+from core.session import set_pool_size
+from core.jobs import JobStore, STATUS_ERROR
+from core.journal import get_job_journal, restore_jobs
+from core.bandwidth import format_rate
+from core.metrics import get_metrics_recorder, FETCH_METADATA
+from core.metadata import AUDIO_M4A, AUDIO_OPUS, AUDIO_MP3
+from ui.queue_model import QueueModel, COL_QUALITY, quality_tooltip
+from ui.error_log import ErrorLogPanel
+
+# Offered for playlists/channels, whose per-video formats are not known up front
+# (M4A/Opus fall back to a re-encode for videos without such a stream)
+PLAYLIST_QUALITIES = ["Best Quality", "1080p", "720p", "480p", "360p", AUDIO_M4A, AUDIO_OPUS, AUDIO_MP3]
 
 # --- MAIN WINDOW ---
 class MainWindow(QMainWindow):
@@ -15,9 +29,39 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 950, 650)
         
         self.current_video_data = None 
-        self.video_cache = {} # Key: URL, Value: dict
+        self.video_cache = get_metadata_cache() # Persistent, keyed by video ID
         
-        self.active_downloader = None
+        # Download Queue (job store + table model)
+        # Unfinished jobs of the previous session come back from the journal first
+        self.job_store = JobStore()
+        self.journal = get_job_journal()
+        self.restored_jobs, self.interrupted_jobs = restore_jobs(self.job_store, self.journal)
+        self.job_store.journal = self.journal
+        self.thumbnail_loader = ThumbnailLoader(parent=self)
+        # Input-box fetches (latest request wins) and background prefetch, on bounded pools
+        self.metadata_service = MetadataFetchService(max_workers=3, parent=self)
+        self.metadata_service.fetch_status.connect(lambda _request_id, text: self.info_label.setText(text))
+        self.metadata_service.fetch_loaded.connect(lambda _request_id, data: self.on_fetch_success(data))
+        self.metadata_service.fetch_failed.connect(lambda _request_id, error_msg: self.on_fetch_error())
+        self.metadata_service.metadata_ready.connect(self.on_batch_metadata)
+        self.metadata_service.metadata_failed.connect(self.on_batch_metadata_failed)
+        self.queue_model = QueueModel(self.job_store, self.thumbnail_loader,
+                                      self.metadata_service, parent=self)
+        self.playlist_workers = [] # Running playlist/channel expansions
+
+        # Parallel Download Scheduler
+        self.scheduler = DownloadScheduler(self.job_store, max_slots=3, per_host_limit=3, parent=self)
+        self.scheduler.job_started.connect(self.queue_model.refresh_job)
+        self.scheduler.jobs_changed.connect(self.queue_model.refresh_jobs)
+        self.scheduler.job_finished.connect(self.on_download_finished)
+        self.scheduler.job_failed.connect(self.on_download_error)
+        self.scheduler.job_retrying.connect(self.on_download_retrying)
+        self.scheduler.throughput_updated.connect(self.on_throughput_updated)
+        self.scheduler.queue_drained.connect(self.on_queue_drained)
+        # Warm metadata for the next jobs before they get a slot
+        self.scheduler.upcoming_jobs.connect(self.prefetch_jobs)
+
+        set_pool_size(self.scheduler.max_slots + 1)
         
         # Debounce Timer
         self.fetch_timer = QTimer()
@@ -27,6 +71,12 @@ class MainWindow(QMainWindow):
 
         self.setup_ui()
 
+        if self.restored_jobs:
+            self.info_label.setText(f"♻️ Restored {self.restored_jobs} unfinished job(s) from the last session")
+        # Downloads that were cut off by a crash or exit continue right away
+        if self.interrupted_jobs:
+            self.process_queue()
+
     def setup_ui(self):
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -113,11 +163,16 @@ class MainWindow(QMainWindow):
 
 
         # --- SECTION 3: Queue Table ---
-        self.queue_table = QTableWidget()
-        self.queue_table.setColumnCount(4)
-        self.queue_table.setHorizontalHeaderLabels(["Video Details", "Quality", "Status", "Progress"])
+        self.queue_table = QTableView()
+        self.queue_table.setModel(self.queue_model)
         self.queue_table.setIconSize(QSize(80, 45))
         self.queue_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.queue_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+
+        # Fixed row height: no per-row measuring, smooth scrolling on huge queues
+        row_header = self.queue_table.verticalHeader()
+        row_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        row_header.setDefaultSectionSize(50)
         
         header = self.queue_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
@@ -134,7 +189,51 @@ class MainWindow(QMainWindow):
         self.btn_delete.setStyleSheet("background-color: #F44336; color: white; padding: 10px;")
         self.btn_delete.clicked.connect(self.remove_selected)
 
+        self.btn_priority = QPushButton("⭐ Prioritize Selected")
+        self.btn_priority.setStyleSheet("background-color: #FF9800; color: white; padding: 10px;")
+        self.btn_priority.clicked.connect(self.prioritize_selected)
+
+        self.btn_pause = QPushButton("⏯️ Pause/Resume Selected")
+        self.btn_pause.setStyleSheet("background-color: #2196F3; color: white; padding: 10px;")
+        self.btn_pause.clicked.connect(self.toggle_pause_selected)
+
+        # Concurrent download slots (applied immediately)
+        self.slots_spin = QSpinBox()
+        self.slots_spin.setRange(1, 10)
+        self.slots_spin.setValue(self.scheduler.max_slots)
+        self.slots_spin.setPrefix("Parallel: ")
+        self.slots_spin.valueChanged.connect(self.on_slots_changed)
+
+        # Connections per download (> 1 splits each file into parallel byte ranges)
+        self.connections_spin = QSpinBox()
+        self.connections_spin.setRange(1, 16)
+        self.connections_spin.setValue(self.scheduler.connections)
+        self.connections_spin.setPrefix("Connections: ")
+        self.connections_spin.setToolTip("Parallel connections per file (1 = off)")
+        self.connections_spin.valueChanged.connect(self.scheduler.set_connections)
+
+        # Global bandwidth cap shared by all downloads (applied immediately)
+        governor = self.scheduler.governor
+        self.limit_spin = QSpinBox()
+        self.limit_spin.setRange(0, 1000)
+        self.limit_spin.setValue(int(round((governor.rate or 0) / (1024 * 1024))))
+        self.limit_spin.setPrefix("Limit: ")
+        self.limit_spin.setSuffix(" MiB/s")
+        self.limit_spin.setSpecialValueText("Limit: off")
+        self.limit_spin.setToolTip("Total download bandwidth (0 = unlimited)."
+                                   + ("\nA time-of-day schedule overrides it inside its windows." if governor.schedule else ""))
+        self.limit_spin.valueChanged.connect(self.on_limit_changed)
+
+        self.throughput_label = QLabel("Idle")
+        self.throughput_label.setStyleSheet("color: gray;")
+
+        bottom_layout.addWidget(self.throughput_label)
         bottom_layout.addStretch()
+        bottom_layout.addWidget(self.slots_spin)
+        bottom_layout.addWidget(self.connections_spin)
+        bottom_layout.addWidget(self.limit_spin)
+        bottom_layout.addWidget(self.btn_pause)
+        bottom_layout.addWidget(self.btn_priority)
         bottom_layout.addWidget(self.btn_delete)
         bottom_layout.addWidget(self.btn_start)
 
@@ -143,24 +242,48 @@ class MainWindow(QMainWindow):
         self.main_layout.addWidget(self.queue_table)
         self.main_layout.addLayout(bottom_layout)
 
+        # --- SECTION 5: Error Log (non-modal, shows itself on the first error) ---
+        self.error_log = ErrorLogPanel(self)
+        self.error_log.retry_failed_requested.connect(self.retry_failed)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.error_log)
+        self.error_log.hide()
+
     def on_url_text_changed(self):
         self.fetch_timer.stop()
         if self.url_input.text().strip():
             self.fetch_timer.start()
         else:
+            self.metadata_service.cancel_fetch()
             self.reset_input_ui()
 
     def validate_and_fetch(self):
+        # Whatever was being fetched for the previous text is no longer wanted
+        self.metadata_service.cancel_fetch()
+        urls = [u for u in split_urls(self.url_input.text()) if "youtube.com" in u or "youtu.be" in u]
+        if len(urls) > 1:
+            self.prefetch_pasted_urls(urls)
+            return
         url = self.url_input.text().strip()
         
         if "youtube.com" not in url and "youtu.be" not in url:
             self.info_label.setText("⚠️ Invalid YouTube URL format")
             return
 
-        if url in self.video_cache:
-            print(f"DEBUG: Cache Hit for {url}")
+        if is_playlist_url(url):
+            # Entries are listed when added to the queue, not now
+            self.current_video_data = {'url': url, 'playlist': True}
+            self.quality_combo.clear()
+            self.quality_combo.addItems(PLAYLIST_QUALITIES)
+            self.quality_combo.setEnabled(True)
+            self.btn_add.setEnabled(True)
+            self.info_label.setText("📃 Playlist/channel detected: pick a quality for all videos")
+            return
+
+        cached = self.video_cache.get(url)
+        if cached is not None:
+            get_metrics_recorder().record_fetch(FETCH_METADATA, cache_hit=True)
             self.info_label.setText("⚡ Loaded from cache...")
-            self.on_fetch_success(self.video_cache[url])
+            self.on_fetch_success(cached)
             return
 
         # UI Updates for Fetching State
@@ -171,17 +294,49 @@ class MainWindow(QMainWindow):
         
         self.fetch_progress.show() 
 
-        self.worker = VideoInfoWorker(url)
-        self.worker.data_loaded.connect(self.on_fetch_success)
-        self.worker.error_occurred.connect(self.on_fetch_error)
-        
-        self.worker.status_updated.connect(self.info_label.setText)
-        
-        self.worker.start()
+        # Supersedes any fetch still running for earlier text; its result is dropped
+        self.metadata_service.fetch(url)
+
+    def prefetch_pasted_urls(self, urls):
+        """Several URLs pasted at once: load all their metadata into the cache concurrently."""
+        self.current_video_data = {'urls': urls, 'batch': True, 'loaded': set(), 'failed': {}}
+        self.quality_combo.clear()
+        self.quality_combo.addItems(PLAYLIST_QUALITIES)
+        self.quality_combo.setEnabled(True)
+        self.btn_add.setEnabled(True)
+        self.fetch_progress.hide()
+        # Playlists are listed when added; single videos are warmed now
+        self.metadata_service.prefetch([u for u in urls if not is_playlist_url(u)])
+        self.update_batch_label()
+
+    def on_batch_metadata(self, url, *_):
+        data = self.current_video_data
+        if data and data.get('batch') and url in data['urls']:
+            data['loaded'].add(url)
+            self.update_batch_label()
+
+    def on_batch_metadata_failed(self, url, error_msg):
+        data = self.current_video_data
+        if data and data.get('batch') and url in data['urls']:
+            data['failed'][url] = error_msg  # Its row is marked once the list is queued
+            self.update_batch_label()
+
+    def update_batch_label(self):
+        data = self.current_video_data
+        videos = [u for u in data['urls'] if not is_playlist_url(u)]
+        playlists = len(data['urls']) - len(videos)
+        text = f"📋 {len(videos)} videos: metadata {len(data['loaded'])}/{len(videos)} loaded"
+        if data['failed']:
+            text += f", {len(data['failed'])} failed"
+        if playlists:
+            text += f", {playlists} playlists"
+        self.info_label.setText(text + " - pick a quality for all")
 
     def on_fetch_success(self, data):
-        self.current_video_data = data
-        self.video_cache[data['url']] = data # Save to cache
+        self.current_video_data = data # fetch_video_info already stored it in the cache
+
+        # Warm the thumbnail cache in the background; the title and formats are shown now
+        self.thumbnail_loader.request(cache_key(data['url']), data.get('thumbnail_url'))
         
         self.quality_combo.clear()
         self.quality_combo.addItems(data['formats'])
@@ -191,7 +346,11 @@ class MainWindow(QMainWindow):
         self.fetch_progress.hide()
         
         title = data['title']
-        self.info_label.setText(f"✅ Found: {title[:60]}...")
+        done = self.scheduler.archive.qualities(data['url'])
+        if done:
+            self.info_label.setText(f"✅ Found: {title[:60]}... (already downloaded: {', '.join(done)})")
+        else:
+            self.info_label.setText(f"✅ Found: {title[:60]}...")
 
     def on_fetch_error(self):
         self.fetch_progress.hide()
@@ -213,59 +372,107 @@ class MainWindow(QMainWindow):
             return
         # ----------------------
 
+        if self.current_video_data.get('batch'):
+            self.add_pasted_urls(self.current_video_data['urls'], target_quality,
+                                 self.current_video_data['failed'])
+            self.url_input.clear()
+            self.reset_input_ui()
+            return
+
         target_url = self.current_video_data['url']
 
-        # --- DUPLICATE CHECK ---
-        for row in range(self.queue_table.rowCount()):
-            item = self.queue_table.item(row, 0)
-            existing_url = item.data(Qt.ItemDataRole.UserRole)
-            existing_quality = self.queue_table.item(row, 1).text()
+        if self.current_video_data.get('playlist'):
+            self.expand_playlist(target_url, target_quality)
+            self.url_input.clear()
+            self.reset_input_ui()
+            return
 
-            if existing_url == target_url and existing_quality == target_quality:
-                QMessageBox.warning(self, "Duplicate Warning", 
-                                    "This video with the same quality is already in the queue!")
+        # Downloaded in an earlier session (same video ID and quality, whatever the URL form)
+        archived = self.scheduler.archive.get(target_url, target_quality)
+        if archived is not None:
+            answer = QMessageBox.question(
+                self, "Already Downloaded",
+                f"This video was already downloaded in {target_quality}:\n{archived['filepath'] or archived['title']}"
+                "\n\nDownload it again?")
+            if answer != QMessageBox.StandardButton.Yes:
                 return
 
-        row = self.queue_table.rowCount()
-        self.queue_table.insertRow(row)
-
-        # --- COLUMN 0: Video Title (EDITABLE) ---
-        item_title = QTableWidgetItem(self.current_video_data['title'])
-        # Store hidden URL for backend logic
-        item_title.setData(Qt.ItemDataRole.UserRole, target_url) 
-        
-        # Add Thumbnail
-        if self.current_video_data['thumbnail_bytes']:
-            pixmap = QPixmap()
-            pixmap.loadFromData(self.current_video_data['thumbnail_bytes'])
-            item_title.setIcon(QIcon(pixmap))
-        
-        # Flags: Selectable + Enabled + EDITABLE
-        item_title.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsEditable)
-        self.queue_table.setItem(row, 0, item_title)
-
+        # Quality tooltip: exact format and estimated size
+        tooltip = quality_tooltip(self.current_video_data, target_quality)
 
-        # --- COLUMN 1: Quality (READ-ONLY) ---
-        item_quality = QTableWidgetItem(target_quality)
-        item_quality.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-        self.queue_table.setItem(row, 1, item_quality)
-
-
-        # --- COLUMN 2: Status (READ-ONLY) ---
-        item_status = QTableWidgetItem("Pending")
-        item_status.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsEditable)
-        self.queue_table.setItem(row, 2, item_status)
-
-
-        # --- COLUMN 3: Progress (READ-ONLY) ---
-        item_progress = QTableWidgetItem("0%")
-        item_progress.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-        self.queue_table.setItem(row, 3, item_progress)
+        # --- ADD (with O(1) DUPLICATE CHECK on video ID + quality) ---
+        job = self.queue_model.add_job(
+            target_url, target_quality, self.current_video_data['title'],
+            info=self.current_video_data.get('info'),
+            thumbnail_url=self.current_video_data.get('thumbnail_url'),
+            tooltip=tooltip,
+        )
+        if job is None:
+            QMessageBox.warning(self, "Duplicate Warning", 
+                                "This video with the same quality is already in the queue!")
+            return
 
         # Reset UI Input Area
         self.url_input.clear()
         self.reset_input_ui()
 
+        # Queue already running: the scheduler picks the new job up right away
+        self.scheduler.dispatch()
+
+    def add_pasted_urls(self, urls, quality, failed=None):
+        """
+        Queues a pasted URL list; titles come from the metadata prefetched meanwhile.
+        'failed' maps URLs whose prefetch failed to the error, shown on their rows.
+        """
+        entries = []
+        for url in urls:
+            if is_playlist_url(url):
+                self.expand_playlist(url, quality)
+                continue
+            cached = self.video_cache.get(url)
+            entries.append({'url': url, 'title': cached['title'] if cached else url})
+        if entries:
+            self.on_playlist_entries(entries, quality)
+        for url, error_msg in (failed or {}).items():
+            self.queue_model.on_metadata_failed(url, error_msg)
+
+    def expand_playlist(self, url, quality):
+        """Streams a playlist's entries into the queue as they are discovered."""
+        worker = PlaylistWorker(url)
+        worker.entries_found.connect(lambda entries: self.on_playlist_entries(entries, quality))
+        worker.expansion_finished.connect(lambda total: self.on_playlist_done(worker, total, None))
+        worker.error_occurred.connect(lambda err: self.on_playlist_done(worker, None, err))
+        self.playlist_workers.append(worker)
+        self.scheduler.begin_expansion()
+        worker.start()
+        self.fetch_progress.show()
+
+    def on_playlist_entries(self, entries, quality):
+        # Videos already in the download archive are skipped without fetching anything
+        archive = self.scheduler.archive
+        entries = [e for e in entries if not archive.contains(e['url'], quality)]
+        added = self.queue_model.add_jobs(entries, quality)
+        if added:
+            self.info_label.setText(f"📃 {len(self.job_store)} videos in queue (listing playlist...)")
+            self.scheduler.dispatch()
+
+    def on_playlist_done(self, worker, total, error_msg):
+        if worker in self.playlist_workers:
+            self.playlist_workers.remove(worker)
+            self.scheduler.end_expansion()  # The batch may end now (dispatches)
+        if not self.playlist_workers:
+            self.fetch_progress.hide()
+        if error_msg is not None:
+            self.info_label.setText("❌ Failed to list playlist")
+        else:
+            self.info_label.setText(f"✅ Playlist listed: {total} videos")
+
+    def prefetch_jobs(self, job_ids):
+        for job_id in job_ids:
+            job = self.job_store.get(job_id)
+            if job is not None:
+                self.queue_model.request_metadata(job)
+
     def reset_input_ui(self):
         self.quality_combo.clear()
         self.quality_combo.setEnabled(False)
@@ -274,114 +481,126 @@ class MainWindow(QMainWindow):
         self.info_label.setText("Ready")
         self.current_video_data = None
 
+    def selected_job(self):
+        index = self.queue_table.currentIndex()
+        return self.queue_model.job_for_row(index.row()) if index.isValid() else None
+
     def remove_selected(self):
-        row = self.queue_table.currentRow()
-        if row >= 0:
-            self.queue_table.removeRow(row)
-    
+        job = self.selected_job()
+        if job is not None:
+            self.scheduler.cancel(job.job_id)
+            self.queue_model.remove_job(job.job_id)
+
+    def toggle_pause_selected(self):
+        """Pauses the selected running download (keeping its partial file), or resumes it."""
+        job = self.selected_job()
+        if job is None or not self.scheduler.is_active(job.job_id):
+            return
+        if self.scheduler.is_paused(job.job_id):
+            self.scheduler.resume(job.job_id)
+        else:
+            self.scheduler.pause(job.job_id)
 
+    def prioritize_selected(self):
+        """Moves the selected pending job to the front of the queue, or gives a running one most of the bandwidth."""
+        job = self.selected_job()
+        if job is None:
+            return
+        if self.scheduler.is_active(job.job_id):
+            job.priority = 1
+            self.scheduler.set_priority(job.job_id, job.priority)
+        else:
+            self.job_store.prioritize(job.job_id)
+        if job.priority and not job.tooltip.startswith("⭐"):
+            job.tooltip = f"⭐ Prioritized\n{job.tooltip}".strip()
+        self.queue_model.refresh_jobs([job.job_id], COL_QUALITY, COL_QUALITY)
+
+    def on_limit_changed(self, mib_per_sec):
+        self.scheduler.governor.set_rate(mib_per_sec * 1024 * 1024 if mib_per_sec else None)
+
+    def on_slots_changed(self, count):
+        self.scheduler.set_max_slots(count)
+        # Keep one warm YoutubeDL per download slot plus one for metadata fetches
+        set_pool_size(count + 1)
 
   # ------------------------------------------------------------------------
-    # QUEUE MANAGEMENT LOGIC (CHAIN REACTION SYSTEM)
+    # QUEUE MANAGEMENT LOGIC (PARALLEL SCHEDULER)
     # ------------------------------------------------------------------------
 
     def process_queue(self, from_user=False):
         """
-        Manages the download queue.
+        Starts dispatching 'Pending' jobs; the scheduler fills free slots itself.
         Args:
             from_user (bool): True if triggered by the 'Start' button, 
                               False if triggered automatically by the system.
         """
-        # 1. Check if already downloading
-        if self.active_downloader is not None:
+        # 1. Check if the queue is completely empty
+        if len(self.job_store) == 0:
             if from_user:
-                QMessageBox.warning(self, "Busy", "A download is already in progress.")
-            else:
-                print("DEBUG: System tried to start, but worker is busy.")
+                QMessageBox.warning(self, "Empty Queue", "Please add videos to the list first!")
             return
 
-        # 2. Check if table is completely empty
-        if self.queue_table.rowCount() == 0:
-            if from_user:
-                QMessageBox.warning(self, "Empty Queue", "Please add videos to the list first!")
+        # 2. Nothing left to do
+        if self.job_store.pending_count() == 0:
+            if from_user and not self.scheduler.is_busy():
+                QMessageBox.information(self, "Info", "No pending tasks found in the queue.")
             return
 
-        # 3. Scan for Pending tasks
-        for row in range(self.queue_table.rowCount()):
-            status_item = self.queue_table.item(row, 2)
-            
-            if status_item.text() == "Pending":
-                # Extract Data
-                url_item = self.queue_table.item(row, 0)
-                url = url_item.data(Qt.ItemDataRole.UserRole)
-                quality = self.queue_table.item(row, 1).text()
-                
-                # Directory
-                save_path = os.path.join(os.getcwd(), 'downloads')
-                if not os.path.exists(save_path):
-                    os.makedirs(save_path)
-
-                # Start Worker
-                self.start_download_worker(url, quality, save_path, row)
-                return # Exit loop, worker started.
-
-        # 4. If we reach here, NO "Pending" items were found.
-        
-        if from_user:
-            # User clicked start, but everything is already finished or error
-            QMessageBox.information(self, "Info", "No pending tasks found in the queue.")
-        else:
-            # System finished the last task (Chain reaction ended)
-            # This is the "End of Batch" message.
-            QMessageBox.information(self, "Queue Finished", "Queue processing is complete.\nCheck statuses for any errors.")
+        # Directory
+        save_path = os.path.join(os.getcwd(), 'downloads')
+        if not os.path.exists(save_path):
+            os.makedirs(save_path)
 
+        self.scheduler.start(save_path)
 
-    def start_download_worker(self, url, quality, path, row_index):
-        """Prepares the Worker thread, connects signals, and starts execution."""
-        
-        # Update UI Status
-        self.queue_table.item(row_index, 2).setText("⏳ Downloading...")
-        
-        # Create the Worker Instance
-        self.active_downloader = DownloadWorker(url, quality, path)
-        
-        # Connect Signals using Lambda to pass 'row_index' context
-        self.active_downloader.progress_updated.connect(
-            lambda status, prog: self.update_row_progress(row_index, status, prog)
-        )
-        self.active_downloader.finished.connect(
-            lambda: self.on_download_finished(row_index)
+    def on_download_finished(self, job_id):
+        """Triggered when a download completes successfully."""
+        self.queue_model.refresh_job(job_id)
+
+    def on_download_error(self, job_id, error_msg):
+        """Triggered if a download fails for good (no retries left). Logged; the queue keeps going."""
+        self.queue_model.refresh_job(job_id)
+        job = self.job_store.get(job_id)
+        if job is not None:
+            self.error_log.add_failure(self._log_title(job), error_msg, job.attempts)
+
+    def on_download_retrying(self, job_id, error_msg, decision):
+        """A failed attempt that will be retried after its backoff."""
+        job = self.job_store.get(job_id)
+        if job is not None:
+            self.error_log.add_retry(self._log_title(job), error_msg, decision)
+
+    def _log_title(self, job):
+        return f"#{self.job_store.row_of(job.job_id) + 1} {job.title}"
+
+    def retry_failed(self):
+        """Requeues every failed job (with fresh attempts) and starts the queue."""
+        failed = [job.job_id for job in self.job_store if job.status == STATUS_ERROR]
+        for job_id in failed:
+            self.scheduler.requeue(job_id)
+        if failed:
+            self.process_queue()
+
+    def on_throughput_updated(self, bytes_per_sec, active_jobs):
+        postprocessing = self.scheduler.postprocessing_count()
+        retrying = self.scheduler.retrying_count()
+        if active_jobs == 0 and postprocessing == 0 and retrying == 0:
+            self.throughput_label.setText("Idle")
+            return
+        self.throughput_label.setText(
+            f"⚡ {bytes_per_sec / (1024 * 1024):.2f} MiB/s | {active_jobs} active | "
+            f"{self.scheduler.pending_count()} waiting | ⚙️ {postprocessing} postprocessing | "
+            f"🔁 {retrying} retrying | "
+            f"limit {format_rate(self.scheduler.governor.current_rate())}"
         )
-        self.active_downloader.error_occurred.connect(
-            lambda err: self.on_download_error(row_index, err)
+        stats = self.scheduler.progress.stats()
+        self.throughput_label.setToolTip(
+            f"Progress events: {stats['received']} received, "
+            f"{stats['delivered']} shown, {stats['merged']} merged"
         )
-        
-        # Start the Thread
-        self.active_downloader.start()
 
-    def update_row_progress(self, row, status_text, progress_percent):
-        self.queue_table.item(row, 3).setText(f"{progress_percent}%")
-        self.queue_table.item(row, 2).setText(status_text)
-
-    def on_download_finished(self, row):
-        """Triggered when a download completes successfully."""
-        self.queue_table.item(row, 2).setText("Completed ✅")
-        self.queue_table.item(row, 3).setText("100%")
-        self.active_downloader = None
-        
-        # RECURSION: Check next item (Not from user)
-        self.process_queue(from_user=False)
-
-    def on_download_error(self, row, error_msg):
-        """Triggered if the download fails."""
-        self.queue_table.item(row, 2).setText("Error ❌")
-        
-        # İsteğe bağlı: Hata mesajını popup olarak göstermek yerine
-        # sadece duruma yazabiliriz, böylece akış kesilmez.
-        # Ama şimdilik popup kalsın.
-        QMessageBox.critical(self, "Download Error", f"An error occurred at row {row+1}:\n{error_msg}")
-        
-        self.active_downloader = None
-        
-        # RECURSION: Check next item even if this one failed
-        self.process_queue(from_user=False)
\ No newline at end of file
+    def on_queue_drained(self):
+        """End of Batch: every submitted job finished or failed."""
+        failed = self.error_log.failed_count
+        summary = f"\n{failed} download(s) failed; see the error log." if failed else ""
+        QMessageBox.information(self, "Queue Finished", f"Queue processing is complete.{summary}")
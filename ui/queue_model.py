@@ -0,0 +1,221 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QPixmap, QPixmapCache
+from core.jobs import STATUS_PENDING, META_NONE, META_LOADING, META_READY, META_FAILED
+from core.metadata import select_format_id, estimate_size, is_stream_copy
+from core.urls import cache_key
+
+COLUMNS = ["Video Details", "Quality", "Status", "Progress"]
+COL_TITLE, COL_QUALITY, COL_STATUS, COL_PROGRESS = range(4)
+
+
+def quality_tooltip(video_data, quality):
+    """Quality cell tooltip: the exact format that will be downloaded and its estimated size."""
+    format_table = video_data.get('format_table') or []
+    format_spec = select_format_id(format_table, quality)
+    if not format_spec:
+        return ""
+    size = estimate_size(format_table, format_spec)
+    size_text = f" · ~{size / (1024 * 1024):.1f} MiB" if size else ""
+    if "Audio Only" in quality:
+        acodec = next((f['acodec'] for f in format_table if f['format_id'] == format_spec), None)
+        size_text += " · remux" if is_stream_copy(quality, acodec) else " · re-encode"
+    return f"Format {format_spec}{size_text}"
+
+
+class QueueModel(QAbstractTableModel):
+    """
+    Table model over a JobStore.
+    Rows are looked up by job ID through the store's index, so updates
+    touch only the rows that changed and never scan the table.
+    """
+
+    def __init__(self, store, thumbnail_loader=None, metadata_prefetcher=None, parent=None):
+        super().__init__(parent)
+        self.store = store
+        # Icons come from the bounded QPixmapCache, backed by the on-disk thumbnail cache
+        self.thumbnail_loader = thumbnail_loader
+        if thumbnail_loader is not None:
+            thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        # Playlist entries get their formats/thumbnail once their row is first painted
+        self.metadata_prefetcher = metadata_prefetcher
+        if metadata_prefetcher is not None:
+            metadata_prefetcher.metadata_ready.connect(self.on_metadata_ready)
+            metadata_prefetcher.metadata_failed.connect(self.on_metadata_failed)
+
+    # ------------------------------------------------------------------------
+    # QAbstractTableModel INTERFACE
+    # ------------------------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self.store.job_at(index.row())
+        col = index.column()
+
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            if col == COL_TITLE:
+                # Only visible rows are painted, so this loads metadata on demand
+                self.request_metadata(job)
+                return job.title
+            if col == COL_QUALITY:
+                return job.quality
+            if col == COL_STATUS:
+                return job.status_text
+            if col == COL_PROGRESS:
+                return f"{job.progress}%"
+
+        elif role == Qt.ItemDataRole.DecorationRole and col == COL_TITLE:
+            return self._icon_for(job)
+
+        elif role == Qt.ItemDataRole.ToolTipRole:
+            if col == COL_QUALITY:
+                if job.metadata_state == META_LOADING:
+                    return "Loading formats..."
+                return job.tooltip or None
+            if col == COL_TITLE:
+                return job.url
+
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        # Title stays editable, as in the original table
+        if index.column() == COL_TITLE:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or index.column() != COL_TITLE:
+            return False
+        self.store.job_at(index.row()).title = str(value)
+        self.dataChanged.emit(index, index)
+        return True
+
+    # ------------------------------------------------------------------------
+    # STORE OPERATIONS
+    # ------------------------------------------------------------------------
+
+    def add_job(self, url, quality, title, **kwargs):
+        """Adds a job to the store (see JobStore.add). Returns None for duplicates."""
+        if self.store.find(url, quality) is not None:
+            return None
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row)
+        job = self.store.add(url, quality, title, **kwargs)
+        self.endInsertRows()
+        return job
+
+    def add_jobs(self, entries, quality):
+        """
+        Appends flat playlist entries ({'url', 'title'}) in one insert.
+        Their metadata is loaded later, on demand. Returns the number added.
+        """
+        fresh = []
+        seen = set()
+        for entry in entries:
+            key = cache_key(entry['url'])
+            if key in seen or self.store.find(entry['url'], quality) is not None:
+                continue
+            seen.add(key)
+            fresh.append(entry)
+        if not fresh:
+            return 0
+
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row + len(fresh) - 1)
+        self.store.add_many(fresh, quality, metadata_state=META_NONE)
+        self.endInsertRows()
+        return len(fresh)
+
+    def remove_job(self, job_id):
+        row = self.store.row_of(job_id)
+        if row < 0:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.store.remove(job_id)
+        self.endRemoveRows()
+
+    def job_for_row(self, row):
+        if 0 <= row < len(self.store):
+            return self.store.job_at(row)
+        return None
+
+    def refresh_jobs(self, job_ids, first_col=COL_STATUS, last_col=COL_PROGRESS):
+        """Repaints the given jobs' cells (one dataChanged per contiguous row range)."""
+        rows = sorted(r for r in (self.store.row_of(j) for j in job_ids) if r >= 0)
+        if not rows:
+            return
+        start = prev = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == prev + 1:
+                prev = row
+                continue
+            self.dataChanged.emit(self.index(start, first_col), self.index(prev, last_col))
+            if row is not None:
+                start = prev = row
+
+    def refresh_job(self, job_id):
+        self.refresh_jobs([job_id], COL_TITLE, COL_PROGRESS)
+
+    def on_thumbnail_ready(self, video_key, path):
+        self.refresh_jobs(self.store.jobs_for_video(video_key), COL_TITLE, COL_TITLE)
+
+    def request_metadata(self, job):
+        """Starts a background metadata fetch for a job that only has its playlist entry."""
+        if job.metadata_state != META_NONE or self.metadata_prefetcher is None:
+            return
+        if job.status != STATUS_PENDING:
+            return  # Already handed to a downloader, which extracts it itself
+        job.metadata_state = META_LOADING
+        self.metadata_prefetcher.request(job.url)
+
+    def on_metadata_ready(self, url, data):
+        job_ids = self.store.jobs_for_video(cache_key(url))
+        for job_id in job_ids:
+            job = self.store.get(job_id)
+            if job.metadata_state == META_READY:
+                continue
+            job.metadata_state = META_READY
+            job.thumbnail_url = data.get('thumbnail_url')
+            job.tooltip = quality_tooltip(data, job.quality)
+            if job.status == STATUS_PENDING:
+                job.info = data.get('info')
+        self.refresh_jobs(job_ids, COL_TITLE, COL_QUALITY)
+
+    def on_metadata_failed(self, url, error_msg):
+        job_ids = self.store.jobs_for_video(cache_key(url))
+        for job_id in job_ids:
+            job = self.store.get(job_id)
+            if job.metadata_state != META_READY:
+                # The download still runs; it resolves the format on its own
+                job.metadata_state = META_FAILED
+                job.tooltip = f"Formats unavailable: {error_msg}"
+        self.refresh_jobs(job_ids, COL_QUALITY, COL_QUALITY)
+
+    def _icon_for(self, job):
+        """Small pixmap for a job: memory cache, then disk cache, else an async fetch."""
+        pixmap = QPixmapCache.find(job.video_key)
+        if pixmap is not None:
+            return pixmap
+        if self.thumbnail_loader is None:
+            return None
+
+        path = self.thumbnail_loader.request(job.video_key, job.thumbnail_url)
+        if path is None:
+            return None  # Repainted when thumbnail_ready fires
+        pixmap = QPixmap(path)
+        if pixmap.isNull():
+            return None
+        QPixmapCache.insert(job.video_key, pixmap)
+        return pixmap